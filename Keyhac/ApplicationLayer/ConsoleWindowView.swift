@@ -19,6 +19,7 @@ struct ConsoleWindowView: View {
 
     @State var lastKeyString: String = ""
     @State var focusPathString: String = ""
+    @State var latencyString: String = ""
 
     @State var updateTimer: Timer?
 
@@ -127,6 +128,25 @@ struct ConsoleWindowView: View {
                         NSPasteboard.general.setString(focusPathString, forType: .string)
                     }
                 }
+                
+                GridRow {
+                    Text("Latency:")
+                    Text(latencyString)
+                        .padding(.all, 2)
+                        .frame(maxWidth: .infinity)
+                        .lineLimit(1)
+                        .truncationMode(.tail)
+                        .overlay(
+                            RoundedRectangle(cornerRadius: 4)
+                                .stroke(.gray, lineWidth: 1)
+                        )
+                        .textSelection(.enabled)
+
+                    Button("Copy") {
+                        NSPasteboard.general.clearContents()
+                        NSPasteboard.general.setString(latencyString, forType: .string)
+                    }
+                }
             }
             .padding(.all, 4)
         }
@@ -157,5 +177,10 @@ struct ConsoleWindowView: View {
         if focusPathString != newFocusPathString {
             focusPathString = newFocusPathString
         }
+
+        let newLatencyString = Console.getInstance().pullText(name: "latency")
+        if latencyString != newLatencyString {
+            latencyString = newLatencyString
+        }
     }
 }
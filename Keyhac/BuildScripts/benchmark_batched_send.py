@@ -0,0 +1,129 @@
+import sys
+import os
+import time
+import json
+import random
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+import keyhac_input
+from keyhac_key import KeyProgram
+
+
+description = """
+Count Python/native boundary crossings and measure the time of InputContext flushes for long macros,
+with the batched Hook.send_keyboard_events() and with one Hook.send_keyboard_event() call per event,
+using the pure Python emulator of keyhac_core.
+Use --crossing-latency to add a cost to each emulated crossing.
+"""
+
+send_apis = ( "Hook.send_keyboard_event", "Hook.send_keyboard_events" )
+
+
+def macro(num_strokes, rand):
+    keys = []
+    for i in range(num_strokes):
+        key = rand.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+        if rand.random() < 0.2:
+            key = "Shift-" + key
+        keys.append(key)
+    return KeyProgram.compile(tuple(keys))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default="10,100,1000", help="comma separated numbers of key strokes of the macros")
+    parser.add_argument("--repeat", type=int, default=20, help="number of flushes per measurement")
+    parser.add_argument("--crossing-latency", type=float, default=0.0, metavar="SEC", help="latency in seconds added to each emulated send API call")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the macros")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    sizes = [ int(size) for size in args.sizes.split(",") ]
+    rand = random.Random(args.seed)
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    for api in send_apis:
+        if args.crossing_latency:
+            keyhac_core.inject( api, args.crossing_latency )
+
+    results = []
+    batched_send = keyhac_input._send_keyboard_events
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        keymap.configure()
+        sent_events = keyhac_core.Hook.sent_events
+
+        def flush(program, send_func):
+
+            keyhac_input._send_keyboard_events = send_func
+            keyhac_core.call_counts.clear()
+            num_sent_events_start = len(sent_events)
+
+            start_time = time.perf_counter_ns()
+            for i in range(args.repeat):
+                with keymap.get_input_context() as input_ctx:
+                    input_ctx.send_program(program)
+            elapsed = time.perf_counter_ns() - start_time
+
+            crossings = sum( keyhac_core.call_counts[api] for api in send_apis )
+            return sent_events[num_sent_events_start:], crossings / args.repeat, elapsed / args.repeat
+
+        for size in sizes:
+
+            program = macro(size, rand)
+
+            one_by_one_events, one_by_one_crossings, one_by_one_time = flush(program, keyhac_input._send_keyboard_events_one_by_one)
+            batched_events, batched_crossings, batched_time = flush(program, batched_send)
+
+            if one_by_one_events != batched_events:
+                raise AssertionError(f"Batched send sent different key events ({size} strokes)")
+
+            results.append({
+                "strokes": size,
+                "events": len(batched_events) // args.repeat,
+                "one_by_one_crossings": one_by_one_crossings,
+                "batched_crossings": batched_crossings,
+                "one_by_one_flush_usec": one_by_one_time / 1000,
+                "batched_flush_usec": batched_time / 1000,
+            })
+
+    finally:
+        keyhac_input._send_keyboard_events = batched_send
+        keyhac_core.clear_injections()
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print("Strokes   Events   crossings: one by one   batched   flush (usec): one by one    batched")
+        for result in results:
+            print( f"{result['strokes']:7d} {result['events']:8d} {result['one_by_one_crossings']:23.0f} {result['batched_crossings']:9.0f}"
+                f" {result['one_by_one_flush_usec']:26.1f} {result['batched_flush_usec']:10.1f}" )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import json
+import argparse
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_console
+from keyhac_executor import ExecutorLane
+from keyhac_action import ThreadedAction
+
+
+description = """
+Measure the backlog of a slow ThreadedAction triggered by key repeat, with the coalescing policies of ThreadedAction,
+using the pure Python emulator of keyhac_core.
+"queue" executes run() for every trigger (coalesce=None), "drop" ignores triggers while busy,
+and "latest" merges triggers while queued into one execution.
+The maximum queue depth of the executor lane and the completion lag after the last trigger are reported.
+"""
+
+modes = { "queue": None, "drop": "drop", "latest": "latest" }
+
+
+class SlowAction(ThreadedAction):
+
+    def __init__(self, lane, coalesce, run_time):
+        self.lane = lane
+        self.coalesce = coalesce
+        self.run_time = run_time
+        self.num_runs = 0
+        self.finished_time = None
+
+    def run(self):
+        time.sleep(self.run_time)
+
+    def finished(self, result):
+        self.num_runs += 1
+        self.finished_time = time.perf_counter()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--triggers", type=int, default=60, help="number of triggers, such as key repeats")
+    parser.add_argument("--interval", type=float, default=1/30, metavar="SEC", help="interval of triggers in seconds (default: 30 per second)")
+    parser.add_argument("--run-time", type=float, default=0.1, metavar="SEC", help="time of each run() in seconds")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    results = []
+
+    for mode, coalesce in modes.items():
+
+        lane = ExecutorLane.define(f"benchmark_{mode}", max_workers=1)
+        action = SlowAction(lane.name, coalesce, args.run_time)
+
+        start_time = time.perf_counter()
+        for i in range(args.triggers):
+            action()
+            # Keep the trigger timing regardless of the time of action(), as key repeat does
+            time.sleep( max( 0, start_time + (i + 1) * args.interval - time.perf_counter() ) )
+        last_trigger_time = time.perf_counter()
+
+        # Wait for the backlog to drain
+        while True:
+            metrics = lane.get_metrics()
+            if metrics["queue_depth"] == 0 and metrics["completed"] + metrics["failed"] + metrics["canceled"] + metrics["timed_out"] == metrics["submitted"]:
+                break
+            time.sleep(0.001)
+
+        # Wait for the last finished() called by the done callback
+        while action.num_runs < metrics["completed"]:
+            time.sleep(0.001)
+
+        results.append({
+            "mode": mode,
+            "triggers": args.triggers,
+            "runs": action.num_runs,
+            "max_queue_depth": metrics["max_queue_depth"],
+            "wait_p99_msec": metrics["wait_p99"] / 1e6,
+            "completion_lag_msec": max( 0, action.finished_time - last_trigger_time ) * 1000 if action.finished_time else None,
+        })
+
+    # Write console output of the actions first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print(f"Trigger interval: {args.interval * 1000:.1f} msec, run time: {args.run_time * 1000:.1f} msec")
+        print("Mode     Triggers   Runs   max queue depth   wait p99 (msec)   completion lag (msec)")
+        for result in results:
+            print( f"{result['mode']:8s} {result['triggers']:8d} {result['runs']:6d} {result['max_queue_depth']:17d} {result['wait_p99_msec']:17.1f} {result['completion_lag_msec']:23.1f}" )
+
+
+if __name__ == "__main__":
+    main()
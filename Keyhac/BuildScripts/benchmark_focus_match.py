@@ -0,0 +1,144 @@
+import sys
+import os
+import time
+import json
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_focus import FocusCondition, FocusPathMatcher
+from keyhac_const import *
+
+
+description = """
+Measure the cost of matching the focus path against focus path patterns of key tables,
+as the number of key tables grows, using the pure Python emulator of keyhac_core.
+FocusPathMatcher is compared with calling FocusCondition.check_path() for each key table,
+and app switches are measured end-to-end through the emulated focus notification and keyboard hook.
+"""
+
+num_focus_apps = 20
+
+
+def focus_path_patterns(num_keytables):
+
+    # Mostly per-application key tables, with some per-window and application independent patterns
+    patterns = []
+    for i in range(num_keytables):
+        if i % 20 == 19:
+            patterns.append( "*/AXTextArea(*)" )
+        elif i % 10 == 9:
+            patterns.append( f"/AXApplication(App{i})/AXWindow(*Untitled*)/*" )
+        else:
+            patterns.append( f"/AXApplication(App{i})/*" )
+    return patterns
+
+
+def focus_snapshots(num_keytables):
+
+    # Applications spread over the key tables, and one without any per-application key table
+    step = max( num_keytables // num_focus_apps, 1 )
+    snapshots = []
+    for i in range( 0, num_keytables, step ):
+        snapshots.append( [ ["AXApplication", f"App{i}"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+    snapshots.append( [ ["AXApplication", "Unknown"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+    return snapshots[-num_focus_apps:]
+
+
+def measure(func, items, repeat):
+    start_time = time.perf_counter_ns()
+    for i in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter_ns() - start_time) / (repeat * len(items))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default="10,50,100,200,500,1000,2000", help="comma separated numbers of key tables")
+    parser.add_argument("--repeat", type=int, default=20, help="number of rounds over the focused applications per measurement")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    sizes = [ int(size) for size in args.sizes.split(",") ]
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    results = []
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+
+        for size in sizes:
+
+            keymap.configure()
+
+            patterns = focus_path_patterns(size)
+            for i, pattern in enumerate(patterns):
+                keytable = keymap.define_keytable( focus_path_pattern=pattern )
+                keytable[ f"Ctrl-{'ABCDEFGHIJKLMNOPQRSTUVWXYZ'[i % 26]}" ] = "Left"
+
+            snapshots = focus_snapshots(size)
+            focus_paths = []
+            for snapshot in snapshots:
+                keyhac_core.set_focus(snapshot)
+                focus_paths.append( FocusCondition.get_focus_path(keyhac_core.UIElement.focused_application.get_attribute_value("AXFocusedUIElement")) )
+
+            focus_conditions = [ FocusCondition(pattern) for pattern in patterns ]
+            matcher = FocusPathMatcher(patterns)
+
+            def check_each(focus_path):
+                return [ focus_condition.check_path(focus_path) for focus_condition in focus_conditions ]
+
+            def switch_app(snapshot):
+                # Focus change notification, and a key stroke in the application without the key table cache
+                keymap.keytable_cache.clear()
+                keyhac_core.set_focus(snapshot)
+                on_key( (VK_J << 8) | KEY_EVENT_TYPE_DOWN )
+                on_key( (VK_J << 8) | KEY_EVENT_TYPE_UP )
+
+            build_start_time = time.perf_counter_ns()
+            FocusPathMatcher(patterns)
+            build_time = time.perf_counter_ns() - build_start_time
+
+            results.append({
+                "keytables": size,
+                "check_each_usec": measure( check_each, focus_paths, args.repeat ) / 1000,
+                "matcher_usec": measure( matcher.match, focus_paths, args.repeat ) / 1000,
+                "matcher_build_usec": build_time / 1000,
+                "app_switch_usec": measure( switch_app, snapshots, args.repeat ) / 1000,
+            })
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print("Key tables   check_path each   FocusPathMatcher   matcher build   app switch   (usec)")
+        for result in results:
+            print( f"{result['keytables']:10d} {result['check_each_usec']:17.1f} {result['matcher_usec']:18.1f}"
+                f" {result['matcher_build_usec']:15.1f} {result['app_switch_usec']:12.1f}" )
+
+
+if __name__ == "__main__":
+    main()
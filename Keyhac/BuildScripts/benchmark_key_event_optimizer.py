@@ -0,0 +1,129 @@
+import sys
+import os
+import time
+import json
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_const import *
+
+
+description = """
+Measure how many key events KeyEventOptimizer removes from key replay playbacks,
+and the time of a playback with and without the optimizer, using the pure Python emulator of keyhac_core.
+Playbacks are measured while modifier keys of the playback hot key are held, as they usually are.
+"""
+
+
+def stroke(vk):
+    return [ (vk, True), (vk, False) ]
+
+def with_modifier(mod_vk, *vks):
+    seq = [ (mod_vk, True) ]
+    for vk in vks:
+        seq += stroke(vk)
+    seq.append( (mod_vk, False) )
+    return seq
+
+# Recorded key sequences of KeyReplayBuffer
+macros = {
+    "copy & paste, Cmd released between" : with_modifier(VK_LCOMMAND, VK_C) + with_modifier(VK_LCOMMAND, VK_TAB) + with_modifier(VK_LCOMMAND, VK_V),
+    "copy & paste, Cmd held"             : with_modifier(VK_LCOMMAND, VK_C, VK_TAB, VK_V),
+    "select words with Shift-Alt-Right"  : [ (VK_LSHIFT, True) ] + with_modifier(VK_LALT, VK_RIGHT) + with_modifier(VK_LALT, VK_RIGHT) + [ (VK_LSHIFT, False) ],
+    "edit lines"                         : stroke(VK_HOME) + with_modifier(VK_LSHIFT, VK_END) + with_modifier(VK_LCOMMAND, VK_X) + stroke(VK_DOWN),
+    "plain typing"                       : stroke(VK_H) + stroke(VK_E) + stroke(VK_L) + stroke(VK_L) + stroke(VK_O),
+}
+
+held_modifiers = {
+    "none"      : [],
+    "Cmd"       : [ VK_LCOMMAND ],
+    "Cmd-Shift" : [ VK_LCOMMAND, VK_LSHIFT ],
+}
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--repeat", type=int, default=200, help="number of playbacks per measurement")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    results = []
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        keymap.configure()
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+        sent_events = keyhac_core.Hook.sent_events
+
+        def playback(optimize):
+            keymap.optimize_key_events = optimize
+            num_sent_events_start = len(sent_events)
+            start_time = time.perf_counter_ns()
+            for i in range(args.repeat):
+                keymap.replay_buffer.playback()
+            elapsed = time.perf_counter_ns() - start_time
+            return (len(sent_events) - num_sent_events_start) // args.repeat, elapsed / args.repeat
+
+        for macro_name, seq in macros.items():
+            for held_name, held_vks in held_modifiers.items():
+
+                keymap.replay_buffer.seq = list(seq)
+
+                for vk in held_vks:
+                    on_key( (vk << 8) | KEY_EVENT_TYPE_DOWN )
+
+                num_events, time_without = playback(False)
+                num_optimized_events, time_with = playback(True)
+
+                for vk in reversed(held_vks):
+                    on_key( (vk << 8) | KEY_EVENT_TYPE_UP )
+
+                results.append({
+                    "macro": macro_name,
+                    "held_modifiers": held_name,
+                    "events": num_events,
+                    "optimized_events": num_optimized_events,
+                    "reduction_percent": 100 * (num_events - num_optimized_events) / num_events if num_events else 0,
+                    "playback_usec": time_without / 1000,
+                    "optimized_playback_usec": time_with / 1000,
+                })
+
+        keymap.optimize_key_events = True
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print(f"{'Macro':36s} {'Held':10s} {'Events':>7s} {'Optimized':>10s} {'Reduction':>10s} {'Playback (usec)':>16s} {'Optimized':>10s}")
+        for result in results:
+            print( f"{result['macro']:36s} {result['held_modifiers']:10s} {result['events']:7d} {result['optimized_events']:10d}"
+                f" {result['reduction_percent']:9.1f}% {result['playback_usec']:16.1f} {result['optimized_playback_usec']:10.1f}" )
+
+
+if __name__ == "__main__":
+    main()
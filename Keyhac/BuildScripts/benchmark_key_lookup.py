@@ -0,0 +1,140 @@
+import sys
+import os
+import time
+import json
+import shutil
+import argparse
+import itertools
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_key import KeyCondition
+from keyhac_const import *
+
+
+description = """
+Measure the cost of key table lookups as the number of bindings on the same key grows,
+using the pure Python emulator of keyhac_core.
+The compiled integer dispatch table is compared with a dictionary keyed by KeyCondition objects,
+where all bindings of the same key share one hash bucket.
+"""
+
+
+def binding_expressions(num_bindings):
+
+    # Distinct left/right specific modifier combinations on the J key, and their key-up variations.
+    # "LShift-LCtrl-J" comes first, so that it is bound at any size.
+    modifiers = [ ("LShift", "RShift", None), ("LCtrl", "RCtrl", None), ("LAlt", "RAlt", None), ("LCmd", "RCmd", None) ]
+    expressions = [ "LShift-LCtrl-J" ]
+    for prefix in ( "", "U-" ):
+        for combination in itertools.product(*modifiers):
+            expression = prefix + "-".join( [ mod for mod in combination if mod ] + ["J"] )
+            if expression not in expressions:
+                expressions.append(expression)
+    return expressions[:num_bindings]
+
+
+def measure(func, repeat):
+    start_time = time.perf_counter_ns()
+    for i in range(repeat):
+        func()
+    return (time.perf_counter_ns() - start_time) / repeat
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default="1,2,5,10,20,50,100", help="comma separated numbers of bindings per key")
+    parser.add_argument("--repeat", type=int, default=20000, help="number of lookups per measurement")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    sizes = [ int(size) for size in args.sizes.split(",") ]
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    results = []
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+
+        def press(*vks):
+            for vk in vks:
+                on_key( (vk << 8) | KEY_EVENT_TYPE_DOWN )
+
+        def release(*vks):
+            for vk in reversed(vks):
+                on_key( (vk << 8) | KEY_EVENT_TYPE_UP )
+
+        for size in sizes:
+
+            keymap.configure()
+            keytable = keymap.define_keytable( focus_path_pattern="*" )
+
+            expressions = binding_expressions(size)
+            legacy_table = {}
+            for expression in expressions:
+                keytable[expression] = "A"
+                legacy_table[KeyCondition.from_str(expression)] = "A"
+
+            hit = KeyCondition( VK_J, MODKEY_SHIFT_L | MODKEY_CTRL_L )
+            hit_code = hit.to_code()
+            last = KeyCondition.from_str(expressions[-1])
+            miss = KeyCondition( VK_J, MODKEY_FN_L )
+            miss_code = miss.to_code()
+            compiled_table = keytable.compiled_table
+
+            result = {
+                "bindings": len(expressions),
+                "compiled_hit_nsec": measure( lambda: compiled_table.get(hit_code), args.repeat ),
+                "compiled_miss_nsec": measure( lambda: compiled_table.get(miss_code), args.repeat ),
+                "legacy_last_nsec": measure( lambda: legacy_table.get(last), args.repeat ),
+                "legacy_miss_nsec": measure( lambda: legacy_table.get(miss), args.repeat ),
+            }
+
+            # End-to-end key down/up through the keyboard hook, with modifiers held
+            press(VK_LSHIFT, VK_LCONTROL)
+            result["hook_hit_usec"] = measure( lambda: (press(VK_J), release(VK_J)), args.repeat // 10 ) / 1000
+            release(VK_LSHIFT, VK_LCONTROL)
+
+            press(VK_FUNCTION)
+            result["hook_miss_usec"] = measure( lambda: (press(VK_J), release(VK_J)), args.repeat // 10 ) / 1000
+            release(VK_FUNCTION)
+
+            results.append(result)
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print("                 compiled (nsec)    KeyCondition (nsec)    hook down+up (usec)")
+        print("Bindings/key       hit     miss        last     miss          hit     miss")
+        for result in results:
+            print( f"{result['bindings']:12d} {result['compiled_hit_nsec']:8.0f} {result['compiled_miss_nsec']:8.0f}"
+                f"    {result['legacy_last_nsec']:8.0f} {result['legacy_miss_nsec']:8.0f}"
+                f"     {result['hook_hit_usec']:8.1f} {result['hook_miss_usec']:8.1f}" )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import json
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_const import *
+
+
+description = """
+Compare the compact integer payload of the keyboard hook ( keyCode << 8 | event type code )
+with the JSON string payload kept as a compatibility fallback, using the pure Python emulator of keyhac_core.
+Decoding alone and the whole keyboard hook callback are measured for a typing workload.
+"""
+
+
+def typing_events(num_strokes):
+    letters = [ VK_H, VK_E, VK_L, VK_L, VK_O, VK_SPACE, VK_W, VK_O, VK_R, VK_L, VK_D, VK_RETURN ]
+    events = []
+    for i in range(num_strokes):
+        vk = letters[ i % len(letters) ]
+        events.append( (KEY_EVENT_TYPE_DOWN, vk) )
+        events.append( (KEY_EVENT_TYPE_UP, vk) )
+    return events
+
+
+def json_payload(event_type, vk):
+    # Same format as the native keyboard hook used to send
+    type_name = { KEY_EVENT_TYPE_DOWN: "keyDown", KEY_EVENT_TYPE_UP: "keyUp" }[event_type]
+    return json.dumps( { "type": type_name, "keyCode": vk } )
+
+
+def measure(func, payloads, repeat):
+    start_time = time.perf_counter_ns()
+    for i in range(repeat):
+        for payload in payloads:
+            func(payload)
+    return (time.perf_counter_ns() - start_time) / (repeat * len(payloads))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--strokes", type=int, default=1000, help="number of key strokes of the typing workload")
+    parser.add_argument("--repeat", type=int, default=10, help="number of times to feed the workload")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    events = typing_events(args.strokes)
+    int_payloads = [ (vk << 8) | event_type for event_type, vk in events ]
+    json_payloads = [ json_payload(event_type, vk) for event_type, vk in events ]
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        keymap.configure()
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+
+        def decode_int(payload):
+            return payload & 0xff, payload >> 8
+
+        # Both decoders must agree
+        assert [ decode_int(payload) for payload in int_payloads ] == [ keymap._decode_key_json(payload) for payload in json_payloads ]
+
+        result = {
+            "events": len(events),
+            "decode_int_nsec": measure( decode_int, int_payloads, args.repeat ),
+            "decode_json_nsec": measure( keymap._decode_key_json, json_payloads, args.repeat ),
+            "callback_int_usec": measure( on_key, int_payloads, args.repeat ) / 1000,
+            "callback_json_usec": measure( on_key, json_payloads, args.repeat ) / 1000,
+        }
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print()
+        print(f"Key events        : {result['events']} x {args.repeat}")
+        print(f"Decode (nsec)     : int {result['decode_int_nsec']:.0f}, JSON {result['decode_json_nsec']:.0f}")
+        print(f"Callback (usec)   : int {result['callback_int_usec']:.2f}, JSON {result['callback_json_usec']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
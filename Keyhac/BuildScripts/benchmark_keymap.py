@@ -0,0 +1,178 @@
+import sys
+import os
+import time
+import json
+import random
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_capture import HookCapture, read_capture, RECORD_KEY, RECORD_FOCUS
+from keyhac_const import *
+
+
+description = """
+Replay a hook traffic capture (recorded by Keymap.start_capture()) through Keymap headlessly,
+using the pure Python emulator of keyhac_core, and report throughput, per-event latency and core API calls.
+"""
+
+
+def synthesize_capture(filename, num_strokes, seed):
+
+    # Typing-like workload: letters, modifier combinations and occasional focus changes
+    rand = random.Random(seed)
+
+    letters = [ VK_A, VK_S, VK_D, VK_F, VK_J, VK_K, VK_L, VK_O, VK_X, VK_SPACE, VK_RETURN ]
+    modifiers = [ VK_LSHIFT, VK_LCOMMAND, VK_LCONTROL ]
+
+    # Key strokes configured in the sample configuration, and safe to run headlessly
+    configured_strokes = [ (VK_FUNCTION, VK_L), (VK_LCONTROL, VK_X), (VK_LCONTROL, VK_O) ]
+    focus_snapshots = [
+        [ ["AXApplication", "Xcode"], ["AXWindow", "main.swift"], ["AXTextArea", ""] ],
+        [ ["AXApplication", "Terminal"], ["AXWindow", "bash"], ["AXTextArea", "shell"] ],
+        [ ["AXApplication", "Safari"], ["AXWindow", "Keyhac"], ["AXWebArea", ""] ],
+    ]
+
+    capture = HookCapture(filename)
+    try:
+        focus_elm = None
+        for i in range(num_strokes):
+
+            if i % 200 == 0:
+                keyhac_core.set_focus( rand.choice(focus_snapshots) )
+                focus_elm = keyhac_core.UIElement.focused_application.get_attribute_value("AXFocusedUIElement")
+
+            r = rand.random()
+            if r < 0.05:
+                mod_vk, vk = rand.choice(configured_strokes)
+            elif r < 0.25:
+                mod_vk, vk = rand.choice(modifiers), rand.choice(letters)
+            else:
+                mod_vk, vk = None, rand.choice(letters)
+
+            if mod_vk is not None:
+                capture.record_key( (mod_vk << 8) | KEY_EVENT_TYPE_DOWN, focus_elm )
+            capture.record_key( (vk << 8) | KEY_EVENT_TYPE_DOWN, focus_elm )
+            capture.record_key( (vk << 8) | KEY_EVENT_TYPE_UP, focus_elm )
+            if mod_vk is not None:
+                capture.record_key( (mod_vk << 8) | KEY_EVENT_TYPE_UP, focus_elm )
+    finally:
+        capture.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[ min( int(len(sorted_values) * p / 100), len(sorted_values) - 1 ) ]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("capture", help="capture file to replay")
+    parser.add_argument("--config", default=os.path.join(this_directory, "../Python/_config.py"), help="configuration script (default: the sample configuration)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of times to replay the capture")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="write a synthetic capture of N key strokes to the capture file before replaying")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --synthesize")
+    parser.add_argument("--tree", help="JSON file of the simulated accessibility tree (see keyhac_core.load_tree() of the emulator)")
+    parser.add_argument("--inject", action="append", default=[], metavar="API:LATENCY[:FAILURE_RATE]", help="inject latency in seconds and failure rate to an emulated API (e.g., UIElement.get_attribute_value:0.0001:0.01)")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    if args.tree:
+        with open(args.tree) as fd:
+            keyhac_core.load_tree(json.load(fd))
+
+    if args.synthesize:
+        synthesize_capture(args.capture, args.synthesize, args.seed)
+
+    records = list(read_capture(args.capture))
+
+    # Run with a temporary home directory, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    shutil.copyfile(args.config, os.path.join(home_dir, ".keyhac/config.py"))
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        keymap.configure()
+
+        for injection in args.inject:
+            api, latency, *failure_rate = injection.split(":")
+            keyhac_core.inject( api, float(latency), float(failure_rate[0]) if failure_rate else 0.0 )
+
+        keyhac_core.call_counts.clear()
+
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+        sent_events = keyhac_core.Hook.sent_events
+        num_sent_events_start = len(sent_events)
+
+        latencies = []
+        num_focus_changes = 0
+
+        start_time = time.perf_counter()
+
+        for i in range(args.repeat):
+            for record_type, delta, data in records:
+                if record_type == RECORD_KEY:
+                    t = time.perf_counter_ns()
+                    on_key(data)
+                    latencies.append( time.perf_counter_ns() - t )
+                elif record_type == RECORD_FOCUS:
+                    keyhac_core.set_focus(data)
+                    num_focus_changes += 1
+
+        elapsed = time.perf_counter() - start_time
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    latencies.sort()
+    num_key_events = len(latencies)
+    num_emitted_events = len(sent_events) - num_sent_events_start
+
+    result = {
+        "key_events": num_key_events,
+        "focus_changes": num_focus_changes,
+        "elapsed_sec": elapsed,
+        "events_per_sec": num_key_events / elapsed if elapsed else 0,
+        "latency_usec": {
+            "p50": percentile(latencies, 50) / 1000,
+            "p90": percentile(latencies, 90) / 1000,
+            "p99": percentile(latencies, 99) / 1000,
+            "p99.9": percentile(latencies, 99.9) / 1000,
+            "max": (latencies[-1] / 1000) if latencies else 0,
+        },
+        "emitted_events": num_emitted_events,
+        "core_calls": dict(keyhac_core.call_counts.most_common()),
+        "injected_failures": dict(keyhac_core.failure_counts),
+    }
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print()
+        print(f"Key events     : {num_key_events} ({num_focus_changes} focus changes)")
+        print(f"Elapsed        : {elapsed:.3f} sec")
+        print(f"Throughput     : {result['events_per_sec']:.0f} events/sec")
+        print("Latency (usec) : " + ", ".join( f"{name} {value:.1f}" for name, value in result["latency_usec"].items() ))
+        print(f"Emitted events : {num_emitted_events}")
+        print("Core API calls : " + ", ".join( f"{name} {count}" for name, count in result["core_calls"].items() ))
+        if result["injected_failures"]:
+            print("Injected fails : " + ", ".join( f"{name} {count}" for name, count in result["injected_failures"].items() ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import sys
+import os
+import time
+import json
+import random
+import shutil
+import argparse
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+import keyhac_console
+from keyhac_input import InputContext
+from keyhac_const import *
+
+
+description = """
+Measure the cost of sending modifier keys with InputContext, for long generated key sequences
+such as typing a 500 character string, using the pure Python emulator of keyhac_core.
+ModifierTransitions is compared with scanning the modifier key table for each key,
+and the key events sent by both are checked to be identical.
+"""
+
+
+class ScanInputContext(InputContext):
+
+    # InputContext before ModifierTransitions was introduced, as the baseline
+
+    def send_modifier_keys(self, mod):
+
+        vk_mod_map = self._keymap._vk_mod_map
+
+        # Key down modifier keys
+        for vk_mod in vk_mod_map.items():
+            # Ignore user modifier keys (when not replay mode), otherwise it causes key events of original meaning
+            if (vk_mod[1] & MODKEY_USER_ALL) and (not self._replay):
+                continue
+            if not ( vk_mod[1] & self._virtual_modifier ) and ( vk_mod[1] & mod ):
+                self._input_seq.append( ("keyDown", vk_mod[0]) )
+                self._virtual_modifier |= vk_mod[1]
+
+        # Key up modifier keys
+        for vk_mod in vk_mod_map.items():
+            # Ignore user modifier keys (when not replay mode), otherwise it causes key events of original meaning
+            if (vk_mod[1] & MODKEY_USER_ALL) and (not self._replay):
+                continue
+            if ( vk_mod[1] & self._virtual_modifier ) and not ( vk_mod[1] & mod ):
+                self._input_seq.append( ("keyUp", vk_mod[0]) )
+                self._virtual_modifier &= ~vk_mod[1]
+
+
+def typing_sequence(length, rand):
+
+    # Text with capital letters and symbols, and occasional shortcuts
+    lower = "abcdefghijklmnopqrstuvwxyz"
+    shifted_symbols = { "!": "1", "?": "Slash", ":": "Semicolon", "(": "9", ")": "0" }
+
+    keys = []
+    for i in range(length):
+        r = rand.random()
+        if r < 0.15:
+            keys.append( "Space" )
+        elif r < 0.25:
+            keys.append( "Shift-" + rand.choice(lower).upper() )
+        elif r < 0.30:
+            keys.append( "Shift-" + rand.choice(list(shifted_symbols.values())) )
+        elif r < 0.33:
+            keys.append( rand.choice([ "Cmd-S", "Cmd-Z", "Cmd-Shift-Z", "Alt-Left", "Alt-Shift-Right" ]) )
+        else:
+            keys.append( rand.choice(lower).upper() )
+    return keys
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--length", type=int, default=500, help="number of keys of the typing sequence")
+    parser.add_argument("--repeat", type=int, default=50, help="number of times to send the sequence")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the sequence")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    keys = typing_sequence(args.length, random.Random(args.seed))
+
+    # Run with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_benchmark_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    results = []
+
+    try:
+        from keyhac_main import Keymap
+
+        keymap = Keymap.get_instance()
+        keymap.configure()
+        on_key = keyhac_core.Hook.callbacks["Keyboard"]
+        sent_events = keyhac_core.Hook.sent_events
+
+        # Compare the modifier key handling only
+        keymap.optimize_key_events = False
+
+        def send(input_context_class):
+            num_sent_events_start = len(sent_events)
+            start_time = time.perf_counter_ns()
+            for i in range(args.repeat):
+                with input_context_class(keymap) as input_ctx:
+                    for key in keys:
+                        input_ctx.send_key(key)
+            elapsed = time.perf_counter_ns() - start_time
+            return sent_events[num_sent_events_start:], elapsed / args.repeat
+
+        for held_name, held_vks in ( ("none", []), ("Cmd", [VK_LCOMMAND]), ("Shift-Ctrl", [VK_LSHIFT, VK_LCONTROL]) ):
+
+            for vk in held_vks:
+                on_key( (vk << 8) | KEY_EVENT_TYPE_DOWN )
+
+            scan_events, scan_time = send(ScanInputContext)
+            table_events, table_time = send(InputContext)
+
+            for vk in reversed(held_vks):
+                on_key( (vk << 8) | KEY_EVENT_TYPE_UP )
+
+            if scan_events != table_events:
+                raise AssertionError(f"ModifierTransitions sent different key events from the scan (held modifiers: {held_name})")
+
+            results.append({
+                "held_modifiers": held_name,
+                "keys": len(keys),
+                "events": len(table_events) // args.repeat,
+                "scan_usec": scan_time / 1000,
+                "transitions_usec": table_time / 1000,
+            })
+
+        keymap.optimize_key_events = True
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # Write console output of the keymap first, not to mix with the result
+    keyhac_console.ConsoleWriter.get_instance().flush()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print("Held modifiers   Keys   Events   scan (usec)   ModifierTransitions (usec)")
+        for result in results:
+            print( f"{result['held_modifiers']:14s} {result['keys']:6d} {result['events']:8d} {result['scan_usec']:13.1f} {result['transitions_usec']:28.1f}" )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import sys
+import os
+import time
+import json
+import random
+import argparse
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+from keyhac_window import WindowEdgeIndex
+
+
+description = """
+Measure the cost of finding the nearest window edge blocking a moving window (MoveWindow with window_edge=True),
+with synthetic window layouts over several screens.
+WindowEdgeIndex is compared with scanning all window frames, and the results of both are checked to be identical.
+Repeated moves (e.g., auto-repeated MoveWindow) are also measured including the cost to keep the index up to date,
+by rebuilding the index for each move, and by updating it in place as WindowIndex does.
+"""
+
+screens = [ (0, 0, 2560, 1440), (2560, 0, 1920, 1080), (-1920, 0, 1920, 1200) ]
+
+directions = ( "left", "right", "up", "down" )
+
+
+def synthesize_frames(num_windows, rand):
+    frames = []
+    for i in range(num_windows):
+        sx, sy, sw, sh = rand.choice(screens)
+        w = rand.randint(200, sw // 2)
+        h = rand.randint(150, sh // 2)
+        x = sx + rand.randint(0, sw - w)
+        y = sy + rand.randint(0, sh - h)
+        frames.append( [x, y, w, h] )
+    return frames
+
+
+def synthesize_queries(frames, num_queries, rand):
+
+    # Moving windows are windows of the layout, same as MoveWindow
+    queries = []
+    for i in range(num_queries):
+        x, y, w, h = rand.choice(frames)
+        direction = rand.choice(directions)
+        if direction == "left":
+            queries.append( (direction, x, (y, y + h)) )
+        elif direction == "right":
+            queries.append( (direction, x + w, (y, y + h)) )
+        elif direction == "up":
+            queries.append( (direction, y, (x, x + w)) )
+        else:
+            queries.append( (direction, y + h, (x, x + w)) )
+    return queries
+
+
+def get_front_edge(frame, direction):
+    x, y, w, h = frame
+    if direction == "left":
+        return x, (y, y + h)
+    elif direction == "right":
+        return x + w, (y, y + h)
+    elif direction == "up":
+        return y, (x, x + w)
+    else:
+        return y + h, (x, x + w)
+
+
+def synthesize_moves(frames, num_moves, rand):
+
+    # Same window moved repeatedly in the same direction, as auto-repeated MoveWindow
+    moves = []
+    while len(moves) < num_moves:
+        i = rand.randrange(len(frames))
+        direction = rand.choice(directions)
+        for j in range( min(10, num_moves - len(moves)) ):
+            moves.append( (i, direction) )
+    return moves
+
+
+def move_frame(frame, direction, distance):
+    x, y, w, h = frame
+    if direction == "left":
+        return [x - distance, y, w, h]
+    elif direction == "right":
+        return [x + distance, y, w, h]
+    elif direction == "up":
+        return [x, y - distance, w, h]
+    else:
+        return [x, y + distance, w, h]
+
+
+def find_blocking_distance_by_scan(frames, direction, front_pos, front_range, min_distance):
+
+    # Same as the window edge loop of MoveWindow before WindowEdgeIndex was introduced
+    distance = None
+
+    for window_frame in frames:
+
+        if direction=="left":
+            window_edge_pos = window_frame[0] + window_frame[2]
+            window_edge_range = (window_frame[1], window_frame[1] + window_frame[3])
+            sign = -1
+        elif direction=="right":
+            window_edge_pos = window_frame[0]
+            window_edge_range = (window_frame[1], window_frame[1] + window_frame[3])
+            sign = 1
+        elif direction=="up":
+            window_edge_pos = window_frame[1] + window_frame[3]
+            window_edge_range = (window_frame[0], window_frame[0] + window_frame[2])
+            sign = -1
+        elif direction=="down":
+            window_edge_pos = window_frame[1]
+            window_edge_range = (window_frame[0], window_frame[0] + window_frame[2])
+            sign = 1
+
+        if not( front_range[1] <= window_edge_range[0] or front_range[0] >= window_edge_range[1] ):
+            if (window_edge_pos - front_pos) * sign >= min_distance:
+                if distance is None or (window_edge_pos - front_pos) * sign < distance:
+                    distance = (window_edge_pos - front_pos) * sign
+
+    return distance
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default="10,50,100,500,1000,2000,5000", help="comma separated numbers of windows")
+    parser.add_argument("--queries", type=int, default=1000, help="number of queries per layout")
+    parser.add_argument("--moves", type=int, default=200, help="number of repeated moves per layout")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the layouts")
+    parser.add_argument("--json", action="store_true", help="print the result in JSON")
+    args = parser.parse_args()
+
+    sizes = [ int(size) for size in args.sizes.split(",") ]
+    rand = random.Random(args.seed)
+
+    # Same minimum distance as MoveWindow (gap of 1 pixel, and 0.1 pixel threshold)
+    min_distance = 1.1
+
+    results = []
+
+    for size in sizes:
+
+        frames = synthesize_frames(size, rand)
+        queries = synthesize_queries(frames, args.queries, rand)
+
+        start_time = time.perf_counter_ns()
+        edge_index = WindowEdgeIndex(frames)
+        build_time = time.perf_counter_ns() - start_time
+
+        start_time = time.perf_counter_ns()
+        index_results = [ edge_index.find_blocking_distance(direction, front_pos, front_range, min_distance) for direction, front_pos, front_range in queries ]
+        index_time = time.perf_counter_ns() - start_time
+
+        start_time = time.perf_counter_ns()
+        scan_results = [ find_blocking_distance_by_scan(frames, direction, front_pos, front_range, min_distance) for direction, front_pos, front_range in queries ]
+        scan_time = time.perf_counter_ns() - start_time
+
+        if index_results != scan_results:
+            mismatches = sum( 1 for a, b in zip(index_results, scan_results) if a != b )
+            raise AssertionError(f"WindowEdgeIndex returned different results from the scan for {mismatches} queries ({size} windows)")
+
+        # Repeated moves, each followed by the frame change of the moved window
+        moves = synthesize_moves(frames, args.moves, rand)
+
+        def run_moves(mode):
+
+            move_frames = [ frame[:] for frame in frames ]
+            edge_index = WindowEdgeIndex(move_frames)
+            move_results = []
+
+            start_time = time.perf_counter_ns()
+            for i, direction in moves:
+                front_pos, front_range = get_front_edge(move_frames[i], direction)
+                if mode == "scan":
+                    move_results.append( find_blocking_distance_by_scan(move_frames, direction, front_pos, front_range, min_distance) )
+                else:
+                    move_results.append( edge_index.find_blocking_distance(direction, front_pos, front_range, min_distance) )
+                old_frame = move_frames[i]
+                move_frames[i] = move_frame(old_frame, direction, 20)
+                if mode == "rebuild":
+                    edge_index = WindowEdgeIndex(move_frames)
+                elif mode == "update":
+                    edge_index.update( [old_frame], [move_frames[i]] )
+            elapsed = time.perf_counter_ns() - start_time
+
+            return move_results, elapsed / len(moves)
+
+        scan_move_results, scan_move_time = run_moves("scan")
+        rebuild_move_results, rebuild_move_time = run_moves("rebuild")
+        update_move_results, update_move_time = run_moves("update")
+
+        if not( scan_move_results == rebuild_move_results == update_move_results ):
+            raise AssertionError(f"WindowEdgeIndex returned different results from the scan for repeated moves ({size} windows)")
+
+        results.append({
+            "windows": size,
+            "build_usec": build_time / 1000,
+            "index_query_usec": index_time / len(queries) / 1000,
+            "scan_query_usec": scan_time / len(queries) / 1000,
+            "scan_move_usec": scan_move_time / 1000,
+            "rebuild_move_usec": rebuild_move_time / 1000,
+            "update_move_usec": update_move_time / 1000,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("Windows   index build   index query   scan query   move: scan   rebuild   update   (usec)")
+        for result in results:
+            print( f"{result['windows']:7d} {result['build_usec']:13.1f} {result['index_query_usec']:13.2f} {result['scan_query_usec']:12.2f}"
+                f" {result['scan_move_usec']:12.2f} {result['rebuild_move_usec']:9.2f} {result['update_move_usec']:8.2f}" )
+
+
+if __name__ == "__main__":
+    main()
@@ -30,8 +30,12 @@ api_names = [
     "FocusCondition",
     "InputContext",
     "MoveWindow",
+    "LayoutWindows",
+    "SaveWindowLayout",
+    "RestoreWindowLayout",
     "LaunchApplication",
     "ThreadedAction",
+    "AsyncAction",
     "ShowClipboardHistory",
     "ShowClipboardSnippets",
     "ShowClipboardTools",
@@ -42,6 +46,9 @@ api_names = [
     "ChooserAction",
     "UIElement",
     "ClipboardHistory",
+    "WindowIndex",
+    "ScreenTopology",
+    "Tracer",
     "Console",
     "Hook",
     "Clipboard",
@@ -0,0 +1,105 @@
+import sys
+import os
+import time
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+from keyhac_focus import FocusTracker
+
+
+# Tests of notification-driven refresh and revalidation of FocusTracker, with the pure Python emulator of keyhac_core.
+# Run with pytest, or directly with python.
+
+text_edit_path = "/AXApplication(TextEdit)/AXWindow(Untitled)/AXTextArea()"
+terminal_path = "/AXApplication(Terminal)/AXWindow(bash)/AXTextArea()"
+
+
+def setup_tracker(revalidation_interval=60.0):
+
+    keyhac_core.reset_tree()
+    keyhac_core.set_focus( [ ["AXApplication", "Terminal"], ["AXWindow", "bash"], ["AXTextArea", ""] ] )
+
+    # Installs the "Focus" hook callback
+    tracker = FocusTracker()
+    tracker.revalidation_interval = revalidation_interval
+    return tracker
+
+
+def num_focus_queries():
+    return keyhac_core.call_counts["UIElement.get_focused_application"]
+
+
+def switch_focus_silently(snapshot):
+
+    # Focus change without the notification, as when the notification is lost
+    callback = keyhac_core.Hook.callbacks.pop("Focus")
+    try:
+        keyhac_core.set_focus(snapshot)
+    finally:
+        keyhac_core.Hook.callbacks["Focus"] = callback
+
+
+def test_notification_refreshes_focus():
+
+    tracker = setup_tracker()
+
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+    num_queries = num_focus_queries()
+
+    elm, focus_path = tracker.get()
+    assert focus_path == text_edit_path
+    assert elm.get_attribute_value("AXRole") == "AXTextArea"
+
+    # The notification already refreshed the cache
+    assert num_focus_queries() == num_queries
+
+
+def test_no_query_before_revalidation_interval():
+
+    tracker = setup_tracker()
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    switch_focus_silently( [ ["AXApplication", "Terminal"], ["AXWindow", "bash"], ["AXTextArea", ""] ] )
+    num_queries = num_focus_queries()
+
+    for i in range(10):
+        assert tracker.get()[1] == text_edit_path
+    assert num_focus_queries() == num_queries
+
+
+def test_query_after_revalidation_interval():
+
+    tracker = setup_tracker(revalidation_interval=0.05)
+    keyhac_core.set_focus( [ ["AXApplication", "TextEdit"], ["AXWindow", "Untitled"], ["AXTextArea", ""] ] )
+
+    switch_focus_silently( [ ["AXApplication", "Terminal"], ["AXWindow", "bash"], ["AXTextArea", ""] ] )
+    num_queries = num_focus_queries()
+
+    time.sleep(0.1)
+
+    assert tracker.get()[1] == terminal_path
+    assert num_focus_queries() == num_queries + 1
+
+    # Cached again until the next interval
+    assert tracker.get()[1] == terminal_path
+    assert num_focus_queries() == num_queries + 1
+
+
+def test_query_every_time_without_notification():
+
+    tracker = setup_tracker()
+    num_queries = num_focus_queries()
+
+    for i in range(3):
+        assert tracker.get()[1] == terminal_path
+    assert num_focus_queries() == num_queries + 3
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"{name}: OK")
@@ -0,0 +1,170 @@
+import sys
+import os
+import random
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+from keyhac_input import ModifierTransitions, KeyEventOptimizer
+from keyhac_const import *
+
+
+# Property-based tests of KeyEventOptimizer, with randomly generated key event sequences.
+# Run with pytest, or directly with python.
+
+vk_mod_map = {
+    VK_LSHIFT   : MODKEY_SHIFT_L,
+    VK_RSHIFT   : MODKEY_SHIFT_R,
+    VK_LCONTROL : MODKEY_CTRL_L,
+    VK_LALT     : MODKEY_ALT_L,
+    VK_LCOMMAND : MODKEY_CMD_L,
+    VK_RCOMMAND : MODKEY_CMD_R,
+    VK_FUNCTION : MODKEY_FN_L,
+    VK_F13      : MODKEY_USER0_L,     # User modifier key
+}
+
+non_modifier_vks = [ VK_A, VK_B, VK_LEFT, VK_RIGHT ]
+
+num_examples = 2000
+
+
+def random_events(rand):
+
+    # Arbitrary sequences, including unbalanced key ups and repeated key downs
+    vks = list(vk_mod_map.keys()) + non_modifier_vks
+    return [ ( rand.choice(("keyDown", "keyUp")), rand.choice(vks) ) for i in range(rand.randint(0, 30)) ]
+
+
+def input_context_events(rand):
+
+    # Sequences built the same way as InputContext: modifier transitions, key strokes,
+    # and the transition back to the real modifier state at the end
+    transitions = ModifierTransitions(vk_mod_map, replay=rand.random() < 0.5)
+    mods = list(vk_mod_map.values())
+
+    def random_modifier():
+        mod = 0
+        for i in range(rand.randint(0, 3)):
+            mod |= rand.choice(mods)
+        return mod
+
+    real_modifier = random_modifier()
+    virtual_modifier = real_modifier
+    events = []
+
+    for i in range(rand.randint(0, 10)):
+        new_events, virtual_modifier = transitions.get(virtual_modifier, random_modifier())
+        events.extend(new_events)
+        vk = rand.choice(non_modifier_vks)
+        events.append( ("keyDown", vk) )
+        events.append( ("keyUp", vk) )
+
+    new_events, virtual_modifier = transitions.get(virtual_modifier, real_modifier)
+    events.extend(new_events)
+
+    return events
+
+
+def initial_state(events):
+
+    # Modifier keys released before being pressed are pressed before the sequence, as KeyEventOptimizer assumes
+    pressed = set()
+    seen = set()
+    for event_type, vk in events:
+        if vk in vk_mod_map and vk not in seen:
+            seen.add(vk)
+            if event_type=="keyUp":
+                pressed.add(vk)
+    return pressed
+
+
+def observed_states(events, initial):
+
+    # Pressed keys seen by each key event including modifier key events, and the final pressed keys
+    pressed = set(initial)
+    observed = []
+    for event_type, vk in events:
+        observed.append( (event_type, vk, frozenset(pressed)) )
+        if event_type=="keyDown":
+            pressed.add(vk)
+        else:
+            pressed.discard(vk)
+    return observed, frozenset(pressed)
+
+
+def is_subsequence(events, original):
+    it = iter(original)
+    return all( any( event == candidate for candidate in it ) for event in events )
+
+
+def check_properties(events):
+
+    optimizer = KeyEventOptimizer(vk_mod_map)
+    optimized = optimizer.optimize(list(events))
+
+    # Every remaining key event observes the same key state as in the original sequence,
+    # and the final key state is preserved
+    initial = initial_state(events)
+    optimized_observed, optimized_final = observed_states(optimized, initial)
+    original_observed, original_final = observed_states(events, initial)
+    assert is_subsequence(optimized_observed, original_observed), (events, optimized)
+    assert optimized_final == original_final, (events, optimized)
+
+    # Non-modifier key events are never removed
+    assert [ event for event in optimized if event[1] not in vk_mod_map ] == [ event for event in events if event[1] not in vk_mod_map ]
+
+    # Events are only removed, never added or reordered
+    assert is_subsequence(optimized, events), (events, optimized)
+    assert optimizer.num_input_events - optimizer.num_removed_events == len(optimized)
+
+    # User modifier keys are never removed
+    assert [ event for event in optimized if event[1]==VK_F13 ] == [ event for event in events if event[1]==VK_F13 ]
+
+    # Optimized sequences can't be optimized further
+    assert KeyEventOptimizer(vk_mod_map).optimize(list(optimized)) == optimized, (events, optimized)
+
+
+def test_random_sequences():
+    rand = random.Random(1)
+    for i in range(num_examples):
+        check_properties(random_events(rand))
+
+
+def test_input_context_sequences():
+    rand = random.Random(2)
+    for i in range(num_examples):
+        check_properties(input_context_events(rand))
+
+
+def test_redundant_release_removed():
+    events = [ ("keyDown", VK_LCOMMAND), ("keyDown", VK_A), ("keyUp", VK_A), ("keyUp", VK_LCOMMAND),
+               ("keyDown", VK_LCOMMAND), ("keyDown", VK_B), ("keyUp", VK_B), ("keyUp", VK_LCOMMAND) ]
+    optimized = KeyEventOptimizer(vk_mod_map).optimize(events)
+    assert optimized == [ ("keyDown", VK_LCOMMAND), ("keyDown", VK_A), ("keyUp", VK_A),
+                          ("keyDown", VK_B), ("keyUp", VK_B), ("keyUp", VK_LCOMMAND) ]
+
+
+def test_modifier_tap_preserved():
+    events = [ ("keyDown", VK_LCOMMAND), ("keyUp", VK_LCOMMAND), ("keyDown", VK_LCOMMAND), ("keyUp", VK_LCOMMAND) ]
+    assert KeyEventOptimizer(vk_mod_map).optimize(events) == events
+
+
+def test_release_around_modifier_tap_preserved():
+    # Shift tap without Cmd must not become Cmd-Shift tap
+    events = [ ("keyUp", VK_LCOMMAND), ("keyDown", VK_LSHIFT), ("keyUp", VK_LSHIFT), ("keyDown", VK_LCOMMAND) ]
+    assert KeyEventOptimizer(vk_mod_map).optimize(events) == events
+
+
+def test_nested_redundant_releases_removed():
+    events = [ ("keyDown", VK_A), ("keyUp", VK_A), ("keyUp", VK_LCOMMAND), ("keyUp", VK_LSHIFT),
+               ("keyDown", VK_LSHIFT), ("keyDown", VK_LCOMMAND), ("keyDown", VK_B), ("keyUp", VK_B) ]
+    optimized = KeyEventOptimizer(vk_mod_map).optimize(events)
+    assert optimized == [ ("keyDown", VK_A), ("keyUp", VK_A), ("keyDown", VK_B), ("keyUp", VK_B) ]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"{name}: OK")
@@ -0,0 +1,115 @@
+import sys
+import os
+import shutil
+import tempfile
+
+this_directory = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(this_directory, "../Python"))
+sys.path.insert(0, os.path.join(this_directory, "../Emulator"))
+
+import keyhac_core
+from keyhac_window import ScreenTopology
+from keyhac_const import *
+
+
+# Tests of screen adjacency with the tolerance, with screen frames of the pure Python emulator of keyhac_core.
+# Run with pytest, or directly with python.
+
+main_screen = [ 0, 0, 1920, 1080 ]
+
+
+def set_screens(gap):
+    # Main screen, and a screen on the right of it with a gap
+    keyhac_core.UIElement.screen_frames = [ main_screen, [ 1920 + gap, 0, 1280, 1024 ] ]
+    return [ tuple(frame) for frame in keyhac_core.UIElement.get_screen_frames() ]
+
+
+def get_keymap():
+
+    # Keymap with a temporary home directory and an empty configuration, not to touch the user's ~/.keyhac
+    home_dir = tempfile.mkdtemp(prefix="keyhac_test_")
+    os.environ["HOME"] = home_dir
+    os.makedirs(os.path.join(home_dir, ".keyhac"))
+    with open(os.path.join(home_dir, ".keyhac/config.py"), "w") as fd:
+        fd.write("def configure(keymap):\n    pass\n")
+
+    try:
+        from keyhac_main import Keymap
+        keymap = Keymap.get_instance()
+        keymap.configure()
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    return keymap
+
+
+def test_adjacent_within_tolerance():
+    screens = set_screens(gap=30)
+    topology = ScreenTopology( keyhac_core.UIElement.get_screen_frames() )
+    assert topology.get_neighbour(screens[0], "right") == screens[1]
+    assert topology.get_neighbour(screens[1], "left") == screens[0]
+    assert topology.get_neighbours(screens[0], "right") == [ (1024, screens[1]) ]
+
+
+def test_not_adjacent_beyond_tolerance():
+    screens = set_screens(gap=80)
+    topology = ScreenTopology( keyhac_core.UIElement.get_screen_frames() )
+    assert topology.get_neighbour(screens[0], "right") is None
+    assert topology.get_neighbour(screens[1], "left") is None
+
+    topology = ScreenTopology( keyhac_core.UIElement.get_screen_frames(), adjacent_tolerance=100 )
+    assert topology.get_neighbour(screens[0], "right") == screens[1]
+
+
+def test_keymap_rebuilds_topology_for_tolerance():
+    keymap = get_keymap()
+    screens = set_screens(gap=80)
+
+    topology = keymap.get_screen_topology(50)
+    assert keymap.get_screen_topology(50) is topology
+    assert topology.get_neighbour(screens[0], "right") is None
+
+    topology = keymap.get_screen_topology(100)
+    assert topology.adjacent_tolerance == 100
+    assert keymap.get_screen_topology(100) is topology
+    assert topology.get_neighbour(screens[0], "right") == screens[1]
+
+    # Display configuration changed
+    screens = set_screens(gap=0)
+    assert keymap.get_screen_topology(100) is not topology
+
+
+def test_move_window_honors_tolerance():
+
+    from keyhac_action import MoveWindow
+
+    class WideGapMoveWindow(MoveWindow):
+        ADJACENT_SCREEN_TOLERANCE = 100
+
+    get_keymap()
+    screens = set_screens(gap=80)
+
+    keyhac_core.reset_tree()
+    app = keyhac_core.create_application("TextEdit")
+    wnd = keyhac_core.create_window(app, "Untitled", frame=(1920 - 800, 100, 800, 600))
+    keyhac_core.focus(wnd)
+
+    # Focus change is checked by key events
+    keyhac_core.input_key(VK_LSHIFT, True)
+    keyhac_core.input_key(VK_LSHIFT, False)
+
+    # Window at the right edge of the main screen. The next screen is too far with the default tolerance.
+    action = MoveWindow(direction="right")
+    action.starting()
+    assert action.run() == [ 1920 - 800, 100 ]
+
+    action = WideGapMoveWindow(direction="right")
+    action.starting()
+    assert action.run() == [ screens[1][0], 100 ]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"{name}: OK")
@@ -16,8 +16,15 @@ class Hook:
         Keyhac automatically sets callbacks to the core hook system.
         So you don't usually have to use this API directly.
 
+        The "Keyboard" callback receives a compact integer payload ( keyCode << 8 | event type code ),
+        where event type code is 1 for keyDown, 2 for keyUp and 3 for hookRestored.
+        For compatibility, a JSON string payload ( e.g., {"type": "keyDown", "keyCode": 0} ) is also accepted.
+
+        The "Focus" callback receives "appActivated" when another application is activated,
+        and "focusChanged" when the focused window or UI element changes within the frontmost application.
+
         Args:
-            name: name of the hook. Currently only "Keyboard" is supported.
+            name: name of the hook. "Keyboard", "Clipboard" or "Focus".
             func: callback function
         """
 
@@ -34,6 +41,20 @@ class Hook:
             key: keyCode
         """
 
+    @staticmethod
+    def send_keyboard_events(events: [(str, int)], replay: bool = False) -> None:
+        """
+        Send multiple virtual key input events at once.
+
+        This is faster than calling send_keyboard_event() for each event,
+        because it crosses the Python / native boundary only once.
+        Keyhac automatically uses this API via InputContext class.
+
+        Args:
+            events: list of (event_type, keyCode). event_type is "keyDown" or "keyUp".
+            replay: whether the events are for replay
+        """
+
     @staticmethod
     def get_keyboard_layout() -> str:
         """
@@ -96,6 +117,15 @@ class UIElement:
         Get currently running applications in a list of UIElements.
         """
 
+    def get_pid(self) -> int:
+        """
+        Get the process ID of the application this UI element belongs to.
+        Unlike application names, process IDs distinguish running applications with the same name.
+
+        Returns:
+            Process ID, or 0 if not available.
+        """
+
     def get_attribute_names(self) -> [str]:
         """
         Get a list of attribute names this UI element has.
@@ -168,15 +198,26 @@ class Console:
         """
         Set a text for special text field.
 
-        Keyhac automatically use this API to update the "Last key" 
-        and "Focus path" field in the Keyhac Console window.
+        Keyhac automatically use this API to update the "Last key",
+        "Focus path" and "Latency" field in the Keyhac Console window.
         So you don't usually have to use this API directly.
 
         Args:
-            name: "lastKey" or "focusPath"
+            name: "lastKey", "focusPath" or "latency"
             text: Contents of the special text field.
         """
 
+    @staticmethod
+    def get_log_level() -> int:
+        """
+        Get the current log level of the Keyhac Console.
+
+        Keyhac uses this API to decide whether key event traces should be written to the Keyhac Console.
+
+        Returns:
+            Log level. (10: Debug, 20: Info, 30: Warning, 40: Error, 50: Critical)
+        """
+
 class Chooser:
 
     """
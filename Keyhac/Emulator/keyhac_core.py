@@ -0,0 +1,705 @@
+"""
+Pure Python emulator of the keyhac_core native module
+
+This module allows running the Python layer of Keyhac without the macOS application,
+e.g. by the benchmark script (BuildScripts/benchmark_keymap.py) on Linux.
+Put this directory at the head of sys.path before importing keyhac.
+
+The emulator implements the API documented in DocumentSource/keyhac_core.py, and provides:
+
+- A simulated accessibility tree of applications, windows and UI elements.
+  Build it with create_application(), create_window() and create_element(), or load_tree().
+- Recording of key events sent by Keyhac (`Hook.sent_events`), and input_key() to feed key events to the keyboard hook.
+- An in-memory clipboard, which calls the "Clipboard" hook callback when it changes.
+- Per-call latency and failure injection by inject(), and per-call counters (`call_counts`).
+
+Unlike the native module, the same UIElement object is returned for the same element every time.
+"""
+
+import json
+import time
+import random
+import threading
+import collections
+
+
+# -----------------------------------------------------------------------------
+# Latency and failure injection
+
+call_counts = collections.Counter()      # Table of API name ("UIElement.get_attribute_value" etc) to number of calls
+failure_counts = collections.Counter()   # Table of API name to number of injected failures
+
+_injections = {}                         # Table of API name to ( latency, failure rate, exception )
+_random = random.Random(0)
+_next_pid = 1000
+
+
+def inject( api: str, latency: float = 0.0, failure_rate: float = 0.0, exception: Exception = None ) -> None:
+
+    """
+    Inject latency and failures to an API.
+
+    Injected failures behave as the native module does for OS level failures:
+    getters return None (or an empty value), and setters / actions do nothing.
+    When `exception` is given, it is raised instead.
+
+    Args:
+        api: API name in "Class.method" format (e.g., "UIElement.get_attribute_value")
+        latency: Seconds to wait in each call. The GIL is released while waiting, as the native module does.
+        failure_rate: Probability of failures, from 0.0 to 1.0
+        exception: Exception to raise for injected failures
+    """
+
+    _injections[api] = ( latency, failure_rate, exception )
+
+
+def clear_injections() -> None:
+
+    """
+    Remove all injected latency and failures.
+    """
+
+    _injections.clear()
+
+
+def seed(n: int) -> None:
+
+    """
+    Set the random seed for failure injection.
+
+    Args:
+        n: Random seed
+    """
+
+    _random.seed(n)
+
+
+def _emulated( api, failure_result=None ):
+
+    def decorator(func):
+
+        def wrapper(*args, **kwargs):
+
+            call_counts[api] += 1
+
+            injection = _injections.get(api)
+            if injection:
+                latency, failure_rate, exception = injection
+                if latency:
+                    time.sleep(latency)
+                if failure_rate and _random.random() < failure_rate:
+                    failure_counts[api] += 1
+                    if exception is not None:
+                        raise exception
+                    return failure_result() if callable(failure_result) else failure_result
+
+            return func(*args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    return decorator
+
+
+# -----------------------------------------------------------------------------
+# Hook
+
+_event_types = { "keyDown", "keyUp" }
+
+class Hook:
+
+    """
+    Emulator of the core hook system
+
+    Hook class has following class variables:
+    - callbacks: Table of hook name to callback function
+    - sent_events: List of (event_type, keyCode) sent by Keyhac
+    - passed_events: List of (event_type, keyCode) given to input_key() and not consumed by the keyboard hook
+    - keyboard_layout: Keyboard layout returned by get_keyboard_layout() (default: "ansi")
+    """
+
+    callbacks = {}
+    sent_events = []
+    passed_events = []
+    keyboard_layout = "ansi"
+
+    _lock = threading.RLock()
+
+    @staticmethod
+    def set_callback(name, func):
+        if func is None:
+            Hook.callbacks.pop(name, None)
+        else:
+            Hook.callbacks[name] = func
+
+    @staticmethod
+    @_emulated("Hook.send_keyboard_event")
+    def send_keyboard_event(event_type, key, replay=False):
+        if event_type not in _event_types:
+            raise ValueError("event type must be \"keyDown\" or \"keyUp\".")
+        with Hook._lock:
+            Hook.sent_events.append( (event_type, key) )
+
+    @staticmethod
+    @_emulated("Hook.send_keyboard_events")
+    def send_keyboard_events(events, replay=False):
+        for event_type, key in events:
+            if event_type not in _event_types:
+                raise ValueError("event type must be \"keyDown\" or \"keyUp\".")
+        with Hook._lock:
+            Hook.sent_events.extend( (event_type, key) for event_type, key in events )
+
+    @staticmethod
+    def get_keyboard_layout():
+        return Hook.keyboard_layout
+
+    @staticmethod
+    def acquire_lock():
+        Hook._lock.acquire()
+
+    @staticmethod
+    def release_lock():
+        Hook._lock.release()
+
+
+def input_key( vk: int, down: bool = True ) -> bool:
+
+    """
+    Feed a key event to the "Keyboard" hook callback, as the native keyboard hook does.
+
+    Args:
+        vk: Key code
+        down: True for key down, False for key up
+
+    Returns:
+        Whether the key event was consumed by the hook callback
+    """
+
+    event_type = "keyDown" if down else "keyUp"
+
+    callback = Hook.callbacks.get("Keyboard")
+    consumed = False
+    if callback:
+        with Hook._lock:
+            # Compact payload: ( keyCode << 8 | event type code )
+            consumed = bool( callback( (vk << 8) | (1 if down else 2) ) )
+
+    if not consumed:
+        Hook.passed_events.append( (event_type, vk) )
+
+    return consumed
+
+
+# -----------------------------------------------------------------------------
+# UIElement
+
+_value_types = {
+    "bool" :   lambda v: isinstance(v, bool),
+    "number" : lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "string" : lambda v: isinstance(v, str),
+    "range" :  lambda v: _is_numbers(v, 2),
+    "point" :  lambda v: _is_numbers(v, 2),
+    "size" :   lambda v: _is_numbers(v, 2),
+    "rect" :   lambda v: _is_numbers(v, 4),
+}
+
+def _is_numbers(v, n):
+    if not isinstance(v, (list, tuple)):
+        raise TypeError("value must be a sequence object.")
+    if len(v) != n:
+        raise TypeError(f"length of value must be a {n}.")
+    return all( isinstance(item, (int, float)) for item in v )
+
+
+class UIElement:
+
+    """
+    Emulator of the accessibility object
+
+    Attributes are stored in a dictionary. Some attributes are derived from the tree:
+    - AXFrame: from AXPosition and AXSize
+    - AXChildren: child elements
+    - AXWindows: child elements with AXWindow role (for applications)
+    - AXFrontmost: whether the application is the focused application (for applications)
+
+    Setting AXPosition / AXSize moves / resizes the element,
+    and setting AXFrontmost to True activates the application.
+    Performed actions are recorded in `performed_actions`.
+    Each application created by create_application() has a unique process ID, shared by its descendants.
+
+    UIElement class has following class variables:
+    - focused_application: UIElement returned by get_focused_application()
+    - running_applications: List of UIElements returned by get_running_applications()
+    - screen_frames: List of screen frames returned by get_screen_frames()
+    """
+
+    focused_application = None
+    running_applications = []
+    screen_frames = [ [0, 0, 1920, 1080] ]
+
+    def __init__( self, role: str = "", title: str = "", parent = None, **attributes ):
+
+        """
+        Initializes the element, and adds it to the children of the parent.
+
+        Args:
+            role: AXRole
+            title: AXTitle
+            parent: Parent UIElement
+            attributes: Other attributes
+        """
+
+        self.attributes = { "AXRole": role, "AXTitle": title, "AXParent": parent }
+        self.attributes.update(attributes)
+        self.pid = parent.pid if parent is not None else 0
+        self.children = []
+        self.actions = {}
+        self.performed_actions = []
+
+        if parent is not None:
+            parent.children.append(self)
+
+    def __repr__(self):
+        return f"UIElement({self.attributes['AXRole']!r}, {self.attributes['AXTitle']!r})"
+
+    @staticmethod
+    @_emulated("UIElement.get_focused_application")
+    def get_focused_application():
+        return UIElement.focused_application
+
+    @staticmethod
+    @_emulated("UIElement.get_running_applications", failure_result=list)
+    def get_running_applications():
+        return list(UIElement.running_applications)
+
+    @_emulated("UIElement.get_pid", failure_result=0)
+    def get_pid(self):
+        return self.pid
+
+    @_emulated("UIElement.get_attribute_names", failure_result=list)
+    def get_attribute_names(self):
+        names = list(self.attributes)
+        if "AXPosition" in self.attributes and "AXSize" in self.attributes:
+            names.append("AXFrame")
+        names.append("AXChildren")
+        if self.attributes["AXRole"] == "AXApplication":
+            names += [ "AXWindows", "AXFrontmost" ]
+        return names
+
+    @_emulated("UIElement.get_attribute_value")
+    def get_attribute_value(self, name):
+
+        if name == "AXFrame":
+            position = self.attributes.get("AXPosition")
+            size = self.attributes.get("AXSize")
+            if position is None or size is None:
+                return None
+            return [ float(position[0]), float(position[1]), float(size[0]), float(size[1]) ]
+
+        elif name == "AXChildren":
+            return list(self.children)
+
+        elif self.attributes["AXRole"] == "AXApplication":
+            if name == "AXWindows":
+                return [ child for child in self.children if child.attributes["AXRole"] == "AXWindow" ]
+            elif name == "AXFrontmost":
+                return UIElement.focused_application is self
+
+        value = self.attributes.get(name)
+        if isinstance(value, list):
+            value = list(value)
+        return value
+
+    @_emulated("UIElement.set_attribute_value")
+    def set_attribute_value(self, name, value_type, value):
+
+        try:
+            check = _value_types[value_type]
+        except KeyError:
+            raise ValueError("unknown or unsupported type")
+        if not check(value):
+            raise TypeError(f"value must be a {value_type} value.")
+
+        if name == "AXFrontmost":
+            if value and self.attributes["AXRole"] == "AXApplication":
+                windows = self.get_attribute_value("AXWindows")
+                focus( self.attributes.get("AXFocusedUIElement") or (windows[0] if windows else self) )
+        elif name == "AXFrame":
+            self.attributes["AXPosition"] = [ float(value[0]), float(value[1]) ]
+            self.attributes["AXSize"] = [ float(value[2]), float(value[3]) ]
+        elif value_type in ("point", "size", "range", "rect"):
+            self.attributes[name] = [ float(item) for item in value ]
+        else:
+            self.attributes[name] = value
+
+    @_emulated("UIElement.get_action_names", failure_result=list)
+    def get_action_names(self):
+        return list(self.actions)
+
+    @_emulated("UIElement.perform_action")
+    def perform_action(self, name):
+        self.performed_actions.append(name)
+        action = self.actions.get(name)
+        if action:
+            action()
+
+    @staticmethod
+    @_emulated("UIElement.get_screen_frames", failure_result=list)
+    def get_screen_frames():
+        return [ list(frame) for frame in UIElement.screen_frames ]
+
+
+def create_application( title: str, **attributes ) -> UIElement:
+
+    """
+    Create a running application in the simulated accessibility tree.
+
+    Args:
+        title: Name of the application
+        attributes: Other attributes
+
+    Returns:
+        UIElement of the application
+    """
+
+    global _next_pid
+
+    app = UIElement("AXApplication", title, None, **attributes)
+    app.pid = _next_pid
+    _next_pid += 1
+    UIElement.running_applications.append(app)
+    return app
+
+
+def create_window( app: UIElement, title: str, frame = (0, 0, 800, 600), subrole: str = "AXStandardWindow", minimized: bool = False, **attributes ) -> UIElement:
+
+    """
+    Create a window of an application in the simulated accessibility tree.
+    The window has a zoom button, which zooms the window to the first screen by "AXPress" action.
+
+    Args:
+        app: UIElement of the application
+        title: Title of the window
+        frame: Position and size of the window (x, y, width, height)
+        subrole: AXSubrole of the window
+        minimized: Whether the window is minimized
+        attributes: Other attributes
+
+    Returns:
+        UIElement of the window
+    """
+
+    window = UIElement(
+        "AXWindow", title, app,
+        AXSubrole = subrole,
+        AXPosition = [ float(frame[0]), float(frame[1]) ],
+        AXSize = [ float(frame[2]), float(frame[3]) ],
+        AXMinimized = minimized,
+        **attributes
+    )
+
+    zoom_button = UIElement("AXButton", "", window, AXSubrole="AXZoomButton")
+    zoom_button.actions["AXPress"] = lambda: window.set_attribute_value("AXFrame", "rect", UIElement.screen_frames[0])
+    window.attributes["AXZoomButton"] = zoom_button
+
+    return window
+
+
+def create_element( parent: UIElement, role: str, title: str = "", **attributes ) -> UIElement:
+
+    """
+    Create a UI element in the simulated accessibility tree.
+
+    Args:
+        parent: Parent UIElement
+        role: AXRole of the element
+        title: AXTitle of the element
+        attributes: Other attributes
+
+    Returns:
+        UIElement of the element
+    """
+
+    return UIElement(role, title, parent, **attributes)
+
+
+def _get_ancestor(elm, role):
+    while elm is not None:
+        if elm.attributes["AXRole"] == role:
+            return elm
+        elm = elm.attributes.get("AXParent")
+    return None
+
+
+def focus(elm: UIElement) -> None:
+
+    """
+    Move the keyboard focus to a UI element, and activate its application and window.
+    The "Focus" hook callback is called as the native hook system does.
+
+    Args:
+        elm: UIElement to focus
+    """
+
+    app = _get_ancestor(elm, "AXApplication")
+    window = _get_ancestor(elm, "AXWindow")
+
+    if app is None:
+        raise ValueError(f"{elm!r} doesn't belong to any application")
+
+    app.attributes["AXFocusedUIElement"] = elm
+    if window is not None:
+        app.attributes["AXFocusedWindow"] = window
+        app.attributes["AXMainWindow"] = window
+
+    app_changed = UIElement.focused_application is not app
+    UIElement.focused_application = app
+
+    callback = Hook.callbacks.get("Focus")
+    if callback:
+        callback( "appActivated" if app_changed else "focusChanged" )
+
+
+def set_focus(snapshot) -> None:
+
+    """
+    Move the keyboard focus to the element described by a focus snapshot of keyhac_capture.
+    Applications and windows are reused if they exist with the same title.
+
+    Args:
+        snapshot: List of (role, title) from the application to the focused element
+    """
+
+    if not snapshot:
+        UIElement.focused_application = None
+        return
+
+    role, title = snapshot[0]
+    for app in UIElement.running_applications:
+        if app.attributes["AXTitle"] == title:
+            break
+    else:
+        app = create_application(title)
+
+    elm = app
+    for role, title in snapshot[1:]:
+        for child in elm.children:
+            if child.attributes["AXRole"] == role and child.attributes["AXTitle"] == title:
+                elm = child
+                break
+        else:
+            if role == "AXWindow":
+                elm = create_window(elm, title)
+            else:
+                elm = create_element(elm, role, title)
+
+    focus(elm)
+
+
+def load_tree(spec: dict) -> None:
+
+    """
+    Replace the simulated accessibility tree with the one described by a dictionary (e.g., loaded from JSON).
+
+    The dictionary has optional "screens" (list of [x, y, width, height]) and "applications".
+    Each application has "title" and "windows", and each window has "title", "frame", "subrole", "minimized" and "children".
+    Each child element has "role", "title", "attributes" and "children".
+    An element with "focused": true gets the keyboard focus.
+
+    Args:
+        spec: Dictionary describing the tree
+    """
+
+    reset_tree()
+
+    if "screens" in spec:
+        UIElement.screen_frames = [ list(frame) for frame in spec["screens"] ]
+
+    focused = []
+
+    def create_children(parent, children_spec):
+        for child_spec in children_spec:
+            child = create_element( parent, child_spec["role"], child_spec.get("title", ""), **child_spec.get("attributes", {}) )
+            if child_spec.get("focused"):
+                focused.append(child)
+            create_children( child, child_spec.get("children", []) )
+
+    for app_spec in spec.get("applications", []):
+        app = create_application(app_spec["title"])
+        for window_spec in app_spec.get("windows", []):
+            window = create_window(
+                app,
+                window_spec.get("title", ""),
+                window_spec.get("frame", (0, 0, 800, 600)),
+                window_spec.get("subrole", "AXStandardWindow"),
+                window_spec.get("minimized", False),
+            )
+            if window_spec.get("focused"):
+                focused.append(window)
+            create_children( window, window_spec.get("children", []) )
+        if app_spec.get("focused"):
+            focused.append(app)
+
+    if focused:
+        focus(focused[-1])
+
+
+def reset_tree() -> None:
+
+    """
+    Remove all applications from the simulated accessibility tree.
+    """
+
+    UIElement.focused_application = None
+    UIElement.running_applications = []
+
+
+# -----------------------------------------------------------------------------
+# Console
+
+class Console:
+
+    """
+    Emulator of the Keyhac Console
+
+    Console class has following class variables:
+    - log_level: Log level returned by get_log_level() (default: 20)
+    - lines: Latest strings written to the console
+    - texts: Table of special text field name to the text
+    """
+
+    log_level = 20
+    lines = collections.deque(maxlen=1000)
+    texts = {}
+
+    @staticmethod
+    @_emulated("Console.write")
+    def write(s, log_level=100):
+        if log_level >= Console.log_level:
+            Console.lines.append(s)
+
+    @staticmethod
+    @_emulated("Console.set_text")
+    def set_text(name, text):
+        Console.texts[name] = text
+
+    @staticmethod
+    def get_log_level():
+        return Console.log_level
+
+
+# -----------------------------------------------------------------------------
+# Chooser
+
+class Chooser:
+
+    """
+    Emulator of the list window
+
+    open() doesn't show anything. Use select() or cancel() to emulate user operations.
+
+    Chooser class has following class variables:
+    - last_opened: The last opened Chooser object
+    """
+
+    last_opened = None
+
+    def __init__(self, name, items, on_selected, on_canceled):
+        for item in items:
+            if not isinstance(item, tuple):
+                raise TypeError("each item must be a tuple.")
+        self.name = name
+        self.items = items
+        self.frame = None
+        self.on_selected = on_selected
+        self.on_canceled = on_canceled
+
+    def destroy(self):
+        self.on_selected = None
+        self.on_canceled = None
+
+    def open(self, frame):
+        self.frame = frame
+        Chooser.last_opened = self
+
+    def select( self, index: int, modifier_flags: int = 0 ) -> None:
+
+        """
+        Emulate selecting an item.
+
+        Args:
+            index: Index of the item
+            modifier_flags: Modifier key flags while selecting
+        """
+
+        self.on_selected( json.dumps( { "index": index, "modifierFlags": modifier_flags } ) )
+
+    def cancel(self) -> None:
+
+        """
+        Emulate canceling the list window.
+        """
+
+        self.on_canceled("{}")
+
+
+# -----------------------------------------------------------------------------
+# Clipboard
+
+class Clipboard:
+
+    """
+    Emulator of the clipboard data, holding a string in memory
+
+    Setting the current clipboard calls the "Clipboard" hook callback.
+    Use copy_string() to emulate other applications copying strings.
+    """
+
+    _current_string = ""
+
+    def __init__(self):
+        self._string = ""
+
+    def destroy(self):
+        pass
+
+    def get_string(self):
+        return self._string
+
+    def set_string(self, s):
+        if not isinstance(s, str):
+            raise TypeError("value must be a string object.")
+        self._string = s
+
+    @staticmethod
+    @_emulated("Clipboard.get_current")
+    def get_current():
+        clip = Clipboard()
+        clip._string = Clipboard._current_string
+        return clip
+
+    @staticmethod
+    @_emulated("Clipboard.set_current")
+    def set_current(clip):
+        if not isinstance(clip, Clipboard):
+            raise TypeError("value must be a Clipboard object.")
+        Clipboard._current_string = clip._string
+
+        callback = Hook.callbacks.get("Clipboard")
+        if callback:
+            callback("{}")
+
+
+def copy_string(s: str) -> None:
+
+    """
+    Set a string to the clipboard, as other applications do.
+
+    Args:
+        s: String to copy
+    """
+
+    clip = Clipboard()
+    clip.set_string(s)
+    Clipboard.set_current(clip)
@@ -236,6 +236,16 @@ static PyObject * UIElement_get_running_applications( PyObject * self, PyObject
     return pyapplications;
 }
 
+static PyObject * UIElement_get_pid(UIElement_Object * self, PyObject * args)
+{
+    if( ! PyArg_ParseTuple(args,"") )
+        return NULL;
+    
+    long pid = self->impl.getPid();
+    
+    return Py_BuildValue( "l", pid );
+}
+
 static PyObject * UIElement_get_attribute_names(UIElement_Object * self, PyObject * args)
 {
     if( ! PyArg_ParseTuple(args,"") )
@@ -551,6 +561,7 @@ static PyObject * UIElement_get_screen_frames( PyObject * self, PyObject * args
 static PyMethodDef UIElement_methods[] = {
     { "get_focused_application", (PyCFunction)UIElement_get_focused_application, METH_STATIC|METH_VARARGS, "" },
     { "get_running_applications", (PyCFunction)UIElement_get_running_applications, METH_STATIC|METH_VARARGS, "" },
+    { "get_pid", (PyCFunction)UIElement_get_pid, METH_VARARGS, "" },
     { "get_attribute_names", (PyCFunction)UIElement_get_attribute_names, METH_VARARGS, "" },
     { "get_attribute_value", (PyCFunction)UIElement_get_attribute_value, METH_VARARGS, "" },
     { "set_attribute_value", (PyCFunction)UIElement_set_attribute_value, METH_VARARGS, "" },
@@ -826,6 +837,65 @@ static PyObject * Hook_send_keyboard_event(Hook_Object * self, PyObject* args)
     return Py_None;
 }
 
+static PyObject * Hook_send_keyboard_events(Hook_Object * self, PyObject* args)
+{
+    PyObject * pyevents;
+    int replay = 0;
+    if( ! PyArg_ParseTuple(args, "O|I", &pyevents, &replay ) )
+    {
+        return NULL;
+    }
+
+    PyObject * pyevents_fast = PySequence_Fast(pyevents, "events must be a sequence.");
+    if(pyevents_fast==NULL)
+    {
+        return NULL;
+    }
+
+    // Pack events into integers in same format as keyboard hook callback: (keyCode << 8) | type
+    Py_ssize_t num_events = PySequence_Fast_GET_SIZE(pyevents_fast);
+    auto events = swift::Array<swift::Int>::init();
+    for( Py_ssize_t i=0 ; i<num_events ; ++i )
+    {
+        PyObject * pyevent = PySequence_Fast_GET_ITEM(pyevents_fast, i);
+
+        PyObject * pytype;
+        int keyCode;
+        if( ! PyArg_ParseTuple(pyevent, "UI", &pytype, &keyCode ) )
+        {
+            Py_DECREF(pyevents_fast);
+            return NULL;
+        }
+
+        std::string type = PyUnicode_AsUTF8AndSize(pytype, NULL);
+
+        swift::Int type_code;
+        if(type=="keyDown")
+        {
+            type_code = 1;
+        }
+        else if(type=="keyUp")
+        {
+            type_code = 2;
+        }
+        else
+        {
+            PyErr_SetString( PyExc_ValueError, "event type must be \"keyDown\" or \"keyUp\".");
+            Py_DECREF(pyevents_fast);
+            return NULL;
+        }
+
+        events.append( (swift::Int(keyCode) << 8) | type_code );
+    }
+
+    Py_DECREF(pyevents_fast);
+
+    Hook::getInstance().sendKeyboardEvents(events, replay);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 static PyObject * Hook_get_keyboard_layout(Hook_Object * self, PyObject* args)
 {
     if( ! PyArg_ParseTuple(args, "" ) )
@@ -868,6 +938,7 @@ static PyObject * Hook_release_lock(Hook_Object * self, PyObject* args)
 static PyMethodDef Hook_methods[] = {
     { "set_callback", (PyCFunction)Hook_set_callback, METH_STATIC|METH_VARARGS, "" },
     { "send_keyboard_event", (PyCFunction)Hook_send_keyboard_event, METH_STATIC|METH_VARARGS, "" },
+    { "send_keyboard_events", (PyCFunction)Hook_send_keyboard_events, METH_STATIC|METH_VARARGS, "" },
     { "get_keyboard_layout", (PyCFunction)Hook_get_keyboard_layout, METH_STATIC|METH_VARARGS, "" },
     { "acquire_lock", (PyCFunction)Hook_acquire_lock, METH_STATIC|METH_VARARGS, "" },
     { "release_lock", (PyCFunction)Hook_release_lock, METH_STATIC|METH_VARARGS, "" },
@@ -960,9 +1031,22 @@ static PyObject * Console_set_text(Console_Object * self, PyObject* args)
     return Py_None;
 }
 
+static PyObject * Console_get_log_level(Console_Object * self, PyObject* args)
+{
+    if( ! PyArg_ParseTuple(args, "" ) )
+    {
+        return NULL;
+    }
+    
+    long log_level = Keyhac::Console::getInstance().getLogLevel();
+
+    return PyLong_FromLong(log_level);
+}
+
 static PyMethodDef Console_methods[] = {
     { "write", (PyCFunction)Console_write, METH_STATIC|METH_VARARGS, "" },
     { "set_text", (PyCFunction)Console_set_text, METH_STATIC|METH_VARARGS, "" },
+    { "get_log_level", (PyCFunction)Console_get_log_level, METH_STATIC|METH_VARARGS, "" },
     {NULL,NULL}
 };
 
@@ -67,6 +67,14 @@ public class Console {
         self.logLevel = logLevel
     }
     
+    public func getLogLevel() -> Int {
+
+        lock.lock()
+        defer { lock.unlock() }
+
+        return logLevel.rawValue
+    }
+    
     public func pullText(name:String) -> String {
 
         lock.lock()
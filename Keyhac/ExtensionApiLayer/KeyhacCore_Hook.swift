@@ -8,6 +8,7 @@
 import Foundation
 import CoreGraphics
 import Carbon
+import AppKit
 
 public class Hook {
     
@@ -31,6 +32,13 @@ public class Hook {
         case keyUp
     }
     
+    // Event type codes of the compact keyboard callback payload ( keyCode << 8 | type )
+    enum KeyEventTypeCode: Int {
+        case keyDown = 1
+        case keyUp = 2
+        case hookRestored = 3
+    }
+    
     enum KeyEventSource {
         case real
         case translated
@@ -62,9 +70,14 @@ public class Hook {
     // Virtual modifier key state
     var virtualModifier: CGEventFlags = CGEventFlags()
     
-    // Python object pointer for "on_key()", "on_clipboard()"
+    // Focus change notifications
+    var workspaceObserver: NSObjectProtocol?
+    var axObserver: AXObserver?
+    
+    // Python object pointer for "on_key()", "on_clipboard()", "on_focus()"
     var keyboardCallback = PyObjectPtr()
     var clipboardCallback = PyObjectPtr()
+    var focusCallback = PyObjectPtr()
 
     func TRACE(_ s: String) {
         #if DEBUG
@@ -97,6 +110,8 @@ public class Hook {
                 self.setKeyboardCallback(callback: callback)
             case "Clipboard":
                 self.setClipboardCallback(callback: callback)
+            case "Focus":
+                self.setFocusCallback(callback: callback)
             default:
                 break
             }
@@ -107,6 +122,8 @@ public class Hook {
                 self.unsetKeyboardCallback()
             case "Clipboard":
                 self.unsetClipboardCallback()
+            case "Focus":
+                self.unsetFocusCallback()
             default:
                 break
             }
@@ -133,6 +150,16 @@ public class Hook {
         self.clipboardCallback = PyObjectPtr()
     }
     
+    private func setFocusCallback(callback: PyObjectPtr) {
+        self.focusCallback = callback
+        self.focusCallback.IncRef()
+    }
+    
+    private func unsetFocusCallback() {
+        self.focusCallback.DecRef()
+        self.focusCallback = PyObjectPtr()
+    }
+    
     // Install keyboard hook to the OS
     public func installKeyboardHook() {
 
@@ -185,6 +212,8 @@ public class Hook {
         timer = Timer.scheduledTimer(withTimeInterval: Hook.timerInterval, repeats: true) { timer in
             self.onTimer()
         }
+        
+        installFocusObserver()
     }
     
     // Uninstall keyboard hook from the OS
@@ -203,6 +232,8 @@ public class Hook {
             self.timer = nil
         }
         
+        uninstallFocusObserver()
+        
         if let eventTap = self.eventTap {
             CGEvent.tapEnable(tap: eventTap, enable: false)
         }
@@ -247,11 +278,7 @@ public class Hook {
             var gil = PyGIL(true);
             defer { gil.Release() }
             
-            let json = """
-            {"type": "hookRestored"}
-            """
-            
-            var arg = PythonBridge.buildPythonString(json)
+            var arg = PythonBridge.buildPythonInt(KeyEventTypeCode.hookRestored.rawValue)
             var pyresult = PythonBridge.invokeCallable(self.keyboardCallback, arg)
             
             defer {
@@ -336,11 +363,15 @@ public class Hook {
                     var gil = PyGIL(true);
                     defer { gil.Release() }
                     
-                    let json = """
-                    {"type": "\(keyEventDirection)", "keyCode": \(keyCode)}
-                    """
+                    let typeCode: KeyEventTypeCode
+                    switch keyEventDirection {
+                    case .keyDown:
+                        typeCode = .keyDown
+                    case .keyUp:
+                        typeCode = .keyUp
+                    }
                     
-                    var arg = PythonBridge.buildPythonString(json)
+                    var arg = PythonBridge.buildPythonInt(Int(keyCode) << 8 | typeCode.rawValue)
                     var pyresult = PythonBridge.invokeCallable(self.keyboardCallback, arg)
                     
                     defer {
@@ -431,6 +462,84 @@ public class Hook {
         }
     }
     
+    // Install application activation and focused element observers
+    private func installFocusObserver() {
+        
+        workspaceObserver = NSWorkspace.shared.notificationCenter.addObserver(
+            forName: NSWorkspace.didActivateApplicationNotification,
+            object: nil,
+            queue: .main
+        ) { notification in
+            let app = notification.userInfo?[NSWorkspace.applicationUserInfoKey] as? NSRunningApplication
+            self.observeFocusedElement(pid: app?.processIdentifier)
+            self.onFocusChanged(eventName: "appActivated")
+        }
+        
+        observeFocusedElement(pid: NSWorkspace.shared.frontmostApplication?.processIdentifier)
+    }
+    
+    // Uninstall application activation and focused element observers
+    private func uninstallFocusObserver() {
+        
+        if let workspaceObserver = self.workspaceObserver {
+            NSWorkspace.shared.notificationCenter.removeObserver(workspaceObserver)
+            self.workspaceObserver = nil
+        }
+        
+        observeFocusedElement(pid: nil)
+    }
+    
+    // Observe focus changes within the frontmost application
+    private func observeFocusedElement(pid: pid_t?) {
+        
+        if let axObserver = self.axObserver {
+            CFRunLoopRemoveSource(CFRunLoopGetCurrent(), AXObserverGetRunLoopSource(axObserver), .commonModes)
+            self.axObserver = nil
+        }
+        
+        guard let pid else { return }
+        
+        func _callback(observer: AXObserver, element: AXUIElement, notification: CFString, refcon: UnsafeMutableRawPointer?) {
+            let hook = Unmanaged<Hook>.fromOpaque(refcon!).takeUnretainedValue()
+            hook.onFocusChanged(eventName: "focusChanged")
+        }
+        
+        var observer: AXObserver?
+        if AXObserverCreate(pid, _callback, &observer) != .success {
+            print("Failed to create AXObserver - pid=\(pid)")
+            return
+        }
+        
+        guard let observer else { return }
+        
+        let appElement = AXUIElementCreateApplication(pid)
+        let refcon = Unmanaged.passUnretained(self).toOpaque()
+        AXObserverAddNotification(observer, appElement, kAXFocusedUIElementChangedNotification as CFString, refcon)
+        AXObserverAddNotification(observer, appElement, kAXFocusedWindowChangedNotification as CFString, refcon)
+        
+        CFRunLoopAddSource(CFRunLoopGetCurrent(), AXObserverGetRunLoopSource(observer), .commonModes)
+        
+        self.axObserver = observer
+    }
+    
+    private func onFocusChanged(eventName: String) {
+
+        lock.lock()
+        defer { lock.unlock() }
+        
+        if self.focusCallback.ptr() != nil {
+
+            var gil = PyGIL(true);
+            defer { gil.Release() }
+            
+            var arg = PythonBridge.buildPythonString(eventName)
+            var pyresult = PythonBridge.invokeCallable(self.focusCallback, arg)
+            
+            arg.DecRef()
+            pyresult.DecRef()
+        }
+    }
+    
     // Convert virtual modifier state to CoreGraphics's event flags
     private func virtualModifierStateToEventFlags(src: CGEventFlags) -> CGEventFlags
     {
@@ -493,6 +602,33 @@ public class Hook {
             fatalError("Unknown keyboard event type: \(type)")
         }
         
+        postKeyboardEvent(keyCode: keyCode, keyDown: keyDown, replay: replay)
+    }
+    
+    // Send multiple virtual key events at once.
+    // Events are packed integers in same format as keyboard hook callback: (keyCode << 8) | type
+    public func sendKeyboardEvents(events: [Int], replay: Bool) {
+
+        TRACE("sendKeyboardEvents(\(events.count) events)")
+        
+        lock.lock()
+        defer { lock.unlock() }
+        
+        for event in events {
+            let keyCode = event >> 8
+            switch KeyEventTypeCode(rawValue: event & 0xff) {
+            case .keyDown:
+                postKeyboardEvent(keyCode: keyCode, keyDown: true, replay: replay)
+            case .keyUp:
+                postKeyboardEvent(keyCode: keyCode, keyDown: false, replay: replay)
+            default:
+                fatalError("Unknown keyboard event type: \(event & 0xff)")
+            }
+        }
+    }
+    
+    private func postKeyboardEvent(keyCode: Int, keyDown: Bool, replay: Bool) {
+
         var eventSource: CGEventSource?
         if replay {
             eventSource = eventSourceForReplay
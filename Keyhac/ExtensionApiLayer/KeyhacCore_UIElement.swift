@@ -264,6 +264,21 @@ public class UIElement {
         return applications
     }
     
+    public func getPid() -> Int {
+        
+        guard let elm else {
+            return 0
+        }
+        
+        var pid: pid_t = 0
+        let result = AXUIElementGetPid(elm, &pid)
+        if result != .success {
+            return 0
+        }
+        
+        return Int(pid)
+    }
+    
     public func getAttributeNames() -> [String] {
         
         guard let elm else {
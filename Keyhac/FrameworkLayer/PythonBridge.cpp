@@ -184,6 +184,12 @@ PyObjectPtr PythonBridge::buildPythonString(const char * s)
     return pyobj;
 }
 
+PyObjectPtr PythonBridge::buildPythonInt(long i)
+{
+    PyObject * pyobj = PyLong_FromLong(i);
+    return pyobj;
+}
+
 int PythonBridge::parsePythonInt(const PyObjectPtr & obj)
 {
     int i;
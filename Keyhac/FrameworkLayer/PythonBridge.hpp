@@ -100,6 +100,8 @@ public:
     // FIXME: なぜか static method にしないと動かない
     static PyObjectPtr buildPythonString(const char * s);
     
+    static PyObjectPtr buildPythonInt(long i);
+    
     static int parsePythonInt(const PyObjectPtr & obj);
     
     static std::string getVersion();
@@ -5,7 +5,11 @@ from keyhac_focus import FocusCondition
 from keyhac_input import InputContext
 from keyhac_action import (
     ThreadedAction, 
+    AsyncAction,
     MoveWindow, 
+    LayoutWindows,
+    SaveWindowLayout,
+    RestoreWindowLayout,
     LaunchApplication, 
     ChooserAction, 
     ShowClipboardHistory, 
@@ -18,3 +22,5 @@ from keyhac_action import (
 )
 from keyhac_console import getLogger
 from keyhac_clipboard import ClipboardHistory
+from keyhac_window import WindowIndex, ScreenTopology
+from keyhac_trace import Tracer, TRACE_OFF, TRACE_BUFFER, TRACE_CONSOLE
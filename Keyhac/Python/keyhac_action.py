@@ -1,17 +1,28 @@
-import math
 import json
+import asyncio
+import threading
 import subprocess
 import traceback
-from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from keyhac_core import UIElement, Hook, Chooser, Clipboard
+from keyhac_core import Hook, Chooser, Clipboard
 from keyhac_main import Keymap
+from keyhac_executor import ExecutorLane
+from keyhac_window import solve_layout, set_window_frames, get_window_roles, WindowLayoutStore
 import keyhac_console
 from keyhac_const import *
 
 logger = keyhac_console.getLogger("Action")
 
+def _get_futures(action):
+    # Futures of running executions of ThreadedAction / AsyncAction.
+    # Not initialized in __init__, because derived classes may not call the base class's __init__()
+    try:
+        return action._futures
+    except AttributeError:
+        action._futures = set()
+        return action._futures
+
 class ThreadedAction:
 
     """
@@ -25,39 +36,138 @@ class ThreadedAction:
     The run() method is executed in a thread pool for time consuming tasks.
     The starting() and finished() methods are for light-weight tasks
     and they are executed before and after run() under exclusive control with keyboard hooks. 
+
+    ThreadedAction class has following class variables:
+    - lane: Name of the executor lane to run run() (default: "default")
+    - priority: Priority among actions in the same executor lane. Higher priority actions run first (default: 0)
+    - run_timeout: Timeout in seconds. None for no timeout (default: None)
+    - coalesce: Policy for triggers while the action is busy, such as by key repeat (default: None)
+
+    When the action is still queued after run_timeout since it was triggered, the execution is canceled.
+    When run() runs longer than run_timeout since it started, the timeout is reported as soon as it expires,
+    and the result is discarded. finished() is not called in both cases.
+
+    Following coalescing policies are available:
+    - None: Every trigger executes run()
+    - "latest": Triggers while an execution is queued are merged into it. starting() is called for each trigger.
+    - "drop": Triggers while an execution is queued or running are ignored, without calling starting().
+    - "accumulate": Same as "latest", and the number of merged triggers is available as self.repeat_count in run().
     """
 
-    thread_pool = ThreadPoolExecutor(max_workers=1)
+    lane = "default"
+    priority = 0
+    run_timeout = None
+    coalesce = None
+    repeat_count = 1
+
+    # Coalescing states. Not initialized in __init__, because derived classes may not call ThreadedAction.__init__()
+    _pending = None
+    _num_running = 0
+    _num_coalesced = 0
+    _coalesce_lock = threading.Lock()
 
     def __init__(self):
         pass
 
     def __repr__(self):
-        return f"ThreadedAction()"
+        return "ThreadedAction()"
 
     def __call__(self):
 
+        coalesced = False
+        if self.coalesce is not None:
+            with ThreadedAction._coalesce_lock:
+                if self.coalesce == "drop":
+                    if self._pending or self._num_running:
+                        # Counted and logged once when the execution finishes, not to slow down key repeat
+                        self._num_coalesced += 1
+                        return
+                elif self._pending:
+                    self._num_coalesced += 1
+                    coalesced = True
+
         try:
             Hook.acquire_lock()
             self.starting()
         finally:
             Hook.release_lock()
 
-        future = ThreadedAction.thread_pool.submit(self.run)
+        if coalesced:
+            return
+
+        if self.coalesce is not None:
+            with ThreadedAction._coalesce_lock:
+                future = ExecutorLane.get(self.lane).submit(self._run_coalesced, priority=self.priority, timeout=self.run_timeout)
+                self._pending = future
+        else:
+            future = ExecutorLane.get(self.lane).submit(self.run, priority=self.priority, timeout=self.run_timeout)
+
+        _get_futures(self).add(future)
         future.add_done_callback(self._done_callback)
 
+    def _run_coalesced(self):
+
+        with ThreadedAction._coalesce_lock:
+            self._pending = None
+            self._num_running += 1
+            if self.coalesce == "accumulate":
+                self.repeat_count = self._num_coalesced + 1
+            if self.coalesce != "drop":
+                self._num_coalesced = 0
+
+        try:
+            return self.run()
+        finally:
+            num_dropped = 0
+            with ThreadedAction._coalesce_lock:
+                self._num_running -= 1
+                if self.coalesce == "drop" and not self._num_running:
+                    num_dropped = self._num_coalesced
+                    self._num_coalesced = 0
+            if num_dropped:
+                logger.debug(f"Threaded action dropped {num_dropped} triggers while busy - {self!r}")
+
     def _done_callback(self, future):
+
+        _get_futures(self).discard(future)
+
+        if future.cancelled():
+            with ThreadedAction._coalesce_lock:
+                if self._pending is future:
+                    self._pending = None
+                    self._num_coalesced = 0
+            logger.info(f"Threaded action canceled - {self!r}")
+            return
+
         try:
             result = future.result()
-            try:
-                Hook.acquire_lock()
-                self.finished(result)
-            finally:
-                Hook.release_lock()
+        except TimeoutError:
+            logger.warning(f"Threaded action timed out - {self!r}")
+            return
+        except Exception:
+            print()
+            logger.error(f"Threaded action failed:\n{traceback.format_exc()}")
+            return
 
-        except Exception as e:
+        try:
+            Hook.acquire_lock()
+            self.finished(result)
+        except Exception:
             print()
             logger.error(f"Threaded action failed:\n{traceback.format_exc()}")
+        finally:
+            Hook.release_lock()
+
+    def cancel(self) -> None:
+        """
+        Cancel queued executions of this action.
+
+        Executions already running can't be canceled.
+        finished() is not called for canceled executions.
+        """
+
+        for future in list(_get_futures(self)):
+            future.cancel()
 
     def starting(self):
         """
@@ -66,7 +176,7 @@ class ThreadedAction:
 
     def run(self) -> Any:
         """
-        Virtual method called in the thread pool.
+        Virtual method called in the executor lane.
 
         This method can include time consuming tasks.
 
@@ -82,6 +192,119 @@ class ThreadedAction:
             result: returned value from run().
         """
 
+class AsyncAction:
+
+    """
+    Base class for asynchronous actions.
+
+    AsyncAction is an alternative of ThreadedAction for I/O bound tasks.
+    The run() method is a coroutine executed in the asyncio event loop owned by the Keymap,
+    so that many actions can wait for subprocesses, sockets, or timers concurrently without using threads.
+
+    To define your own asynchronous action class, derive the AsyncAction class
+    and implement starting(), run(), and finished() methods.
+    The starting() and finished() methods are for light-weight tasks
+    and they are executed before and after run() under exclusive control with keyboard hooks.
+    finished() is executed in an executor lane, not in the event loop,
+    so that waiting for the keyboard hook lock doesn't stall other actions sharing the event loop.
+
+    AsyncAction class has following class variables:
+    - timeout: Timeout of run() in seconds. None for no timeout (default: None)
+    - lane: Name of the executor lane to run finished() (default: "default")
+    """
+
+    timeout = None
+    lane = "default"
+
+    def __init__(self):
+        pass
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    def __call__(self):
+
+        try:
+            Hook.acquire_lock()
+            self.starting()
+        finally:
+            Hook.release_lock()
+
+        event_loop = Keymap.get_instance().get_event_loop()
+        future = asyncio.run_coroutine_threadsafe(self._run_with_timeout(), event_loop)
+        _get_futures(self).add(future)
+        future.add_done_callback(self._done_callback)
+
+    async def _run_with_timeout(self):
+        if self.timeout is None:
+            return await self.run()
+        return await asyncio.wait_for(self.run(), self.timeout)
+
+    def _done_callback(self, future):
+
+        _get_futures(self).discard(future)
+
+        if future.cancelled():
+            logger.info(f"Async action canceled - {self!r}")
+            return
+
+        try:
+            result = future.result()
+        except TimeoutError:
+            logger.warning(f"Async action timed out - {self!r}")
+            return
+        except Exception:
+            print()
+            logger.error(f"Async action failed:\n{traceback.format_exc()}")
+            return
+
+        # Called in the event loop thread. Hand off finished() to the executor lane.
+        ExecutorLane.get(self.lane).submit( lambda: self._call_finished(result) )
+
+    def _call_finished(self, result):
+
+        try:
+            Hook.acquire_lock()
+            self.finished(result)
+        except Exception:
+            print()
+            logger.error(f"Async action failed:\n{traceback.format_exc()}")
+        finally:
+            Hook.release_lock()
+
+    def cancel(self) -> None:
+        """
+        Cancel running executions of this action.
+
+        finished() is not called for canceled executions.
+        """
+
+        for future in list(_get_futures(self)):
+            future.cancel()
+
+    def starting(self):
+        """
+        Virtual method called immediately when the action is triggered.
+        """
+
+    async def run(self) -> Any:
+        """
+        Virtual coroutine method executed in the asyncio event loop.
+
+        This method can await I/O bound tasks.
+
+        Returns:
+            Any types of objects
+        """
+
+    def finished(self, result: Any) -> None:
+        """
+        Virtual method called after run() finished.
+
+        Args:
+            result: returned value from run().
+        """
+
 class MoveWindow(ThreadedAction):
 
     """
@@ -90,13 +313,19 @@ class MoveWindow(ThreadedAction):
     The window is clamped within the current screen bounds. When the window
     reaches a screen edge, it can cross to an adjacent monitor in the movement
     direction. The macOS menu bar gap between screens is accounted for.
+
+    Moves triggered by key repeat while a move is queued are accumulated into a single move.
     """
 
-    # Tolerance for detecting adjacent screens across the menu bar gap (pixels)
+    lane = "window"
+    coalesce = "accumulate"
+
+    # Tolerance for detecting adjacent screens across the menu bar gap (pixels).
+    # Passed to ScreenTopology to find the adjacent screen in the movement direction.
     ADJACENT_SCREEN_TOLERANCE = 50
 
     # Tolerance for detecting if the window is at the screen edge.
-    # For "up" direction, uses ADJACENT_SCREEN_TOLERANCE to account for the
+    # For "up" direction, ADJACENT_SCREEN_TOLERANCE is used instead to account for the
     # macOS menu bar preventing windows from reaching y=0.
     EDGE_TOLERANCE = 2
 
@@ -114,7 +343,7 @@ class MoveWindow(ThreadedAction):
 
         # FIXME: deprecated arguments from ver v1.64
         if x or y:
-            logger.warning(f"MoveWindow's arguments x, y are deprecated. Use direction and distance instead.")
+            logger.warning("MoveWindow's arguments x, y are deprecated. Use direction and distance instead.")
             if x < 0:
                 self.direction = "left"
                 self.distance = abs(x)
@@ -151,59 +380,6 @@ class MoveWindow(ThreadedAction):
 
         self.wnd = elm
 
-    @staticmethod
-    def _get_best_screen(wnd_frame, screen_frames):
-        """Find the screen that has the most overlap with the window."""
-        wx, wy, ww, wh = wnd_frame[0], wnd_frame[1], wnd_frame[2], wnd_frame[3]
-        best_screen = screen_frames[0] if screen_frames else None
-        best_overlap = -1
-        for sf in screen_frames:
-            sx, sy, sw, sh = sf[0], sf[1], sf[2], sf[3]
-            ox = max(0, min(wx + ww, sx + sw) - max(wx, sx))
-            oy = max(0, min(wy + wh, sy + sh) - max(wy, sy))
-            overlap = ox * oy
-            if overlap > best_overlap:
-                best_overlap = overlap
-                best_screen = sf
-        return best_screen
-
-    @classmethod
-    def _is_adjacent_in_direction(cls, current_screen, other_screen, direction):
-        """Check if other_screen is adjacent to current_screen in the given direction.
-
-        Uses a tolerance to account for the menu bar gap between visible screen areas.
-        """
-        cx, cy, cw, ch = current_screen[0], current_screen[1], current_screen[2], current_screen[3]
-        sx, sy, sw, sh = other_screen[0], other_screen[1], other_screen[2], other_screen[3]
-        tol = cls.ADJACENT_SCREEN_TOLERANCE
-        if direction == "left":
-            if abs((sx + sw) - cx) <= tol:
-                if not (sy + sh <= cy or sy >= cy + ch):
-                    return True
-        elif direction == "right":
-            if abs(sx - (cx + cw)) <= tol:
-                if not (sy + sh <= cy or sy >= cy + ch):
-                    return True
-        elif direction == "up":
-            if abs((sy + sh) - cy) <= tol:
-                if not (sx + sw <= cx or sx >= cx + cw):
-                    return True
-        elif direction == "down":
-            if abs(sy - (cy + ch)) <= tol:
-                if not (sx + sw <= cx or sx >= cx + cw):
-                    return True
-        return False
-
-    @classmethod
-    def _find_adjacent_screen(cls, current_screen, screen_frames, direction):
-        """Find the adjacent screen in the given direction, or None."""
-        for sf in screen_frames:
-            if sf is current_screen:
-                continue
-            if cls._is_adjacent_in_direction(current_screen, sf, direction):
-                return sf
-        return None
-
     def run(self):
 
         if not self.wnd:
@@ -213,8 +389,8 @@ class MoveWindow(ThreadedAction):
         this_window_frame = self.wnd.get_attribute_value("AXFrame")
 
         # Get screens info
-        screen_frames = UIElement.get_screen_frames()
-        current_screen = self._get_best_screen(this_window_frame, screen_frames)
+        screen_topology = Keymap.get_instance().get_screen_topology(self.ADJACENT_SCREEN_TOLERANCE)
+        current_screen = screen_topology.get_best_screen(this_window_frame)
 
         if not current_screen:
             return None
@@ -239,7 +415,7 @@ class MoveWindow(ThreadedAction):
             at_edge = ((sy + sh) - (this_window_frame[1] + wh)) <= edge_tol
 
         if at_edge:
-            adj = self._find_adjacent_screen(current_screen, screen_frames, self.direction)
+            adj = screen_topology.get_neighbour(current_screen, self.direction)
             if adj is not None:
                 ax, ay, aw, ah = adj[0], adj[1], adj[2], adj[3]
                 if self.direction == "left":
@@ -255,8 +431,8 @@ class MoveWindow(ThreadedAction):
                 return this_window_frame[:2]
             # No adjacent monitor — fall through to normal move (which will clamp)
 
-        # Initial move distance
-        distance = self.distance
+        # Initial move distance, including accumulated key repeats
+        distance = self.distance * self.repeat_count
 
         # Prepare window edge position
         if self.direction=="left":
@@ -290,54 +466,13 @@ class MoveWindow(ThreadedAction):
         # Fit to window edge
         if self.window_edge:
 
-            def get_window_frames(app):
-                windows = app.get_attribute_value("AXWindows")
-                frames = []
-                if windows:
-                    for wnd in windows:
-                        minimized = wnd.get_attribute_value("AXMinimized")
-                        if minimized:
-                            continue
-
-                        title = wnd.get_attribute_value("AXTitle")
-                        if not title:
-                            continue
-
-                        frame = wnd.get_attribute_value("AXFrame")
-                        frames.append(frame)
-
-                return frames
-
-            # Get all window frames using parallel threads
-            window_frames = []
-            thread_pool = ThreadPoolExecutor(max_workers=16)
-            for window_frames_from_single_app in thread_pool.map(get_window_frames, UIElement.get_running_applications()):
-                window_frames += window_frames_from_single_app
+            edge_index = Keymap.get_instance().window_index.get_edge_index()
 
             gap = 1
 
-            for window_frame in window_frames:
-                
-                if self.direction=="left":
-                    window_edge_pos = window_frame[0] + window_frame[2]
-                    window_edge_range = (window_frame[1], window_frame[1] + window_frame[3])
-                    sign = -1
-                elif self.direction=="right":
-                    window_edge_pos = window_frame[0]
-                    window_edge_range = (window_frame[1], window_frame[1] + window_frame[3])
-                    sign = 1
-                elif self.direction=="up":
-                    window_edge_pos = window_frame[1] + window_frame[3]
-                    window_edge_range = (window_frame[0], window_frame[0] + window_frame[2])
-                    sign = -1
-                elif self.direction=="down":
-                    window_edge_pos = window_frame[1]
-                    window_edge_range = (window_frame[0], window_frame[0] + window_frame[2])
-                    sign = 1
-                
-                if not( front_range[1] <= window_edge_range[0] or front_range[0] >= window_edge_range[1] ):
-                    if (window_edge_pos - front_pos) * sign - gap >= 0.1:
-                        distance = min(distance, (window_edge_pos - front_pos) * sign - gap)
+            edge_distance = edge_index.find_blocking_distance( self.direction, front_pos, front_range, gap + 0.1 )
+            if edge_distance is not None:
+                distance = min(distance, edge_distance - gap)
 
         # Calculate target position
         if self.direction=="left":
@@ -366,10 +501,184 @@ class MoveWindow(ThreadedAction):
             pos = result
             self.wnd.set_attribute_value("AXPosition", "point", pos)
 
+            # Window frames of the focused application changed
+            Keymap.get_instance().window_index.on_focus_changed()
+
     def __repr__(self):
         return f"MoveWindow(direction={self.direction},distance={self.distance},window_edge={self.window_edge})"
 
 
+class LayoutWindows(ThreadedAction):
+
+    """
+    A action class to tile windows in the screen of the focused window.
+
+    All visible windows in the screen are arranged at once.
+    The focused window becomes the first window (e.g., the main window in "main_stack" layout),
+    and other windows keep their order from top-left to bottom-right.
+    Applications not responding within the timeout are given up, so that they don't stall others.
+    """
+
+    lane = "window"
+    coalesce = "drop"
+
+    def __init__(self, layout: str = "grid", gap: int = 0, main_ratio: float = 0.5, timeout: float = 2.0):
+
+        """
+        Initializes the action object.
+
+        Args:
+            layout: either of "grid", "columns", "rows", "main_stack"
+            gap: gap between windows in pixels (default: 0)
+            main_ratio: width ratio of the main window in "main_stack" layout (default: 0.5)
+            timeout: Timeout in seconds for each application (default: 2.0)
+        """
+
+        self.layout = layout
+        self.gap = gap
+        self.main_ratio = main_ratio
+        self.timeout = timeout
+        self.wnd = None
+
+    def starting(self):
+
+        elm = Keymap.get_instance().focus
+
+        # Get focused window
+        while elm:
+            role = elm.get_attribute_value("AXRole")
+            if role=="AXWindow":
+                break
+            elm = elm.get_attribute_value("AXParent")
+
+        self.wnd = elm
+
+    def run(self):
+
+        keymap = Keymap.get_instance()
+        screen_topology = keymap.get_screen_topology(MoveWindow.ADJACENT_SCREEN_TOLERANCE)
+
+        focused_frame = None
+        focused_title = None
+        if self.wnd:
+            focused_frame = self.wnd.get_attribute_value("AXFrame")
+            focused_title = self.wnd.get_attribute_value("AXTitle")
+
+        if focused_frame:
+            screen = screen_topology.get_best_screen(focused_frame)
+        elif screen_topology.screens:
+            screen = screen_topology.screens[0]
+        else:
+            return None
+
+        windows = []
+        for app_name, wnd, title, frame in keymap.window_index.get_windows():
+            if screen_topology.get_best_screen(frame) != screen:
+                continue
+            is_focused = ( title == focused_title and list(frame) == list(focused_frame) )
+            windows.append( ( not is_focused, frame[1], frame[0], app_name, wnd ) )
+
+        windows.sort( key=lambda item: item[:3] )
+
+        frames = solve_layout( self.layout, screen, len(windows), self.gap, self.main_ratio )
+
+        num_failed = set_window_frames( keymap.window_frame_thread_pool, [ (app_name, wnd, frame) for (_, _, _, app_name, wnd), frame in zip(windows, frames) ], self.timeout )
+        if num_failed:
+            logger.warning(f"Laid out windows - {len(windows)} windows, {num_failed} applications failed")
+
+        for app_name in { window[3] for window in windows }:
+            keymap.window_index.invalidate(app_name)
+
+    def __repr__(self):
+        return f'LayoutWindows("{self.layout}",gap={self.gap})'
+
+
+class SaveWindowLayout(ThreadedAction):
+
+    """
+    A action class to save frames of all windows, to restore them later by RestoreWindowLayout.
+
+    Window layouts are saved in `~/.keyhac/window_layouts.json`.
+    """
+
+    lane = "window"
+    coalesce = "drop"
+
+    def __init__(self, name: str = "default"):
+
+        """
+        Initializes the action object.
+
+        Args:
+            name: Name of the window layout
+        """
+
+        self.name = name
+
+    def run(self):
+
+        keymap = Keymap.get_instance()
+
+        # Save the latest frames, not cached ones
+        keymap.window_index.invalidate()
+        windows = get_window_roles( keymap.window_thread_pool, keymap.window_index.get_windows() )
+
+        WindowLayoutStore().save( self.name, [ (app_name, role, title, frame) for app_name, wnd, role, title, frame in windows ] )
+
+        logger.info(f"Saved window layout {self.name} - {len(windows)} windows")
+
+    def __repr__(self):
+        return f'SaveWindowLayout("{self.name}")'
+
+
+class RestoreWindowLayout(ThreadedAction):
+
+    """
+    A action class to restore frames of windows saved by SaveWindowLayout.
+
+    Windows are moved concurrently for each application.
+    Applications not responding within the timeout are given up, so that they don't stall others.
+    """
+
+    lane = "window"
+    coalesce = "drop"
+
+    def __init__(self, name: str = "default", timeout: float = 2.0):
+
+        """
+        Initializes the action object.
+
+        Args:
+            name: Name of the window layout
+            timeout: Timeout in seconds for each application (default: 2.0)
+        """
+
+        self.name = name
+        self.timeout = timeout
+
+    def run(self):
+
+        keymap = Keymap.get_instance()
+
+        saved_windows = WindowLayoutStore().load(self.name)
+        if saved_windows is None:
+            logger.warning(f"Window layout {self.name} is not saved")
+            return
+
+        keymap.window_index.invalidate()
+        windows = get_window_roles( keymap.window_thread_pool, keymap.window_index.get_windows() )
+
+        matched_windows = WindowLayoutStore.match( saved_windows, windows )
+        num_failed = set_window_frames( keymap.window_frame_thread_pool, matched_windows, self.timeout )
+
+        keymap.window_index.invalidate()
+
+        logger.info(f"Restored window layout {self.name} - {len(matched_windows)} windows moved, {num_failed} applications failed")
+
+    def __repr__(self):
+        return f'RestoreWindowLayout("{self.name}")'
+
+
 class LaunchApplication(ThreadedAction):
 
     """
@@ -379,6 +688,8 @@ class LaunchApplication(ThreadedAction):
     If the application is already running, macOS automatically make it foreground.
     """
 
+    lane = "launch"
+
     def __init__(self, app_name):
 
         """
@@ -478,7 +789,7 @@ class ChooserAction:
         pass
 
     def __repr__(self):
-        return f"ChooserAction()"
+        return "ChooserAction()"
 
 
 class ClipboardChooserAction(ChooserAction):
@@ -502,7 +813,7 @@ class ClipboardChooserAction(ChooserAction):
             input_ctx.send_key("Cmd-V")
 
     def __repr__(self):
-        return f"ClipboardChooserAction()"
+        return "ClipboardChooserAction()"
 
 
 class ShowClipboardHistory(ClipboardChooserAction):
@@ -530,7 +841,7 @@ class ShowClipboardHistory(ClipboardChooserAction):
         self._on_chosen_common(item[2], modifier_flags)
 
     def __repr__(self):
-        return f"ShowClipboardHistory()"
+        return "ShowClipboardHistory()"
 
 
 class ShowClipboardSnippets(ClipboardChooserAction):
@@ -607,7 +918,7 @@ class ShowClipboardTools(ClipboardChooserAction):
         self._on_chosen_common(clip, modifier_flags)
 
     def __repr__(self):
-        return f"ShowClipboardTools()"
+        return "ShowClipboardTools()"
 
     @staticmethod
     def to_plain(clip):
@@ -716,7 +1027,7 @@ class StartRecordingKeys:
         keymap.replay_buffer.start_recording()
 
     def __repr__(self):
-        return f"StartRecordingKeys()"
+        return "StartRecordingKeys()"
 
 
 class StopRecordingKeys:
@@ -736,7 +1047,7 @@ class StopRecordingKeys:
         keymap.replay_buffer.stop_recording()
 
     def __repr__(self):
-        return f"StopRecordingKeys()"
+        return "StopRecordingKeys()"
 
 
 class ToggleRecordingKeys:
@@ -756,7 +1067,7 @@ class ToggleRecordingKeys:
         keymap.replay_buffer.toggle_recording()
 
     def __repr__(self):
-        return f"ToggleRecordingKeys()"
+        return "ToggleRecordingKeys()"
 
 
 class PlaybackRecordedKeys:
@@ -776,5 +1087,5 @@ class PlaybackRecordedKeys:
         keymap.replay_buffer.playback()
 
     def __repr__(self):
-        return f"PlaybackRecordedKeys()"
+        return "PlaybackRecordedKeys()"
 
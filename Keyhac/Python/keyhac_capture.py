@@ -0,0 +1,163 @@
+import os
+import time
+import json
+import struct
+
+import keyhac_console
+
+logger = keyhac_console.getLogger("Capture")
+
+# Capture file format:
+#
+#   Header : CAPTURE_MAGIC (8 bytes)
+#   Record : record type (uint8), time since the previous record in microseconds (uint32), and following data
+#     RECORD_KEY   : compact key payload ( keyCode << 8 | event type code ) (int32)
+#     RECORD_FOCUS : length (uint16) and UTF-8 JSON of [ [role, title], ... ] from the application to the focused element
+#
+# All values are little endian.
+
+CAPTURE_MAGIC = b"KHCAP\x00\x01\x00"
+
+RECORD_KEY = 1
+RECORD_FOCUS = 2
+
+_record_header = struct.Struct("<BI")
+_key_data = struct.Struct("<i")
+_focus_data = struct.Struct("<H")
+
+
+class HookCapture:
+
+    """
+    A recorder of keyboard hook traffic
+
+    HookCapture writes key event payloads of the keyboard hook and snapshots of the focused element
+    to a compact binary file, to replay the same workload by the benchmark script (BuildScripts/benchmark_keymap.py).
+    Use Keymap.start_capture() and Keymap.stop_capture() to record.
+
+    HookCapture class has following class variables:
+    - max_title_length: Maximum length of titles in focus snapshots (default: 256)
+    """
+
+    max_title_length = 256
+
+    def __init__(self, filename: str):
+
+        """
+        Initializes the recorder, and opens the capture file.
+
+        Args:
+            filename: Capture file name
+        """
+
+        self.filename = filename
+        self.num_key_records = 0
+        self.num_focus_records = 0
+
+        self._last_time = time.perf_counter()
+        self._last_focus_elm = None
+        self._last_focus_snapshot = None
+
+        os.makedirs( os.path.dirname(os.path.abspath(filename)), exist_ok=True )
+        self._fd = open(filename, "wb")
+        self._fd.write(CAPTURE_MAGIC)
+
+    def _write_record_header(self, record_type):
+        now = time.perf_counter()
+        delta = min( int((now - self._last_time) * 1000000), 0xffffffff )
+        self._last_time = now
+        self._fd.write( _record_header.pack(record_type, delta) )
+
+    def record_key(self, payload, focus_elm=None) -> None:
+
+        """
+        Record a key event payload, preceded by a focus snapshot if the focus has changed.
+
+        Args:
+            payload: Compact key payload ( keyCode << 8 | event type code )
+            focus_elm: Focused UI element
+        """
+
+        if focus_elm is not None and focus_elm is not self._last_focus_elm:
+            self._last_focus_elm = focus_elm
+            self.record_focus(focus_elm)
+
+        self._write_record_header(RECORD_KEY)
+        self._fd.write( _key_data.pack(payload) )
+        self.num_key_records += 1
+
+    def record_focus(self, elm) -> None:
+
+        """
+        Record a snapshot of the focused element, if it is different from the previous one.
+
+        Args:
+            elm: Focused UI element
+        """
+
+        snapshot = []
+        while elm:
+            role = elm.get_attribute_value("AXRole") or ""
+            title = elm.get_attribute_value("AXTitle") or ""
+            snapshot.append( [ role, title[:self.max_title_length] ] )
+            elm = elm.get_attribute_value("AXParent")
+        snapshot.reverse()
+
+        if snapshot == self._last_focus_snapshot:
+            return
+        self._last_focus_snapshot = snapshot
+
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(data) > 0xffff:
+            logger.warning(f"Focus snapshot is too large to capture ({len(data)} bytes)")
+            return
+
+        self._write_record_header(RECORD_FOCUS)
+        self._fd.write( _focus_data.pack(len(data)) )
+        self._fd.write(data)
+        self.num_focus_records += 1
+
+    def close(self) -> None:
+
+        """
+        Close the capture file.
+        """
+
+        if self._fd:
+            self._fd.close()
+            self._fd = None
+
+
+def read_capture(filename: str):
+
+    """
+    Read records from a capture file.
+
+    Args:
+        filename: Capture file name
+
+    Yields:
+        Tuples of (record type, time since the previous record in seconds, data).
+        Data is a compact key payload for RECORD_KEY, and a list of [role, title] for RECORD_FOCUS.
+    """
+
+    with open(filename, "rb") as fd:
+
+        if fd.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"Not a capture file: {filename}")
+
+        while True:
+            header = fd.read(_record_header.size)
+            if len(header) < _record_header.size:
+                break
+
+            record_type, delta = _record_header.unpack(header)
+
+            if record_type == RECORD_KEY:
+                payload, = _key_data.unpack(fd.read(_key_data.size))
+                yield record_type, delta / 1000000, payload
+            elif record_type == RECORD_FOCUS:
+                length, = _focus_data.unpack(fd.read(_focus_data.size))
+                yield record_type, delta / 1000000, json.loads(fd.read(length).decode("utf-8"))
+            else:
+                raise ValueError(f"Unknown record type {record_type} in {filename}")
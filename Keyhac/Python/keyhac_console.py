@@ -1,19 +1,185 @@
 import sys
+import time
+import atexit
 import logging
+import threading
 import keyhac_core
 from keyhac_const import CONSOLE_STYLE_DEFAULT, CONSOLE_STYLE_ERROR, CONSOLE_STYLE_WARNING
 
 
+class ConsoleWriter:
+
+    """
+    A background writer for the Keyhac Console.
+
+    Writes are queued and flushed by a background thread every `interval` seconds,
+    so that print() and logging don't block the keyboard hook thread with native UI calls.
+    Consecutive writes with the same stream and log level are joined into a single call.
+
+    When more than `max_queue_size` writes are queued, following writes are dropped
+    until the next flush, and "N lines suppressed" message is written instead.
+
+    Special text fields of the Console window ("lastKey", "focusPath", ...) are also updated by the flush.
+    Only the latest value of each field is kept, and it is formatted at the flush time.
+
+    ConsoleWriter class has following class variables:
+    - interval: Flush interval in seconds (default: 0.05)
+    - max_queue_size: Maximum number of queued writes (default: 1000)
+    """
+
+    interval = 0.05
+    max_queue_size = 1000
+
+    _instance = None
+
+    @staticmethod
+    def get_instance():
+
+        """
+        Get the ConsoleWriter singleton instance.
+
+        Returns:
+            ConsoleWriter singleton instance.
+        """
+
+        if not ConsoleWriter._instance:
+            ConsoleWriter._instance = ConsoleWriter()
+        return ConsoleWriter._instance
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._event = threading.Event()
+        self._queue = []                # List of ( stream, log level, string )
+        self._suppressing = False       # Whether writes are dropped until the next flush
+        self._num_suppressed_lines = 0  # Lines dropped since the last flush
+        self._texts = {}                # Table of text field name to ( formatter, args )
+        self._thread = None
+
+        self.num_writes = 0
+        self.num_flushes = 0
+        self.num_suppressed_lines = 0
+
+        atexit.register(self.flush)
+
+    def write(self, stream, s: str, log_level: int = 100) -> None:
+
+        """
+        Queue a string to write to the Keyhac Console and the stream.
+
+        Args:
+            stream: Stream to write the string to, in addition to the Keyhac Console
+            s: String to write
+            log_level: Log level of the string
+        """
+
+        with self._lock:
+
+            self.num_writes += 1
+
+            if self._suppressing or len(self._queue) >= self.max_queue_size:
+                self._suppressing = True
+                self._num_suppressed_lines += s.count("\n")
+                return
+
+            self._queue.append( (stream, log_level, s) )
+            self._start_thread()
+
+        self._event.set()
+
+    def set_text(self, name: str, formatter, *args) -> None:
+
+        """
+        Update a special text field of the Keyhac Console at the next flush.
+
+        Args:
+            name: "lastKey", "focusPath" or "latency"
+            formatter: Function to return the contents of the text field from args. Called at the flush time.
+            args: Arguments for the formatter. They must not be modified after passed.
+        """
+
+        with self._lock:
+            self._texts[name] = (formatter, args)
+            self._start_thread()
+
+        self._event.set()
+
+    def _start_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_thread, name="ConsoleWriter", daemon=True)
+            self._thread.start()
+
+    def flush(self) -> None:
+
+        """
+        Write all queued strings immediately.
+        """
+
+        with self._flush_lock:
+
+            with self._lock:
+                queue = self._queue
+                suppressing = self._suppressing
+                num_suppressed_lines = max( self._num_suppressed_lines, 1 ) if suppressing else 0
+                texts = self._texts
+                self._queue = []
+                self._suppressing = False
+                self._num_suppressed_lines = 0
+                self._texts = {}
+
+            for name, (formatter, args) in texts.items():
+                try:
+                    keyhac_core.Console.set_text(name, formatter(*args))
+                except:
+                    pass
+
+            if not queue and not suppressing:
+                return
+
+            self.num_flushes += 1
+
+            if suppressing:
+                self.num_suppressed_lines += num_suppressed_lines
+                stream = queue[-1][0] if queue else sys.__stdout__
+                newline = "" if not queue or queue[-1][2].endswith("\n") else "\n"
+                queue.append( (stream, logging.WARNING, f"{newline}{CONSOLE_STYLE_WARNING}... {num_suppressed_lines} lines suppressed{CONSOLE_STYLE_DEFAULT}\n") )
+
+            # Join consecutive writes for the same stream and log level
+            i = 0
+            while i < len(queue):
+                stream, log_level, s = queue[i]
+                j = i + 1
+                while j < len(queue) and queue[j][0] is stream and queue[j][1] == log_level:
+                    j += 1
+                if j > i + 1:
+                    s = "".join( item[2] for item in queue[i:j] )
+                i = j
+
+                try:
+                    keyhac_core.Console.write(s, log_level)
+                    stream.write(s)
+                except:
+                    # Can't report errors to the console itself
+                    pass
+
+    def _flush_thread(self):
+        while True:
+            self._event.wait()
+            time.sleep(self.interval)
+            self._event.clear()
+            self.flush()
+
+
 class StandardIo:
     
     def __init__(self, default_stream):
         self.default_stream = default_stream
 
     def write(self, s):
-        keyhac_core.Console.write(s)
-        self.default_stream.write(s)
+        ConsoleWriter.get_instance().write(self.default_stream, s)
 
     def flush(self):
+        ConsoleWriter.get_instance().flush()
         self.default_stream.flush()
 
     @staticmethod
@@ -46,8 +212,7 @@ class ConsoleLoggingHandler(logging.Handler):
 
             s = f"{highlight_start}{self.format(record)}{highlight_end}\n"
 
-            keyhac_core.Console.write(s, record.levelno)
-            sys.__stdout__.write(s)
+            ConsoleWriter.get_instance().write(sys.__stdout__, s, record.levelno)
         
         except:
             self.handleError(record)
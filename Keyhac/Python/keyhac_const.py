@@ -156,12 +156,18 @@ MODKEY_FN_R    = 0x00200000
 MODKEY_USER0_R = 0x00400000
 MODKEY_USER1_R = 0x00800000
 
+MODKEY_LR_ALL = 0x00ffff00
+
 MODKEY_USER_ALL = ( 
     MODKEY_USER0   | MODKEY_USER1   |
     MODKEY_USER0_L | MODKEY_USER1_L |
     MODKEY_USER0_R | MODKEY_USER1_R 
 )
 
+KEY_EVENT_TYPE_DOWN           = 1
+KEY_EVENT_TYPE_UP             = 2
+KEY_EVENT_TYPE_HOOK_RESTORED  = 3
+
 CONSOLE_STYLE_DEFAULT = "\033[38;2;200;200;200m"
 CONSOLE_STYLE_TITLE =   "\033[38;2;255;255;255m"
 CONSOLE_STYLE_ERROR =   "\033[38;2;255;128;128m"
@@ -0,0 +1,284 @@
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, InvalidStateError
+from collections.abc import Callable
+
+from keyhac_latency import LatencyHistogram
+import keyhac_console
+
+logger = keyhac_console.getLogger("Executor")
+
+class ExecutorLane:
+
+    """
+    A named worker thread pool to run actions
+
+    Each lane has its own worker threads, so that a slow task in a lane doesn't delay tasks in other lanes.
+    Queued tasks are executed in priority order (higher first), and in submission order for the same priority.
+    Priorities only order tasks within a lane. Lanes don't share workers, so there is no priority between lanes.
+
+    Built-in lanes:
+    - "default": Lane for ThreadedAction and offloaded functions (1 worker)
+    - "window": Lane for window manipulation actions (1 worker)
+    - "launch": Lane for LaunchApplication (4 workers)
+    """
+
+    _lanes = {}
+    _lanes_lock = threading.Lock()
+
+    def __init__(self, name: str, max_workers: int = 1):
+
+        """
+        Initializes the lane. Use ExecutorLane.define() instead of directly calling this.
+
+        Args:
+            name: Name of the lane
+            max_workers: Maximum number of worker threads
+        """
+
+        self.name = name
+        self.max_workers = max_workers
+
+        self._cond = threading.Condition()
+        self._queue = []                # Heap of (-priority, sequence number, task)
+        self._sequence = itertools.count()
+        self._num_workers = 0
+        self._num_idle_workers = 0
+
+        self.wait_time = LatencyHistogram()
+        self.run_time = LatencyHistogram()
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.canceled = 0
+        self.timed_out = 0
+
+    def __repr__(self):
+        return f'ExecutorLane("{self.name}", max_workers={self.max_workers})'
+
+    @staticmethod
+    def define(name: str, max_workers: int = 1):
+
+        """
+        Define a lane, or update settings of an existing lane.
+
+        Args:
+            name: Name of the lane
+            max_workers: Maximum number of worker threads
+
+        Returns:
+            ExecutorLane object
+        """
+
+        with ExecutorLane._lanes_lock:
+            lane = ExecutorLane._lanes.get(name)
+            if lane is None:
+                lane = ExecutorLane(name, max_workers)
+                ExecutorLane._lanes[name] = lane
+            else:
+                with lane._cond:
+                    lane.max_workers = max_workers
+                    lane._cond.notify_all()
+            return lane
+
+    @staticmethod
+    def get(name: str):
+
+        """
+        Get a lane by name. Unknown names fall back to the "default" lane.
+
+        Args:
+            name: Name of the lane
+
+        Returns:
+            ExecutorLane object
+        """
+
+        try:
+            return ExecutorLane._lanes[name]
+        except KeyError:
+            logger.warning(f"Unknown executor lane: {name}")
+            return ExecutorLane._lanes["default"]
+
+    @staticmethod
+    def get_all() -> list:
+
+        """
+        Get all lanes.
+
+        Returns:
+            List of ExecutorLane objects
+        """
+
+        with ExecutorLane._lanes_lock:
+            return list(ExecutorLane._lanes.values())
+
+    def submit(self, func: Callable, priority: int = 0, timeout: float = None) -> Future:
+
+        """
+        Submit a task to the lane.
+
+        Args:
+            func: Function to execute in a worker thread
+            priority: Priority of the task within the lane
+            timeout: Timeout in seconds. None for no timeout.
+                When the task is still queued after the timeout since the submission, the task is canceled at that time,
+                even while workers are busy with other tasks.
+                When the task runs longer than the timeout since it started, TimeoutError is set to the future
+                as soon as the timeout expires, and the result of the task is discarded.
+
+        Returns:
+            Future object of the task. Queued tasks can be canceled by Future.cancel().
+        """
+
+        if priority is None:
+            priority = 0
+
+        future = Future()
+        submit_time = time.perf_counter_ns()
+
+        # [future, function, submission time, timeout, timer to cancel the queued task, timed out while queued]
+        task = [ future, func, submit_time, timeout, None, False ]
+        if timeout is not None:
+            task[4] = threading.Timer( timeout, self._set_queue_timed_out, (task,) )
+            task[4].daemon = True
+            task[4].start()
+
+        with self._cond:
+            heapq.heappush( self._queue, ( -priority, next(self._sequence), task ) )
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+            if self._num_idle_workers == 0 and self._num_workers < self.max_workers:
+                self._num_workers += 1
+                thread = threading.Thread(target=self._worker, name=f"{self.name}_{self._num_workers}", daemon=True)
+                thread.start()
+            else:
+                self._cond.notify()
+
+        return future
+
+    def _worker(self):
+
+        while True:
+
+            with self._cond:
+                while not self._queue or self._num_workers > self.max_workers:
+                    if self._num_workers > self.max_workers:
+                        self._num_workers -= 1
+                        return
+                    self._num_idle_workers += 1
+                    self._cond.wait()
+                    self._num_idle_workers -= 1
+                _, _, task = heapq.heappop(self._queue)
+
+            future, func, submit_time, timeout, queue_timer, _ = task
+
+            start_time = time.perf_counter_ns()
+            self.wait_time.record(start_time - submit_time)
+
+            if queue_timer is not None:
+                queue_timer.cancel()
+                if start_time - submit_time > timeout * 1e9:
+                    self._set_queue_timed_out(task)
+
+            if not future.set_running_or_notify_cancel():
+                # Tasks timed out while queued are counted in timed_out only
+                with self._cond:
+                    if not task[5]:
+                        self.canceled += 1
+                continue
+
+            # Watchdog to report the overrun as soon as the timeout expires, while func() is still running.
+            # The worker thread can't be interrupted, so it stays busy until func() returns.
+            watchdog = None
+            if timeout is not None:
+                watchdog = threading.Timer( timeout, self._set_timed_out, (future,) )
+                watchdog.daemon = True
+                watchdog.start()
+
+            try:
+                result = func()
+            except BaseException as e:
+                self._set_future_result(future, exception=e)
+                continue
+            else:
+                self._set_future_result(future, result=result)
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+                self.run_time.record(time.perf_counter_ns() - start_time)
+
+    def _set_queue_timed_out(self, task):
+        future = task[0]
+        with self._cond:
+            if task[5] or future.done():
+                return
+            task[5] = True
+        # Canceled out of the lock, because done callbacks of the future are called by cancel()
+        if future.cancel():
+            self.timed_out += 1
+        else:
+            # Already started
+            task[5] = False
+
+    def _set_timed_out(self, future):
+        try:
+            future.set_exception(TimeoutError(f"Task exceeded timeout in executor lane {self.name}"))
+        except InvalidStateError:
+            # Already finished
+            return
+        self.timed_out += 1
+
+    def _set_future_result(self, future, result=None, exception=None):
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # Already timed out by the watchdog
+            return
+        if exception is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def get_metrics(self) -> dict:
+
+        """
+        Get metrics of the lane.
+
+        Returns:
+            Dictionary of metrics. Times are in nanoseconds.
+        """
+
+        with self._cond:
+            queue_depth = len(self._queue)
+            num_workers = self._num_workers
+
+        return {
+            "name" : self.name,
+            "workers" : num_workers,
+            "queue_depth" : queue_depth,
+            "max_queue_depth" : self.max_queue_depth,
+            "submitted" : self.submitted,
+            "completed" : self.completed,
+            "failed" : self.failed,
+            "canceled" : self.canceled,
+            "timed_out" : self.timed_out,
+            "wait_p50" : self.wait_time.percentile(50),
+            "wait_p99" : self.wait_time.percentile(99),
+            "wait_max" : self.wait_time.max,
+            "run_p50" : self.run_time.percentile(50),
+            "run_p99" : self.run_time.percentile(99),
+            "run_max" : self.run_time.max,
+        }
+
+
+ExecutorLane.define("default", max_workers=1)
+ExecutorLane.define("window", max_workers=1)
+ExecutorLane.define("launch", max_workers=4)
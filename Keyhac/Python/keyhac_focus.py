@@ -1,18 +1,58 @@
+import re
+import time
 import fnmatch
+import threading
 import traceback
+import collections
+from concurrent.futures import Future
 from collections.abc import Callable
 
-from keyhac_core import UIElement
+from keyhac_core import Hook, UIElement
 import keyhac_console
 
 logger = keyhac_console.getLogger("Focus")
 
+class CustomConditionStats:
+
+    """
+    Execution statistics of a custom focus condition function
+    """
+
+    def __init__(self):
+        self.calls = 0              # Number of actual function calls
+        self.cache_hits = 0         # Number of results returned from the cache
+        self.timeouts = 0           # Number of calls exceeded the time budget
+        self.errors = 0             # Number of calls raised exceptions
+        self.total_time = 0.0       # Total execution time in seconds
+        self.max_time = 0.0         # Maximum execution time in seconds
+
+    def __repr__(self):
+        average_time = self.total_time / self.calls if self.calls else 0.0
+        return (
+            f"CustomConditionStats(calls={self.calls}, cache_hits={self.cache_hits}, "
+            f"timeouts={self.timeouts}, errors={self.errors}, "
+            f"average_time={average_time*1000:.3f}ms, max_time={self.max_time*1000:.3f}ms)"
+        )
+
+
 class FocusCondition:
 
     """
     A class to define keyboard focus condition
+
+    Results of the custom condition function are cached per focus path.
+    The custom condition function is executed with a time budget, and is treated as "not matched" when it times out.
+    Each call runs in its own daemon thread, so a function that never returns doesn't block other focus conditions.
+    While a timed out call is still running, the function is not called again and the condition is treated as "not matched".
+
+    FocusCondition class has following class variables to configure the custom condition function evaluation:
+    - custom_condition_timeout: Time budget of single custom condition function call in seconds. None to disable (default: 0.2)
+    - max_cache_items: Maximum number of cached results per focus condition (default: 64)
     """
 
+    custom_condition_timeout = 0.2
+    max_cache_items = 64
+
     def __init__( self, focus_path_pattern: str = None, custom_condition_func: Callable = None ):
 
         """
@@ -26,6 +66,10 @@ class FocusCondition:
         self.focus_path_pattern = focus_path_pattern
         self.custom_condition_func = custom_condition_func
 
+        self._cache = collections.OrderedDict()     # Focus path to result of custom_condition_func
+        self._timed_out_future = None               # Future of the timed out call, while it is still running
+        self.stats = CustomConditionStats()
+
     def check( self, focus_path: str, focus_elm: UIElement ) -> bool:
 
         """
@@ -39,18 +83,124 @@ class FocusCondition:
             Boolean result whether the condition met.
         """
 
+        return self.check_path(focus_path) and self.check_custom(focus_elm, focus_path)
+
+    def check_path( self, focus_path: str ) -> bool:
+
+        """
+        Check if the focus path matches the focus path pattern.
+
+        Args:
+            focus_path: Focus path string
+
+        Returns:
+            Boolean result whether the condition met.
+        """
+
         if self.focus_path_pattern and ( not focus_path or not fnmatch.fnmatch( focus_path, self.focus_path_pattern ) ):
             return False
-        
+        return True
+
+    def check_custom( self, focus_elm: UIElement, focus_path: str = None ) -> bool:
+
+        """
+        Check if the focused element meets the custom focus condition.
+
+        Args:
+            focus_elm: Focused UI element
+            focus_path: Focus path string, used as a key to cache the result. None to disable caching.
+
+        Returns:
+            Boolean result whether the condition met.
+        """
+
+        if not self.custom_condition_func:
+            return True
+
+        if not focus_elm:
+            return False
+
+        if focus_path is not None:
+            try:
+                result = self._cache[focus_path]
+                self._cache.move_to_end(focus_path)
+                self.stats.cache_hits += 1
+                return result
+            except KeyError:
+                pass
+
+        result = self._call_custom_condition_func(focus_elm)
+        if result is None:
+            return False
+
+        if focus_path is not None:
+            self._cache[focus_path] = result
+            while len(self._cache) > self.max_cache_items:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def _call_custom_condition_func(self, focus_elm):
+
+        # Returns None when the result is not reliable (timeout or error)
+
+        if self._timed_out_future is not None:
+            if not self._timed_out_future.done():
+                self.stats.timeouts += 1
+                return None
+            self._timed_out_future = None
+
+        start_time = time.perf_counter()
         try:
-            if self.custom_condition_func and ( not focus_elm or not self.custom_condition_func(focus_elm) ):
-                return False
-        except Exception as e:
+            if self.custom_condition_timeout is None:
+                return bool(self.custom_condition_func(focus_elm))
+            else:
+                future = Future()
+
+                def evaluate():
+                    future.set_running_or_notify_cancel()
+                    try:
+                        future.set_result(self.custom_condition_func(focus_elm))
+                    except BaseException as e:
+                        future.set_exception(e)
+
+                threading.Thread(target=evaluate, name="FocusCondition", daemon=True).start()
+
+                try:
+                    return bool(future.result(timeout=self.custom_condition_timeout))
+                except TimeoutError:
+                    self._timed_out_future = future
+                    raise
+
+        except TimeoutError:
+            self.stats.timeouts += 1
+            logger.warning(f"Custom focus condition function timed out - {self._func_name()}")
+            return None
+
+        except Exception:
+            self.stats.errors += 1
             print()
             logger.error(f"Running custom focus condition function failed:\n{traceback.format_exc()}")
-            return False
+            return None
 
-        return True
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            self.stats.calls += 1
+            self.stats.total_time += elapsed_time
+            self.stats.max_time = max(self.stats.max_time, elapsed_time)
+
+    def _func_name(self):
+        if hasattr(self.custom_condition_func, "__name__"):
+            return self.custom_condition_func.__name__
+        return repr(self.custom_condition_func)
+
+    def clear_cache(self) -> None:
+
+        """
+        Discard cached results of the custom condition function.
+        """
+
+        self._cache.clear()
 
     @staticmethod
     def get_focus_path(elm: UIElement) -> str:
@@ -101,3 +251,180 @@ class FocusCondition:
         focus_path = "/".join(focus_path_components)
 
         return focus_path
+
+
+class FocusPathMatcher:
+
+    """
+    A class to match a focus path against many focus path patterns at once
+
+    Identical patterns are evaluated only once. Patterns are indexed by their first path component
+    (e.g., "AXApplication(Xcode)") when it doesn't contain wildcards, so that only the patterns
+    for the focused application and the patterns starting with wildcards are evaluated.
+    """
+
+    def __init__(self, patterns: list[str]):
+
+        """
+        Initializes the matcher.
+
+        Args:
+            patterns: List of focus path patterns. None matches any focus path.
+        """
+
+        self._num_patterns = len(patterns)
+        self._always = []       # Indices of None patterns
+        self._regexes = []      # List of (compiled regex, indices of the pattern)
+        self._by_first = {}     # First path component to indices of self._regexes
+        self._generic = []      # Indices of self._regexes without literal first path component
+
+        regex_index_by_pattern = {}
+
+        for i, pattern in enumerate(patterns):
+
+            if not pattern:
+                self._always.append(i)
+                continue
+
+            if pattern in regex_index_by_pattern:
+                self._regexes[regex_index_by_pattern[pattern]][1].append(i)
+                continue
+
+            regex_index = len(self._regexes)
+            regex_index_by_pattern[pattern] = regex_index
+            self._regexes.append( ( re.compile(fnmatch.translate(pattern)), [i] ) )
+
+            first = FocusPathMatcher._literal_first_component(pattern)
+            if first is None:
+                self._generic.append(regex_index)
+            else:
+                self._by_first.setdefault(first, []).append(regex_index)
+
+    @staticmethod
+    def _literal_first_component(pattern):
+        if not pattern.startswith("/"):
+            return None
+        first = pattern[1:].split("/",1)[0]
+        if any( c in first for c in "*?[" ):
+            return None
+        return first
+
+    def match(self, focus_path: str) -> list[bool]:
+
+        """
+        Match a focus path against all the patterns.
+
+        Args:
+            focus_path: Focus path string
+
+        Returns:
+            List of boolean results, in the same order as the patterns.
+        """
+
+        result = [False] * self._num_patterns
+
+        for i in self._always:
+            result[i] = True
+
+        if not focus_path:
+            return result
+
+        candidates = self._by_first.get( focus_path[1:].split("/",1)[0], [] ) + self._generic
+
+        for regex_index in candidates:
+            regex, indices = self._regexes[regex_index]
+            if regex.match(focus_path):
+                for i in indices:
+                    result[i] = True
+
+        return result
+
+
+class FocusTracker:
+
+    """
+    A class to keep track of the focused UI element
+
+    FocusTracker refreshes the focused UI element and the focus path when the core hook system
+    notifies focus changes, so that key event handling can use the cached values.
+    Cached values are revalidated when they get older than `revalidation_interval` seconds.
+    When focus notifications are not available, the focus is checked every time.
+    """
+
+    revalidation_interval = 1.0
+
+    def __init__(self):
+
+        """
+        Initializes the focus tracker, and installs focus change hook to the core hook system.
+        """
+
+        self._focus = (None, None)          # Tuple of (focused UIElement, focus path)
+        self._notified = False              # Whether focus notification has been received at least once
+        self._last_update_time = None
+        self._listeners = []
+
+        Hook.set_callback("Focus", self._on_focus)
+
+    def add_listener(self, listener: Callable) -> None:
+
+        """
+        Add a function called when focus change is notified.
+
+        Args:
+            listener: Function receiving the focused UI element
+        """
+
+        self._listeners.append(listener)
+
+    def _on_focus(self, s):
+        try:
+            self._notified = True
+            self._refresh()
+            for listener in self._listeners:
+                listener(self._focus[0])
+        except Exception:
+            print()
+            logger.error(f"Updating focus failed:\n{traceback.format_exc()}")
+
+    def _get_focused_element(self):
+
+        app = UIElement.get_focused_application()
+        if not app: return None
+
+        focus = app.get_attribute_value("AXFocusedUIElement")
+        if focus: return focus
+
+        window = app.get_attribute_value("AXFocusedWindow")
+        if window: return window
+        
+        return app
+
+    def _refresh(self):
+        elm = self._get_focused_element()
+        self._focus = (elm, FocusCondition.get_focus_path(elm))
+        self._last_update_time = time.monotonic()
+
+    def invalidate(self) -> None:
+
+        """
+        Discard the cached focus, so that it is checked again at next get().
+        """
+
+        self._last_update_time = None
+
+    def get(self) -> tuple[UIElement, str]:
+
+        """
+        Get the focused UI element and the focus path.
+
+        Returns:
+            Tuple of (focused UI element, focus path string)
+        """
+
+        if ( not self._notified
+            or self._last_update_time is None
+            or time.monotonic() - self._last_update_time >= self.revalidation_interval ):
+            self._refresh()
+
+        return self._focus
@@ -1,6 +1,195 @@
 from keyhac_core import Hook
 from keyhac_const import *
-from keyhac_key import KeyCondition
+from keyhac_key import KeyProgram
+from keyhac_latency import PHASE_FLUSH
+
+def _send_keyboard_events_one_by_one(events, replay):
+    # Fallback for the core module without batched API
+    for event in events:
+        Hook.send_keyboard_event(event[0], event[1], replay)
+
+_send_keyboard_events = getattr(Hook, "send_keyboard_events", _send_keyboard_events_one_by_one)
+
+
+class ModifierTransitions:
+
+    """
+    A table of key events to change modifier key state
+
+    ModifierTransitions keeps modifier keys in a compact tuple, and memoizes the key events
+    needed for each pair of current and target modifier states,
+    so that sending modifier keys is a table lookup in most cases.
+    ModifierTransitions objects are created by Keymap, and rebuilt when modifier keys are redefined.
+    """
+
+    max_items = 1024
+
+    def __init__(self, vk_mod_map: dict, replay: bool):
+
+        """
+        Initializes the table.
+
+        Args:
+            vk_mod_map: Table of key code to modifier
+            replay: Whether user modifier keys are sent
+        """
+
+        # Ignore user modifier keys (when not replay mode), otherwise it causes key events of original meaning
+        self._vk_mods = tuple( (vk, mod) for vk, mod in vk_mod_map.items() if replay or not (mod & MODKEY_USER_ALL) )
+
+        self.mask = 0
+        for vk, mod in self._vk_mods:
+            self.mask |= mod
+
+        self._table = {}    # Table of (current modifier, target modifier) to (key events, new modifier)
+
+    def get(self, current: int, target: int) -> tuple:
+
+        """
+        Get key events to change modifier key state.
+
+        Args:
+            current: Current modifier state
+            target: Target modifier state
+
+        Returns:
+            Tuple of (key events, new modifier state)
+        """
+
+        mask = self.mask
+        key = ( current & mask, target & mask )
+
+        try:
+            events, new_modifier = self._table[key]
+        except KeyError:
+            events, new_modifier = self._compute(*key)
+            if len(self._table) >= self.max_items:
+                self._table.clear()
+            self._table[key] = (events, new_modifier)
+
+        return events, (current & ~mask) | new_modifier
+
+    def _compute(self, current, target):
+
+        events = []
+
+        # Key down modifier keys
+        for vk, mod in self._vk_mods:
+            if not ( mod & current ) and ( mod & target ):
+                events.append( ("keyDown", vk) )
+                current |= mod
+
+        # Key up modifier keys
+        for vk, mod in self._vk_mods:
+            if ( mod & current ) and not ( mod & target ):
+                events.append( ("keyUp", vk) )
+                current &= ~mod
+
+        return tuple(events), current
+
+
+class KeyEventOptimizer:
+
+    """
+    A peephole optimizer of key event sequences
+
+    KeyEventOptimizer removes redundant modifier key releases and re-presses (e.g., Cmd up followed by Cmd down)
+    between non-modifier key events, only when no other remaining key event falls between the release and the re-press.
+    Key state observed by every remaining key event and the final key state are preserved.
+    Modifier key taps (key down followed by key up) are preserved, because they can be meaningful by themselves.
+    User modifier keys are never removed, because they are ordinary keys for other applications.
+    Modifier keys released without being pressed earlier in the sequence are assumed to be pressed before the sequence,
+    same as sequences built by InputContext from the real modifier state.
+    KeyEventOptimizer objects are created by Keymap, and rebuilt when modifier keys are redefined.
+    """
+
+    def __init__(self, vk_mod_map: dict):
+
+        """
+        Initializes the optimizer.
+
+        Args:
+            vk_mod_map: Table of key code to modifier
+        """
+
+        self._modifier_vks = frozenset( vk for vk, mod in vk_mod_map.items() if not (mod & MODKEY_USER_ALL) )
+        self.num_input_events = 0
+        self.num_removed_events = 0
+
+    def optimize(self, events: list) -> list:
+
+        """
+        Optimize a key event sequence.
+
+        Args:
+            events: List of (event type, key code). Event type is "keyDown" or "keyUp".
+
+        Returns:
+            Optimized list of key events
+        """
+
+        modifier_vks = self._modifier_vks
+
+        result = []
+        pressed = set()     # Modifier keys pressed in the current run of modifier key events
+        releasing = {}      # Table of modifier key to index of the first key up event in the current run
+        removable = {}      # Table of modifier key to indices of key up / key down events to remove at the end of the run
+        released = set()    # Modifier keys released in the sequence and not pressed again
+        num_removed = 0
+
+        def end_of_run():
+            nonlocal num_removed
+            # Inner pairs first, so that a pair enclosing only removed events can be removed too
+            for i, j in sorted( removable.values(), key = lambda pair: pair[1] - pair[0] ):
+                if all( result[k] is None for k in range(i+1, j) ):
+                    result[i] = None
+                    result[j] = None
+                    num_removed += 2
+            pressed.clear()
+            releasing.clear()
+            removable.clear()
+
+        for event in events:
+
+            event_type, vk = event
+
+            if vk not in modifier_vks:
+                end_of_run()
+                result.append(event)
+
+            elif event_type=="keyDown":
+                released.discard(vk)
+                i = releasing.pop(vk, None)
+                if i is not None:
+                    # Released and pressed again. Removable unless released again in this run (it would be a tap).
+                    removable[vk] = ( i, len(result) )
+                else:
+                    pressed.add(vk)
+                result.append(event)
+
+            else:
+                if vk in removable:
+                    del removable[vk]
+                    pressed.add(vk)
+                elif vk in released:
+                    # Key up of a released key doesn't change the key state,
+                    # so a following key down can't be removed together with it.
+                    releasing.pop(vk, None)
+                elif vk not in pressed:
+                    releasing[vk] = len(result)
+                released.add(vk)
+                result.append(event)
+
+        end_of_run()
+
+        if num_removed:
+            result = [ event for event in result if event is not None ]
+
+        self.num_input_events += len(events)
+        self.num_removed_events += num_removed
+
+        return result
+
 
 class InputContext:
     
@@ -40,7 +229,8 @@ class InputContext:
         # Need to get modifier state after locking hook
         self._real_modifier = self._keymap._modifier
         self._virtual_modifier = self._keymap._modifier
-        self._vk_mod_map = self._keymap._vk_mod_map
+        self._modifier_transitions = self._keymap._get_modifier_transitions(self._replay)
+        self._key_event_optimizer = self._keymap._get_key_event_optimizer()
 
         return self
 
@@ -66,31 +256,7 @@ class InputContext:
         if not self._entered:
             raise ValueError("Not in the context.")
 
-        s = s.upper()
-
-        vk = None
-        mod = 0
-        down = None
-
-        token_list = s.split("-")
-
-        for token in token_list[:-1]:
-
-            token = token.strip()
-
-            try:
-                mod |= KeyCondition.str_to_mod( token, force_LR=True )
-            except ValueError:
-                if token=="D":
-                    down = True
-                elif token=="U":
-                    down = False
-                else:
-                    raise ValueError
-
-        token = token_list[-1].strip()
-
-        vk = KeyCondition.str_to_vk(token)
+        mod, vk, down = KeyProgram.parse_key(s)
 
         self.send_modifier_keys(mod)
 
@@ -102,6 +268,30 @@ class InputContext:
             self._input_seq.append( ("keyDown", vk) )
             self._input_seq.append( ("keyUp", vk) )
 
+    def send_program(self, program: KeyProgram) -> None:
+
+        """
+        Send key strokes of a precompiled key program.
+
+        Args:
+            program: KeyProgram object
+        """
+
+        if not self._entered:
+            raise ValueError("Not in the context.")
+
+        for mod, vk, down in program.steps:
+
+            self.send_modifier_keys(mod)
+
+            if down==True:
+                self._input_seq.append( ("keyDown", vk) )
+            elif down==False:
+                self._input_seq.append( ("keyUp", vk) )
+            else:
+                self._input_seq.append( ("keyDown", vk) )
+                self._input_seq.append( ("keyUp", vk) )
+
     def send_key_by_vk(self, vk: int, down: bool = True) -> None:
 
         """
@@ -130,27 +320,25 @@ class InputContext:
             mod: Target modifier state
         """
 
-        # Key down modifier keys
-        for vk_mod in self._vk_mod_map.items():
-            # Ignore user modifier keys (when not replay mode), otherwise it causes key events of original meaning
-            if (vk_mod[1] & MODKEY_USER_ALL) and (not self._replay):
-                continue
-            if not ( vk_mod[1] & self._virtual_modifier ) and ( vk_mod[1] & mod ):
-                self._input_seq.append( ("keyDown", vk_mod[0]) )
-                self._virtual_modifier |= vk_mod[1]
+        transitions = self._modifier_transitions
 
-        # Key up modifier keys
-        for vk_mod in self._vk_mod_map.items():
-            # Ignore user modifier keys (when not replay mode), otherwise it causes key events of original meaning
-            if (vk_mod[1] & MODKEY_USER_ALL) and (not self._replay):
-                continue
-            if ( vk_mod[1] & self._virtual_modifier ) and not ( vk_mod[1] & mod ):
-                self._input_seq.append( ("keyUp", vk_mod[0]) )
-                self._virtual_modifier &= ~vk_mod[1]
+        if not ( (self._virtual_modifier ^ mod) & transitions.mask ):
+            return
+
+        events, self._virtual_modifier = transitions.get(self._virtual_modifier, mod)
+        self._input_seq.extend(events)
 
     def _flush(self):
+
+        monitor = self._keymap.latency_monitor
+        start_time = monitor.now() if monitor.enabled else 0
+
         self.send_modifier_keys(self._real_modifier)
-        for event in self._input_seq:
-            Hook.send_keyboard_event(event[0], event[1], self._replay)
+        if self._key_event_optimizer:
+            self._input_seq = self._key_event_optimizer.optimize(self._input_seq)
+        if self._input_seq:
+            _send_keyboard_events(self._input_seq, self._replay)
         self._input_seq = []
 
+        if start_time: monitor.record(PHASE_FLUSH, start_time)
+
@@ -1,3 +1,5 @@
+import collections
+
 from keyhac_core import Hook
 from keyhac_const import *
 import keyhac_console
@@ -372,6 +374,72 @@ class KeyCondition:
     def __hash__(self):
         return self.vk
 
+    @staticmethod
+    def pack( vk: int, mod: int = 0, down: bool = True, oneshot: bool = False ) -> int:
+
+        """
+        Pack a concrete key state into an integer dispatch code.
+
+        Only left/right specific modifier bits are encoded,
+        because modifier state of real key events is always left/right specific.
+
+        Args:
+            vk: Key code.
+            mod: Modifier key bits.
+            down: Key down or up.
+            oneshot: One-shot key.
+
+        Returns:
+            Integer dispatch code.
+        """
+
+        return (vk << 24) | (mod & MODKEY_LR_ALL) | (down << 1) | oneshot
+
+    def to_code(self) -> int:
+
+        """
+        Get the integer dispatch code of this key condition.
+
+        Returns:
+            Integer dispatch code.
+        """
+
+        return KeyCondition.pack( self.vk, self.mod, self.down, self.oneshot )
+
+    def expand_codes(self) -> list[int]:
+
+        """
+        Expand generic/left/right modifier wildcards into all the concrete dispatch codes
+        this key condition matches.
+
+        Returns:
+            List of integer dispatch codes.
+        """
+
+        mods = [0]
+
+        for i in range(8):
+
+            generic = (self.mod >> i) & 1
+            left = (self.mod >> (i+8)) & 1
+            right = (self.mod >> (i+16)) & 1
+
+            if generic:
+                if left and not right:
+                    choices = [ 1<<(i+8), 1<<(i+8) | 1<<(i+16) ]
+                elif right and not left:
+                    choices = [ 1<<(i+16), 1<<(i+8) | 1<<(i+16) ]
+                elif left and right:
+                    choices = [ 1<<(i+8) | 1<<(i+16) ]
+                else:
+                    choices = [ 1<<(i+8), 1<<(i+16), 1<<(i+8) | 1<<(i+16) ]
+            else:
+                choices = [ (left<<(i+8)) | (right<<(i+16)) ]
+
+            mods = [ mod | choice for mod in mods for choice in choices ]
+
+        return [ KeyCondition.pack( self.vk, mod, self.down, self.oneshot ) for mod in mods ]
+
     def __eq__(self, other):
         if self.vk!=other.vk: return False
         if not KeyCondition.mod_eq( self.mod, other.mod ): return False
@@ -585,17 +653,126 @@ class KeyCondition:
         return True
 
 
+class KeyProgram:
+
+    """
+    A precompiled output key sequence
+
+    String and tuple values of KeyTable are compiled into KeyProgram when they are assigned,
+    so that key expressions are parsed only once, and invalid expressions are reported at configuration time.
+    KeyProgram object is immutable.
+    """
+
+    __slots__ = ( "source", "steps" )
+
+    def __init__(self, source, steps: tuple):
+
+        """
+        Initializes the program. Use KeyProgram.compile() instead of directly calling this.
+
+        Args:
+            source: Original key expression string or tuple
+            steps: Tuple of (target modifier mask, key code, direction). Direction is True: key down, False: key up, None: both.
+        """
+
+        object.__setattr__( self, "source", source )
+        object.__setattr__( self, "steps", steps )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KeyProgram is immutable")
+
+    def __repr__(self):
+        return repr(self.source)
+
+    @staticmethod
+    def parse_key(s: str) -> tuple:
+
+        """
+        Parse an output key expression string. (e.g., "Cmd-Left", "D-Shift")
+
+        Args:
+            s: Key expression string
+
+        Returns:
+            Tuple of (modifier mask, key code, direction). Direction is True: key down, False: key up, None: both.
+        """
+
+        s = s.upper()
+
+        mod = 0
+        down = None
+
+        token_list = s.split("-")
+
+        for token in token_list[:-1]:
+
+            token = token.strip()
+
+            try:
+                mod |= KeyCondition.str_to_mod( token, force_LR=True )
+            except ValueError:
+                if token=="D":
+                    down = True
+                elif token=="U":
+                    down = False
+                else:
+                    raise ValueError
+
+        token = token_list[-1].strip()
+
+        vk = KeyCondition.str_to_vk(token)
+
+        return ( mod, vk, down )
+
+    @staticmethod
+    def compile(value):
+
+        """
+        Compile an output key expression string, or a tuple/list of them.
+
+        Args:
+            value: Key expression string, or tuple/list of key expression strings
+
+        Returns:
+            KeyProgram object
+        """
+
+        if type(value)==str:
+            items = [value]
+        elif type(value)==list or type(value)==tuple:
+            items = value
+        else:
+            raise TypeError(f"Unsupported type of key action: {type(value)}")
+
+        steps = []
+        for item in items:
+            if type(item)!=str:
+                raise TypeError(f"Unsupported type of key action item: {type(item)}")
+            steps.append( KeyProgram.parse_key(item) )
+
+        if type(value)==list:
+            value = tuple(value)
+
+        return KeyProgram( value, tuple(steps) )
+
+
 class KeyTable:
 
     """
     A key table class
 
     KeyTable object can be used like a dictionary, to assign input key conditions to output key actions.
+    Output key expressions are compiled into KeyProgram objects when they are assigned.
+    Assigning None disables the key binding of other key-tables (e.g., the global key-table),
+    and the key passes through, same as before the compilation was introduced.
     """
 
+    generation = 0      # Incremented whenever any KeyTable is modified
+
     def __init__(self, name=None):
         self.name = name
         self.table = {}
+        self.compiled_table = {}    # Integer dispatch code to action
 
     def __setitem__( self, key, value ):
         try:
@@ -604,7 +781,23 @@ class KeyTable:
             logger.error(f"Invalid key expression: {key}")
             return
 
+        # None is stored as is. It disables bindings of other key-tables, and the key passes through.
+        if value is not None and not callable(value) and not isinstance(value, KeyTable):
+            try:
+                value = KeyProgram.compile(value)
+            except (ValueError, TypeError):
+                logger.error(f"Invalid output key expression for {key}: {value!r}")
+                return
+
+        replaced = key in self.table
         self.table[key] = value
+        KeyTable.generation += 1
+
+        if replaced:
+            self._compile()
+        else:
+            for code in key.expand_codes():
+                self.compiled_table[code] = value
 
     def __getitem__( self, key ):
         try:
@@ -613,7 +806,10 @@ class KeyTable:
             logger.error(f"Invalid key expression: {key}")
             return
 
-        return self.table[key]
+        value = self.table[key]
+        if isinstance(value, KeyProgram):
+            return value.source
+        return value
 
     def __delitem__( self, key ):
         try:
@@ -623,4 +819,88 @@ class KeyTable:
             return
 
         del self.table[key]
+        KeyTable.generation += 1
+        self._compile()
+
+    def _compile(self):
+
+        # Expanded codes of different key conditions never overlap,
+        # so the compiled table doesn't depend on the order of the entries.
+        self.compiled_table = {}
+        for key, value in self.table.items():
+            for code in key.expand_codes():
+                self.compiled_table[code] = value
+
+
+
+class KeyTableCache:
+
+    """
+    A LRU cache of unified key tables
+
+    KeyTableCache keeps merged and compiled key tables for recent focus conditions,
+    so that switching back to a recently used application doesn't need to re-merge key tables.
+    All cached tables are discarded automatically when any KeyTable is modified.
+
+    KeyTableCache has following attributes:
+    - max_items: Maximum number of unified key tables to keep (default: 32)
+    - hits: Number of cache hits
+    - misses: Number of cache misses
+    """
+
+    max_items = 32
+
+    def __init__(self):
+        self._items = collections.OrderedDict()
+        self._generation = KeyTable.generation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+
+        """
+        Get a cached unified key table.
+
+        Args:
+            key: Hashable cache key
+
+        Returns:
+            Unified key table, or None if not cached.
+        """
+
+        if self._generation != KeyTable.generation:
+            self.clear()
+
+        try:
+            table = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return table
+
+    def put(self, key, table: dict) -> None:
+
+        """
+        Add a unified key table to the cache.
+
+        Args:
+            key: Hashable cache key
+            table: Unified key table
+        """
+
+        self._items[key] = table
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+
+        """
+        Discard all cached unified key tables.
+        """
 
+        self._items.clear()
+        self._generation = KeyTable.generation
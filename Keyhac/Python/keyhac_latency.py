@@ -0,0 +1,223 @@
+import time
+
+import keyhac_console
+
+PHASE_TOTAL = 0
+PHASE_DECODE = 1
+PHASE_FOCUS = 2
+PHASE_UNIFIED_KEYTABLE = 3
+PHASE_LOOKUP = 4
+PHASE_ACTION = 5
+PHASE_FLUSH = 6
+
+PHASE_NAMES = (
+    "total",
+    "decode",
+    "focus",
+    "unified_keytable",
+    "lookup",
+    "action",
+    "flush",
+)
+
+
+class LatencyHistogram:
+
+    """
+    A fixed size histogram of latency values in nanoseconds
+
+    Values are counted in log-linear buckets (HDR histogram style),
+    so that relative precision is kept within about 6% for any magnitude
+    with a constant memory footprint and constant recording cost.
+    """
+
+    SUB_BUCKET_BITS = 5
+    MAX_EXPONENT = 32     # Values larger than about 2^37 ns (=137 sec) are clamped
+
+    _half = 1 << (SUB_BUCKET_BITS - 1)
+    _num_buckets = (MAX_EXPONENT + 2) * _half
+
+    def __init__(self):
+        self.counts = [0] * LatencyHistogram._num_buckets
+        self.count = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+
+        """
+        Record a latency value.
+
+        Args:
+            value: Latency in nanoseconds
+        """
+
+        if value < 0:
+            value = 0
+
+        exponent = value.bit_length() - LatencyHistogram.SUB_BUCKET_BITS
+        if exponent <= 0:
+            index = value
+        else:
+            if exponent > LatencyHistogram.MAX_EXPONENT:
+                exponent = LatencyHistogram.MAX_EXPONENT
+                value = (1 << (exponent + LatencyHistogram.SUB_BUCKET_BITS)) - 1
+            index = exponent * LatencyHistogram._half + (value >> exponent)
+
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def _bucket_upper_bound(index):
+        half = LatencyHistogram._half
+        if index < 2 * half:
+            return index
+        exponent = index // half - 1
+        mantissa = index - exponent * half
+        return ((mantissa + 1) << exponent) - 1
+
+    def percentile(self, p: float) -> int:
+
+        """
+        Get a percentile value.
+
+        Args:
+            p: Percentile (0-100)
+
+        Returns:
+            Latency in nanoseconds at the percentile.
+        """
+
+        if not self.count:
+            return 0
+
+        threshold = max(1, int(self.count * p / 100 + 0.5))
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= threshold:
+                return min(LatencyHistogram._bucket_upper_bound(index), self.max)
+
+        return self.max
+
+    def reset(self) -> None:
+
+        """
+        Clear all recorded values.
+        """
+
+        self.counts = [0] * LatencyHistogram._num_buckets
+        self.count = 0
+        self.max = 0
+
+
+class LatencyMonitor:
+
+    """
+    A class to measure latency of key event handling
+
+    LatencyMonitor records elapsed times of key event handling phases into LatencyHistograms.
+    Phases are "total", "decode", "focus", "unified_keytable", "lookup", "action" and "flush".
+    "unified_keytable" is a part of "focus", and "flush" is usually a part of "action".
+
+    LatencyMonitor has following attributes:
+    - enabled: Whether to measure latency (default: False). Set `keymap.latency_monitor.enabled = True` in config.py to enable.
+    - report_interval: Interval in seconds to update the summary in the Console window (default: 1.0)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.report_interval = 1.0
+        self._histograms = [ LatencyHistogram() for name in PHASE_NAMES ]
+        self._last_report_time = 0
+        self._dirty = False
+
+    @staticmethod
+    def now() -> int:
+
+        """
+        Get current time to measure latency.
+
+        Returns:
+            Monotonic time in nanoseconds.
+        """
+
+        return time.perf_counter_ns()
+
+    def record(self, phase: int, start_time: int) -> None:
+
+        """
+        Record elapsed time of a phase.
+
+        Args:
+            phase: Phase ID (PHASE_*)
+            start_time: Start time of the phase returned by now()
+        """
+
+        self._histograms[phase].record(time.perf_counter_ns() - start_time)
+        self._dirty = True
+
+    def get_stats(self) -> dict:
+
+        """
+        Get latency statistics.
+
+        Returns:
+            Dictionary of phase name to dictionary of "count", "p50", "p99" and "max" in nanoseconds.
+        """
+
+        stats = {}
+        for name, histogram in zip(PHASE_NAMES, self._histograms):
+            stats[name] = {
+                "count" : histogram.count,
+                "p50" : histogram.percentile(50),
+                "p99" : histogram.percentile(99),
+                "max" : histogram.max,
+            }
+        return stats
+
+    def get_summary(self) -> str:
+
+        """
+        Get a single line summary of latency statistics.
+
+        Returns:
+            Summary string in "phase p50/p99/max" format, in milliseconds.
+        """
+
+        items = []
+        for name, histogram in zip(PHASE_NAMES, self._histograms):
+            if not histogram.count:
+                continue
+            items.append(
+                f"{name} {histogram.percentile(50)/1e6:.2f}/{histogram.percentile(99)/1e6:.2f}/{histogram.max/1e6:.2f}"
+            )
+        return "p50/p99/max ms: " + ", ".join(items)
+
+    def update_console(self) -> None:
+
+        """
+        Update the latency summary in the Console window, if report_interval has passed since the last update.
+        """
+
+        if not self._dirty:
+            return
+
+        now = time.monotonic()
+        if now - self._last_report_time < self.report_interval:
+            return
+
+        self._last_report_time = now
+        self._dirty = False
+        keyhac_console.ConsoleWriter.get_instance().set_text("latency", self.get_summary)
+
+    def reset(self) -> None:
+
+        """
+        Clear all recorded latency values.
+        """
+
+        for histogram in self._histograms:
+            histogram.reset()
+        self._dirty = True
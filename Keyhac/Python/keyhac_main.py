@@ -1,16 +1,26 @@
-import sys
 import os
 import json
+import time
+import types
+import asyncio
+import functools
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from collections.abc import Callable
 
-from keyhac_core import Hook, UIElement, Console
+from keyhac_core import Hook, UIElement
 import keyhac_config
 import keyhac_console
-from keyhac_key import KeyCondition, KeyTable
-from keyhac_focus import FocusCondition
-from keyhac_input import InputContext
+from keyhac_key import KeyCondition, KeyProgram, KeyTable, KeyTableCache
+from keyhac_focus import FocusCondition, FocusPathMatcher, FocusTracker
+from keyhac_input import InputContext, ModifierTransitions, KeyEventOptimizer
 from keyhac_replay import KeyReplayBuffer
+from keyhac_latency import *
+from keyhac_trace import Tracer
+from keyhac_capture import HookCapture
+from keyhac_executor import ExecutorLane
+from keyhac_window import WindowIndex, ScreenTopology
 from keyhac_clipboard import ClipboardHistory
 from keyhac_const import *
 
@@ -23,6 +33,18 @@ class Keymap:
     """
     A keymap management class.
     Keymap class manages key-tables and executes key action translations.
+
+    Plain functions assigned to key-tables run in the keyboard hook thread.
+    When a plain function takes longer than `action_time_budget` seconds (default: 0.1),
+    subsequent calls of the function run in the "default" executor lane automatically, without the hook lock,
+    same as ThreadedAction.run(). Set `action_time_budget` to None to disable it.
+
+    Output key events are optimized by removing redundant modifier key releases and re-presses.
+    Set `optimize_key_events` to False to disable it.
+
+    Key event traces (INPUT, OUTPUT, CALL, PASSTHRU, ...) are recorded by `tracer` (a Tracer object).
+    They are written to the console only when the console log level is "Debug".
+    Use `tracer.set_level(TRACE_BUFFER)` to record them in memory, and `tracer.dump()` to print them.
     """
     
     _instance = None
@@ -58,16 +80,40 @@ class Keymap:
         self._passthru_by_send = False
 
         self._keytable_list = []            # List of (FocusCondition, KeyTable)
+        self._focus_path_matcher = None     # FocusPathMatcher for all key tables in _keytable_list
         self._multi_stroke_keytable = None  # KeyTable for multi-stroke mode
-        self._unified_keytable = {}         # Key assignments aggregated from all active key tables
+        self._unified_keytable = {}         # Key assignments aggregated from all active key tables, by integer dispatch code
+        self._keytable_cache = KeyTableCache()  # Unified key tables for recent focus conditions
         self._vk_mod_map = {}               # Table of key code to modifier
+        self._modifier_transitions = {}     # Table of replay mode to ModifierTransitions
+        self._key_event_optimizer = None    # KeyEventOptimizer for current modifier keys
         self._vk_vk_map = {}                # Table of key code to key code
         self._focus_path = None             # Focus path of the current focus
         self._focus_elm = None              # UIElement of the current focus
         self._modifier = 0                  # Flags of currently pressed modifier keys
         self._last_keydown = None           # Key code of the last key down, to detect one-shot event
+        self._action_stats = {}             # Table of action to [count, total time, max time]
+        self._offloaded_actions = set()     # Actions to run in the worker thread
+
+        self.action_time_budget = 0.1
+        self.optimize_key_events = True
+
+        self._event_loop = None             # asyncio event loop for AsyncAction
+        self._event_loop_lock = threading.Lock()
 
         self.replay_buffer = KeyReplayBuffer()
+        self.latency_monitor = LatencyMonitor()
+        self._console_writer = keyhac_console.ConsoleWriter.get_instance()
+        self.tracer = Tracer()
+        self._capture = None                # HookCapture while capturing hook traffic
+
+        self._focus_tracker = FocusTracker()
+
+        self._window_thread_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="Window")
+        self._window_frame_thread_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="WindowFrame")
+        self._window_index = WindowIndex(self._window_thread_pool)
+        self._screen_topology = None
+        self._focus_tracker.add_listener(self._window_index.on_focus_changed)
 
         Hook.set_callback("Keyboard", self._on_key)
 
@@ -86,13 +132,22 @@ class Keymap:
         KeyCondition.init_vk_str_tables()
 
         self._keytable_list = []
+        self._focus_path_matcher = None
         self._multi_stroke_keytable = None
         self._unified_keytable = {}
+        self._keytable_cache.clear()
         self._vk_mod_map = {}
+        self._modifier_transitions = {}
+        self._key_event_optimizer = None
         self._vk_vk_map = {}
         self._focus_path = None
         self._focus_elm = None
         self._modifier = 0
+        self._action_stats = {}
+        self._offloaded_actions = set()
+
+        self._focus_tracker.invalidate()
+        self._window_index.invalidate()
 
         self._vk_mod_map[VK_LSHIFT   ] = MODKEY_SHIFT_L
         self._vk_mod_map[VK_RSHIFT   ] = MODKEY_SHIFT_R
@@ -174,6 +229,8 @@ class Keymap:
             return
 
         self._vk_mod_map[key] = mod
+        self._modifier_transitions = {}
+        self._key_event_optimizer = None
 
     def define_keytable( self, name: str = None, focus_path_pattern: str = None, custom_condition_func: Callable = None ) -> KeyTable:
 
@@ -201,8 +258,41 @@ class Keymap:
         if focus_path_pattern or custom_condition_func:
             focus_condition = FocusCondition( focus_path_pattern, custom_condition_func )
             self._keytable_list.append( (focus_condition, keytable) )
+            self._focus_path_matcher = None
+            self._keytable_cache.clear()
         return keytable
 
+    def clear_focus_condition_cache(self) -> None:
+
+        """
+        Discard cached results of custom focus condition functions of all key tables.
+
+        Call this method when custom focus condition functions need to be re-evaluated
+        without a focus path change.
+        """
+
+        for focus_condition, keytable in self._keytable_list:
+            focus_condition.clear_cache()
+        self._keytable_cache.clear()
+        self._focus_path = None
+
+    def get_focus_condition_stats(self) -> list:
+
+        """
+        Get execution statistics of custom focus condition functions.
+
+        Returns:
+            List of (KeyTable, CustomConditionStats), slowest first.
+        """
+
+        stats = [
+            (keytable, focus_condition.stats)
+            for focus_condition, keytable in self._keytable_list
+            if focus_condition.custom_condition_func
+        ]
+        stats.sort( key=lambda item: item[1].max_time, reverse=True )
+        return stats
+
     def _release_modifier_all(self):
         with self.get_input_context() as input_ctx:
             for vk_mod in self._vk_mod_map.items():
@@ -226,40 +316,182 @@ class Keymap:
 
         return InputContext(self, replay)
 
-    def _get_focused_element(self):
+    def _get_modifier_transitions(self, replay):
 
-        app = UIElement.get_focused_application()
-        if not app: return None
+        try:
+            return self._modifier_transitions[replay]
+        except KeyError:
+            transitions = ModifierTransitions(self._vk_mod_map, replay)
+            self._modifier_transitions[replay] = transitions
+            return transitions
 
-        focus = app.get_attribute_value("AXFocusedUIElement")
-        if focus: return focus
+    def _get_key_event_optimizer(self):
 
-        window = app.get_attribute_value("AXFocusedWindow")
-        if window: return window
-        
-        return app
+        if not self.optimize_key_events:
+            return None
+
+        if self._key_event_optimizer is None:
+            self._key_event_optimizer = KeyEventOptimizer(self._vk_mod_map)
+        return self._key_event_optimizer
+
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+
+        """
+        Get the asyncio event loop to run asynchronous actions.
+
+        The event loop runs in a background thread, which starts at the first call of this method.
+
+        Returns:
+            asyncio event loop
+        """
+
+        with self._event_loop_lock:
+            if self._event_loop is None:
+                event_loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=event_loop.run_forever, name="AsyncAction", daemon=True)
+                thread.start()
+                self._event_loop = event_loop
+            return self._event_loop
+
+    def get_screen_topology(self, adjacent_tolerance: float = 50) -> ScreenTopology:
+
+        """
+        Get the adjacency of screens. It is rebuilt only when the display configuration or the tolerance changed.
+
+        Args:
+            adjacent_tolerance: Maximum gap between adjacent screens, to account for the menu bar gap
+
+        Returns:
+            ScreenTopology object
+        """
+
+        screen_frames = UIElement.get_screen_frames()
+        screen_topology = self._screen_topology
+        if screen_topology is None or not screen_topology.matches(screen_frames, adjacent_tolerance):
+            screen_topology = ScreenTopology(screen_frames, adjacent_tolerance)
+            self._screen_topology = screen_topology
+        return screen_topology
+
+    def define_executor_lane( self, name: str, max_workers: int = 1 ) -> None:
+
+        """
+        Define an executor lane to run ThreadedAction, or change settings of an existing lane.
+
+        ThreadedAction classes choose the lane by the class variable "lane",
+        and the order among actions in the same lane by the class variable "priority".
+        Each lane has its own worker threads, and there is no priority between lanes.
+
+        Args:
+            name: Name of the lane
+            max_workers: Maximum number of worker threads
+        """
+
+        ExecutorLane.define( name, max_workers )
+
+    def get_executor_lane_metrics(self) -> list:
+
+        """
+        Get metrics of executor lanes, such as queue depth, wait time and run time.
+
+        Returns:
+            List of dictionaries of metrics. Times are in nanoseconds.
+        """
+
+        return [ lane.get_metrics() for lane in ExecutorLane.get_all() ]
+
+    def start_capture( self, filename: str = None ) -> str:
+
+        """
+        Start capturing keyboard hook traffic and focus changes to a file,
+        to replay the same workload by the benchmark script (BuildScripts/benchmark_keymap.py).
+
+        Args:
+            filename: Capture file name. If omitted, a new file in `~/.keyhac/captures` is used.
+
+        Returns:
+            Capture file name
+        """
+
+        self.stop_capture()
+
+        if filename is None:
+            filename = os.path.expanduser( time.strftime("~/.keyhac/captures/capture_%Y%m%d_%H%M%S.khcap") )
+
+        self._capture = HookCapture(filename)
+        logger.info(f"Capture started: {filename}")
+        return filename
+
+    def stop_capture(self) -> None:
+
+        """
+        Stop capturing keyboard hook traffic.
+        """
+
+        capture = self._capture
+        if capture:
+            self._capture = None
+            capture.close()
+            logger.info(f"Capture stopped: {capture.num_key_records} key events, {capture.num_focus_records} focus changes")
 
     def _check_focus_change(self):
-        
-        elm = self._get_focused_element()
+
+        monitor = self.latency_monitor
+        start_time = monitor.now() if monitor.enabled else 0
+
+        elm, new_focus_path = self._focus_tracker.get()
 
         self._focus_elm = elm
-        new_focus_path = FocusCondition.get_focus_path(elm)
 
         if self._focus_path != new_focus_path:
-            logger.debug(f"Focus path: {new_focus_path}")
-            Console.set_text("focusPath", new_focus_path)
+            if self.tracer.active: self.tracer.trace("Focus path: %s", new_focus_path)
+            self._console_writer.set_text("focusPath", str, new_focus_path)
             self._focus_path = new_focus_path
             self._update_unified_keytable()
 
-    def _on_key(self, s):
+        if start_time: monitor.record(PHASE_FOCUS, start_time)
+
+    def _on_key(self, payload):
+
+        monitor = self.latency_monitor
+        start_time = monitor.now() if monitor.enabled else 0
+
+        self.tracer.update()
+
+        # Compact payload: ( keyCode << 8 | event type code )
+        if type(payload) is int:
+            event_type = payload & 0xff
+            vk = payload >> 8
+        else:
+            event_type, vk = self._decode_key_json(payload)
+
+        if self._capture:
+            self._capture.record_key( (vk << 8) | event_type, self._focus_tracker.get()[0] )
+
+        if start_time: monitor.record(PHASE_DECODE, start_time)
+
+        try:
+            if event_type==KEY_EVENT_TYPE_DOWN:
+                return self._on_key_down(vk)
+            elif event_type==KEY_EVENT_TYPE_UP:
+                return self._on_key_up(vk)
+            elif event_type==KEY_EVENT_TYPE_HOOK_RESTORED:
+                return self._on_key_hook_restored()
+        finally:
+            if start_time:
+                monitor.record(PHASE_TOTAL, start_time)
+                monitor.update_console()
+
+    def _decode_key_json(self, s):
+
+        # Compatibility fallback for JSON string payload
         d = json.loads(s)
         if d["type"]=="keyDown":
-            return self._on_key_down(d["keyCode"])
+            return KEY_EVENT_TYPE_DOWN, d["keyCode"]
         elif d["type"]=="keyUp":
-            return self._on_key_up(d["keyCode"])
+            return KEY_EVENT_TYPE_UP, d["keyCode"]
         elif d["type"]=="hookRestored":
-            return self._on_key_hook_restored()
+            return KEY_EVENT_TYPE_HOOK_RESTORED, 0
+        return 0, 0
 
     def _on_key_down( self, vk ):
 
@@ -281,32 +513,33 @@ class Keymap:
             if vk in self._vk_mod_map:
                 self._modifier |= self._vk_mod_map[vk]
                 if self._vk_mod_map[vk] & MODKEY_USER_ALL:
+                    self._setLastKeyText(vk, old_modifier)
                     key = KeyCondition( vk, old_modifier, down=True )
-                    self._setLastKeyText(key)
                     self._do_configured_key_action(key)
                     return True
 
+            self._setLastKeyText(vk, old_modifier)
+
             key = KeyCondition( vk, old_modifier, down=True )
 
-            self._setLastKeyText(key)
             if self._do_configured_key_action(key):
                 return True
             elif replaced:
                 with self.get_input_context() as input_ctx:
                     input_ctx.send_key_by_vk( vk, down=True )
-                    logger.debug(f"REPLACE  : {input_ctx}")
+                    if self.tracer.active: self.tracer.trace("REPLACE  : %s", str(input_ctx))
                 return True
             else:
                 if self._passthru_by_send:
                     with self.get_input_context() as input_ctx:
                         input_ctx.send_key_by_vk( vk, down=True )
-                        logger.debug(f"PASSTHRU : {key}")
+                        if self.tracer.active: self.tracer.trace("PASSTHRU : %s", key)
                     return True
                 else:
-                    logger.debug(f"PASSTHRU : {key}")
+                    if self.tracer.active: self.tracer.trace("PASSTHRU : %s", key)
                     return False
 
-        except Exception as e:
+        except Exception:
             print()
             logger.error(f"Unexpected error happened:\n{traceback.format_exc()}")
 
@@ -342,16 +575,16 @@ class Keymap:
                 elif replaced:
                     with self.get_input_context() as input_ctx:
                         input_ctx.send_key_by_vk( vk, down=False )
-                        logger.debug(f"REPLACE  : {input_ctx}")
+                        if self.tracer.active: self.tracer.trace("REPLACE  : %s", str(input_ctx))
                     return True
                 else:
                     if self._passthru_by_send:
                         with self.get_input_context() as input_ctx:
                             input_ctx.send_key_by_vk( vk, down=False )
-                            logger.debug(f"PASSTHRU : {key}")
+                            if self.tracer.active: self.tracer.trace("PASSTHRU : %s", key)
                         return True
                     else:
-                        logger.debug(f"PASSTHRU : {key}")
+                        if self.tracer.active: self.tracer.trace("PASSTHRU : %s", key)
                         return False
 
             finally:
@@ -359,14 +592,19 @@ class Keymap:
                     key = KeyCondition( vk, self._modifier, down=True, oneshot=True )
                     self._do_configured_key_action(key)
 
-        except Exception as e:
+        except Exception:
             print()
             logger.error(f"Unexpected error happened:\n{traceback.format_exc()}")
 
-    def _setLastKeyText(self, key):
-        s = str(key)
+    def _setLastKeyText(self, vk, mod):
+        # Formatted in the console writer thread, only for the latest key
+        self._console_writer.set_text("lastKey", self._formatLastKeyText, vk, mod)
+
+    @staticmethod
+    def _formatLastKeyText(vk, mod):
+        s = str(KeyCondition(vk, mod, down=True))
         if s.startswith("D-"): s = s[2:]
-        Console.set_text("lastKey", s)
+        return s
 
     def _on_key_hook_restored(self):
         logger.warning("Key hook timed out and has been restored.")
@@ -375,15 +613,19 @@ class Keymap:
         self._modifier = 0
 
     def _is_key_configured( self, key ):
-        return key in self._unified_keytable
+        return key.to_code() in self._unified_keytable
 
     def _do_configured_key_action( self, key ):
 
-        logger.debug(f"INPUT    : {key}")
-        
-        action = None
-        if key in self._unified_keytable:
-            action = self._unified_keytable[key]
+        tracer = self.tracer
+        if tracer.active: tracer.trace("INPUT    : %s", key)
+
+        monitor = self.latency_monitor
+        start_time = monitor.now() if monitor.enabled else 0
+
+        action = self._unified_keytable.get(key.to_code())
+
+        if start_time: monitor.record(PHASE_LOOKUP, start_time)
 
         left_multi_stroke = False
         if self._multi_stroke_keytable and key.down and not key.oneshot and not key.vk in self._vk_mod_map:
@@ -392,36 +634,99 @@ class Keymap:
 
         if action is None:
             return left_multi_stroke
-        
+
+        start_time = monitor.now() if monitor.enabled else 0
+
         if callable(action):
             if hasattr(action, "__name__"):
                 action_name = action.__name__
             else:
                 action_name = repr(action)
-            logger.debug(f"CALL     : {action_name}")
-            action()
+            if tracer.active: tracer.trace("CALL     : %s", action_name)
+            self._call_action(action, action_name, key)
 
         elif isinstance(action, KeyTable):
             self._enter_multi_stroke(action)
 
-        else:
-            if type(action)!=list and type(action)!=tuple:
-                action = [action]
-
-            logger.debug(f"OUTPUT   : {action}")
+        elif isinstance(action, KeyProgram):
+            if tracer.active: tracer.trace("OUTPUT   : %s", action)
 
             with self.get_input_context() as input_ctx:
-                for item in action:
-                    if type(item)==str:
-                        input_ctx.send_key(item)
-                    else:
-                        raise TypeError;
+                input_ctx.send_program(action)
+
+        else:
+            raise TypeError
+
+        if start_time: monitor.record(PHASE_ACTION, start_time)
 
         return True
 
+    def _call_action( self, action, action_name, key ):
+
+        try:
+            offloaded = action in self._offloaded_actions
+        except TypeError:
+            # Unhashable callable objects are never offloaded
+            offloaded = False
+
+        if offloaded:
+            future = ExecutorLane.get("default").submit(action)
+            future.add_done_callback(self._offloaded_action_done_callback)
+            return
+
+        start_time = time.perf_counter()
+        action()
+        elapsed_time = time.perf_counter() - start_time
+
+        try:
+            stats = self._action_stats[action]
+        except KeyError:
+            stats = self._action_stats[action] = [0, 0.0, 0.0]
+        except TypeError:
+            # Unhashable callable objects
+            return
+        stats[0] += 1
+        stats[1] += elapsed_time
+        stats[2] = max(stats[2], elapsed_time)
+
+        # Only plain functions are offloaded. Action classes control their own threading.
+        if ( self.action_time_budget is not None
+            and elapsed_time > self.action_time_budget
+            and isinstance(action, (types.FunctionType, types.MethodType, functools.partial)) ):
+
+            self._offloaded_actions.add(action)
+            logger.warning(
+                f"Action {action_name} for {key} took {elapsed_time*1000:.0f}ms, "
+                f"exceeding time budget {self.action_time_budget*1000:.0f}ms. "
+                f"Running it in a worker thread from now on."
+            )
+
+    def _offloaded_action_done_callback(self, future):
+        try:
+            future.result()
+        except Exception:
+            print()
+            logger.error(f"Offloaded action failed:\n{traceback.format_exc()}")
+
+    def get_action_stats(self) -> list:
+
+        """
+        Get execution statistics of actions executed in the keyboard hook thread.
+
+        Returns:
+            List of (action, number of calls, total time, max time, offloaded), slowest first.
+        """
+
+        stats = [
+            (action, count, total_time, max_time, action in self._offloaded_actions)
+            for action, (count, total_time, max_time) in self._action_stats.items()
+        ]
+        stats.sort( key=lambda item: item[3], reverse=True )
+        return stats
+
     def _enter_multi_stroke( self, keytable ):
 
-        logger.debug(f"Entering multi-stroke keytable - {keytable}")
+        if self.tracer.active: self.tracer.trace("Entering multi-stroke keytable - %s", keytable)
 
         self._multi_stroke_keytable = keytable
         self._update_unified_keytable()
@@ -435,7 +740,7 @@ class Keymap:
 
         if self._multi_stroke_keytable:
     
-            logger.debug(f"Leaving multi-stroke keytable - {self._multi_stroke_keytable}")
+            if self.tracer.active: self.tracer.trace("Leaving multi-stroke keytable - %s", self._multi_stroke_keytable)
 
             self._multi_stroke_keytable = None
             self._update_unified_keytable()
@@ -444,14 +749,45 @@ class Keymap:
 
     def _update_unified_keytable(self):
 
-        self._unified_keytable = {}
+        monitor = self.latency_monitor
+        start_time = monitor.now() if monitor.enabled else 0
 
         if self._multi_stroke_keytable:
-            self._unified_keytable.update(self._multi_stroke_keytable.table)
+            self._unified_keytable = dict(self._multi_stroke_keytable.compiled_table)
         else:
-            for focus_condition, keytable in self._keytable_list:
-                if focus_condition.check(self._focus_path, self._focus_elm):
-                    self._unified_keytable.update(keytable.table)
+            self._unified_keytable = self._get_unified_keytable_for_focus()
+
+        if start_time: monitor.record(PHASE_UNIFIED_KEYTABLE, start_time)
+
+    def _get_unified_keytable_for_focus(self):
+
+        if self._focus_path_matcher is None:
+            self._focus_path_matcher = FocusPathMatcher( [ focus_condition.focus_path_pattern for focus_condition, keytable in self._keytable_list ] )
+        path_results = self._focus_path_matcher.match(self._focus_path)
+
+        # Custom focus conditions depend on the focused element, so they are part of the cache key.
+        # They are evaluated only for keytables whose focus path pattern matched, same as FocusCondition.check().
+        custom_results = tuple(
+            focus_condition.check_custom(self._focus_elm, self._focus_path)
+            for (focus_condition, keytable), path_result in zip(self._keytable_list, path_results)
+            if path_result and focus_condition.custom_condition_func
+        )
+        cache_key = (self._focus_path, custom_results)
+
+        unified_keytable = self._keytable_cache.get(cache_key)
+        if unified_keytable is None:
+
+            unified_keytable = {}
+            custom_results = iter(custom_results)
+            for (focus_condition, keytable), path_result in zip(self._keytable_list, path_results):
+                if not path_result:
+                    continue
+                if focus_condition.custom_condition_func and not next(custom_results):
+                    continue
+                unified_keytable.update(keytable.compiled_table)
+            self._keytable_cache.put(cache_key, unified_keytable)
+
+        return unified_keytable
 
     @property
     def focus(self) -> UIElement:
@@ -462,6 +798,43 @@ class Keymap:
 
         return self._focus_elm
 
+    @property
+    def keytable_cache(self) -> KeyTableCache:
+
+        """
+        KeyTableCache object, to check cache hit/miss counters
+        """
+
+        return self._keytable_cache
+
+    @property
+    def window_index(self) -> WindowIndex:
+
+        """
+        WindowIndex object, to look up windows of running applications
+        """
+
+        return self._window_index
+
+    @property
+    def window_thread_pool(self) -> ThreadPoolExecutor:
+
+        """
+        Thread pool to access windows of multiple applications concurrently
+        """
+
+        return self._window_thread_pool
+
+    @property
+    def window_frame_thread_pool(self) -> ThreadPoolExecutor:
+
+        """
+        Thread pool to set window frames of multiple applications concurrently.
+        It is separated from window_thread_pool, because applications not responding can keep its threads busy.
+        """
+
+        return self._window_frame_thread_pool
+
     @property
     def clipboard_history(self) -> ClipboardHistory:
 
@@ -0,0 +1,146 @@
+import time
+import logging
+
+import keyhac_core
+import keyhac_console
+
+logger = keyhac_console.getLogger("Keymap")
+
+TRACE_OFF = 0       # Traces are not recorded
+TRACE_BUFFER = 1    # Traces are recorded in the ring buffer
+TRACE_CONSOLE = 2   # Traces are recorded in the ring buffer, and written to the console as debug logs
+
+class Tracer:
+
+    """
+    A low overhead tracer for the key event processing
+
+    Trace records are stored in a fixed size ring buffer without formatting,
+    and formatted only when they are dumped (or written to the console).
+    Call sites check `active` before calling trace(), so that disabled traces cost almost nothing.
+
+    Tracer has following attributes:
+    - level: TRACE_OFF, TRACE_BUFFER, or TRACE_CONSOLE (default: TRACE_OFF). Use set_level() to change.
+    - active: Whether traces are recorded
+    - check_interval: Interval in seconds to check the console log level (default: 1.0)
+
+    When the log level of the Console window is "Debug", traces are written to the console regardless of the level.
+    """
+
+    check_interval = 1.0
+
+    def __init__(self, capacity: int = 4096):
+
+        """
+        Initializes the tracer.
+
+        Args:
+            capacity: Maximum number of trace records to keep
+        """
+
+        self.level = TRACE_OFF
+        self.active = False
+        self._console_debug = False
+        self._last_check_time = 0
+
+        self._buffer = [None] * capacity
+        self._index = 0
+        self._count = 0
+
+    def set_level(self, level: int) -> None:
+
+        """
+        Change the trace level.
+
+        Args:
+            level: TRACE_OFF, TRACE_BUFFER, or TRACE_CONSOLE
+        """
+
+        self.level = level
+        self._update_active()
+
+    def _update_active(self):
+        self.active = self.level > TRACE_OFF or self._console_debug
+
+    def update(self) -> None:
+
+        """
+        Check the log level of the console periodically, to write traces to the console in debug mode.
+        """
+
+        now = time.monotonic()
+        if now - self._last_check_time < self.check_interval:
+            return
+        self._last_check_time = now
+
+        try:
+            self._console_debug = keyhac_core.Console.get_log_level() <= logging.DEBUG
+        except AttributeError:
+            # Core module without log level API. Keep writing traces to the console as before.
+            self._console_debug = True
+
+        self._update_active()
+
+    def trace(self, fmt: str, *args) -> None:
+
+        """
+        Record a trace. Check `active` before calling this method.
+
+        Args:
+            fmt: %-style format string
+            args: Arguments for the format string. They must not be modified after recorded.
+        """
+
+        self._buffer[self._index] = ( time.time(), fmt, args )
+        self._index = (self._index + 1) % len(self._buffer)
+        self._count += 1
+
+        if self.level >= TRACE_CONSOLE or self._console_debug:
+            logger.debug(fmt, *args)
+
+    def get_lines(self) -> list:
+
+        """
+        Get formatted trace records, from oldest to newest.
+
+        Returns:
+            List of strings
+        """
+
+        capacity = len(self._buffer)
+        if self._count < capacity:
+            records = self._buffer[:self._index]
+        else:
+            records = self._buffer[self._index:] + self._buffer[:self._index]
+
+        lines = []
+        for t, fmt, args in records:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(t)) + f".{int(t * 1000) % 1000:03d}"
+            try:
+                lines.append( f"{timestamp} {fmt % args}" )
+            except Exception:
+                lines.append( f"{timestamp} {fmt} {args!r}" )
+        return lines
+
+    def dump(self) -> None:
+
+        """
+        Write trace records in the ring buffer to the console.
+        """
+
+        lines = self.get_lines()
+        dropped = max( 0, self._count - len(lines) )
+
+        print( f"Trace records: {len(lines)} ({dropped} older records dropped)" )
+        for line in lines:
+            print(line)
+
+    def clear(self) -> None:
+
+        """
+        Discard all trace records.
+        """
+
+        self._buffer = [None] * len(self._buffer)
+        self._index = 0
+        self._count = 0
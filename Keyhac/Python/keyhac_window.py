@@ -0,0 +1,750 @@
+import os
+import json
+import time
+import math
+import bisect
+import threading
+import collections
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from keyhac_core import UIElement
+import keyhac_console
+
+logger = keyhac_console.getLogger("Window")
+
+class WindowEdgeIndex:
+
+    """
+    A spatial index of window edges, to find the nearest window edge blocking a moving window
+
+    For each direction, edges facing the moving window are stored in a sorted array,
+    so that the nearest edges are found by binary search instead of scanning all windows.
+    """
+
+    # Sign of the movement, and function to get the blocking edge position and the edge range from a window frame
+    _directions = {
+        "left":  ( -1, lambda f: ( f[0] + f[2], f[1], f[1] + f[3] ) ),
+        "right": (  1, lambda f: ( f[0],        f[1], f[1] + f[3] ) ),
+        "up":    ( -1, lambda f: ( f[1] + f[3], f[0], f[0] + f[2] ) ),
+        "down":  (  1, lambda f: ( f[1],        f[0], f[0] + f[2] ) ),
+    }
+
+    def __init__(self, frames: list):
+
+        """
+        Initializes the index.
+
+        Args:
+            frames: List of window frames in [x, y, width, height] format
+        """
+
+        self._edges = {}
+
+        for direction, (sign, get_edge) in WindowEdgeIndex._directions.items():
+            edges = []
+            for frame in frames:
+                pos, range_begin, range_end = get_edge(frame)
+                edges.append( (pos * sign, range_begin, range_end) )
+            edges.sort()
+            # Table of direction to (signed edge positions, edge ranges)
+            self._edges[direction] = ( [ edge[0] for edge in edges ], [ edge[1:] for edge in edges ] )
+
+    def update(self, removed_frames: list, added_frames: list) -> None:
+
+        """
+        Update the index in place for moved, resized, opened or closed windows, without rebuilding it.
+
+        Args:
+            removed_frames: List of old window frames to remove from the index
+            added_frames: List of new window frames to add to the index
+        """
+
+        for direction, (sign, get_edge) in WindowEdgeIndex._directions.items():
+
+            # Update copies and replace them at once, not to disturb queries running in other threads
+            positions, ranges = self._edges[direction]
+            positions = positions[:]
+            ranges = ranges[:]
+
+            for frame in removed_frames:
+                pos, range_begin, range_end = get_edge(frame)
+                pos *= sign
+                for i in range( bisect.bisect_left(positions, pos), bisect.bisect_right(positions, pos) ):
+                    if ranges[i] == (range_begin, range_end):
+                        del positions[i]
+                        del ranges[i]
+                        break
+
+            for frame in added_frames:
+                pos, range_begin, range_end = get_edge(frame)
+                pos *= sign
+                i = bisect.bisect_right(positions, pos)
+                positions.insert(i, pos)
+                ranges.insert(i, (range_begin, range_end))
+
+            self._edges[direction] = ( positions, ranges )
+
+    def find_blocking_distance(self, direction: str, front_pos: float, front_range: tuple, min_distance: float = 0) -> float:
+
+        """
+        Find the distance to the nearest window edge blocking the movement.
+
+        Args:
+            direction: either of "left", "right", "up", "down"
+            front_pos: Position of the front edge of the moving window
+            front_range: Range (begin, end) of the front edge of the moving window
+            min_distance: Edges nearer than this distance are ignored
+
+        Returns:
+            Distance to the nearest blocking edge, or None if no edge blocks.
+        """
+
+        sign = WindowEdgeIndex._directions[direction][0]
+        positions, ranges = self._edges[direction]
+        base = front_pos * sign
+
+        for i in range( bisect.bisect_left( positions, base + min_distance ), len(positions) ):
+            range_begin, range_end = ranges[i]
+            if not( front_range[1] <= range_begin or front_range[0] >= range_end ):
+                return positions[i] - base
+
+        return None
+
+class ScreenTopology:
+
+    """
+    Adjacency of screens (=displays), to find screens for windows
+
+    ScreenTopology precomputes neighbours of each screen in each direction,
+    sorted by the length of the shared edge, so that the best neighbour is found without scanning screens.
+    """
+
+    def __init__(self, screen_frames: list, adjacent_tolerance: float = 50):
+
+        """
+        Initializes the screen topology.
+
+        Args:
+            screen_frames: List of screen frames in [x, y, width, height] format
+            adjacent_tolerance: Maximum gap between adjacent screens, to account for the menu bar gap
+        """
+
+        self.screens = [ tuple(frame) for frame in screen_frames ]
+        self.adjacent_tolerance = adjacent_tolerance
+
+        # Table of (screen, direction) to list of (shared edge length, neighbour screen), longest first
+        self._neighbours = {}
+
+        for screen in self.screens:
+            for direction in ("left", "right", "up", "down"):
+                neighbours = []
+                for other in self.screens:
+                    if other is screen:
+                        continue
+                    overlap = self._get_adjacent_overlap(screen, other, direction)
+                    if overlap > 0:
+                        neighbours.append( (overlap, other) )
+                neighbours.sort( key=lambda item: item[0], reverse=True )
+                self._neighbours[(screen, direction)] = neighbours
+
+    def _get_adjacent_overlap(self, screen, other, direction):
+
+        cx, cy, cw, ch = screen
+        sx, sy, sw, sh = other
+        tol = self.adjacent_tolerance
+
+        if direction == "left":
+            adjacent = abs((sx + sw) - cx) <= tol
+        elif direction == "right":
+            adjacent = abs(sx - (cx + cw)) <= tol
+        elif direction == "up":
+            adjacent = abs((sy + sh) - cy) <= tol
+        elif direction == "down":
+            adjacent = abs(sy - (cy + ch)) <= tol
+        else:
+            return 0
+
+        if not adjacent:
+            return 0
+
+        if direction in ("left", "right"):
+            return min(cy + ch, sy + sh) - max(cy, sy)
+        else:
+            return min(cx + cw, sx + sw) - max(cx, sx)
+
+    def matches(self, screen_frames: list, adjacent_tolerance: float = 50) -> bool:
+
+        """
+        Check if this topology was built from the same screen frames and tolerance.
+
+        Args:
+            screen_frames: List of screen frames in [x, y, width, height] format
+            adjacent_tolerance: Maximum gap between adjacent screens
+
+        Returns:
+            True if the screen frames and the tolerance are same.
+        """
+
+        return self.adjacent_tolerance == adjacent_tolerance and self.screens == [ tuple(frame) for frame in screen_frames ]
+
+    def get_best_screen(self, frame: list) -> tuple:
+
+        """
+        Find the screen that has the most overlap with the window.
+
+        Args:
+            frame: Window frame in [x, y, width, height] format
+
+        Returns:
+            Screen frame in (x, y, width, height) format, or None if there is no screen.
+        """
+
+        wx, wy, ww, wh = frame[0], frame[1], frame[2], frame[3]
+        best_screen = self.screens[0] if self.screens else None
+        best_overlap = -1
+        for screen in self.screens:
+            sx, sy, sw, sh = screen
+            # Fast path for windows entirely in a screen
+            if sx <= wx and wx + ww <= sx + sw and sy <= wy and wy + wh <= sy + sh:
+                return screen
+            ox = max(0, min(wx + ww, sx + sw) - max(wx, sx))
+            oy = max(0, min(wy + wh, sy + sh) - max(wy, sy))
+            overlap = ox * oy
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best_screen = screen
+        return best_screen
+
+    def get_neighbours(self, screen: tuple, direction: str) -> list:
+
+        """
+        Get adjacent screens in the given direction.
+
+        Args:
+            screen: Screen frame
+            direction: either of "left", "right", "up", "down"
+
+        Returns:
+            List of (shared edge length, screen frame), longest first
+        """
+
+        return self._neighbours.get( (tuple(screen), direction), [] )
+
+    def get_neighbour(self, screen: tuple, direction: str) -> tuple:
+
+        """
+        Get the adjacent screen sharing the longest edge in the given direction.
+
+        Args:
+            screen: Screen frame
+            direction: either of "left", "right", "up", "down"
+
+        Returns:
+            Screen frame, or None if there is no adjacent screen.
+        """
+
+        neighbours = self.get_neighbours(screen, direction)
+        if neighbours:
+            return neighbours[0][1]
+        return None
+
+class WindowIndex:
+
+    """
+    A cache of windows of running applications
+
+    Reading window frames of all applications requires hundreds of accessibility API calls.
+    WindowIndex keeps windows per application, and refreshes only applications whose cache is stale,
+    so that window actions (e.g., MoveWindow with window_edge=True) can look them up quickly.
+    Applications are identified by process ID, so that applications with the same name are kept separately.
+
+    WindowIndex class has following class variables:
+    - ttl: Seconds to keep windows of each application (default: 1.0)
+    - app_list_ttl: Seconds to keep the list of running applications (default: 5.0)
+
+    Windows of the focused application are refreshed also when focus change is notified.
+    """
+
+    ttl = 1.0
+    app_list_ttl = 5.0
+
+    def __init__(self, thread_pool: ThreadPoolExecutor):
+
+        """
+        Initializes the window index.
+
+        Args:
+            thread_pool: Thread pool to read windows of multiple applications concurrently
+        """
+
+        self._thread_pool = thread_pool
+        self._lock = threading.Lock()
+        self._apps = {}                     # Table of application key to [application UIElement, application name, list of windows, last update time]
+        self._app_list_update_time = None
+        self._focused_app_dirty = False
+        self._edge_index = None
+
+        self.app_refresh_count = 0
+
+    def on_focus_changed(self, *args) -> None:
+
+        """
+        Mark windows of the focused application as stale.
+        This method is cheap, and actual refresh happens at the next query.
+        """
+
+        self._focused_app_dirty = True
+
+    def invalidate(self, app_name: str = None) -> None:
+
+        """
+        Discard cached windows.
+
+        Args:
+            app_name: Name of the application. None to discard all.
+        """
+
+        with self._lock:
+            if app_name is None:
+                self._apps.clear()
+                self._app_list_update_time = None
+                self._edge_index = None
+            else:
+                for entry in self._apps.values():
+                    if entry[1] == app_name:
+                        entry[3] = None
+
+    @staticmethod
+    def _get_app_key(app):
+
+        # Applications are keyed by process ID, because different applications can have the same name.
+        # Returns (application key, application name)
+        try:
+            app_name = app.get_attribute_value("AXTitle")
+            if not app_name:
+                return None, None
+            try:
+                pid = app.get_pid()
+            except AttributeError:
+                # Core module without get_pid(). Applications with the same name can't be distinguished.
+                pid = None
+            return (pid or app_name), app_name
+        except Exception:
+            return None, None
+
+    @staticmethod
+    def _get_windows(app):
+
+        windows = []
+        try:
+            app_name = app.get_attribute_value("AXTitle")
+            app_windows = app.get_attribute_value("AXWindows")
+            if app_windows:
+                for wnd in app_windows:
+                    minimized = wnd.get_attribute_value("AXMinimized")
+                    if minimized:
+                        continue
+
+                    title = wnd.get_attribute_value("AXTitle")
+                    if not title:
+                        continue
+
+                    frame = wnd.get_attribute_value("AXFrame")
+                    if not frame:
+                        continue
+
+                    windows.append( (app_name, wnd, title, frame) )
+        except Exception:
+            # Applications can quit while reading windows
+            logger.debug(f"Reading windows failed:\n{traceback.format_exc()}")
+
+        return windows
+
+    def _refresh_app_list(self, now):
+
+        apps = UIElement.get_running_applications()
+        app_keys = self._thread_pool.map(self._get_app_key, apps)
+
+        new_apps = {}
+        for app, (app_key, app_name) in zip(apps, app_keys):
+            if app_key is None:
+                continue
+            entry = self._apps.get(app_key)
+            if entry:
+                entry[0] = app
+                entry[1] = app_name
+            else:
+                entry = [app, app_name, [], None]
+            new_apps[app_key] = entry
+
+        if new_apps.keys() != self._apps.keys():
+            self._edge_index = None
+
+        self._apps = new_apps
+        self._app_list_update_time = now
+
+    def _refresh(self):
+
+        now = time.monotonic()
+
+        if self._app_list_update_time is None or now - self._app_list_update_time >= self.app_list_ttl:
+            self._refresh_app_list(now)
+
+        if self._focused_app_dirty:
+            self._focused_app_dirty = False
+            app = UIElement.get_focused_application()
+            entry = self._apps.get(self._get_app_key(app)[0]) if app else None
+            if entry:
+                entry[3] = None
+
+        stale_entries = [ entry for entry in self._apps.values() if entry[3] is None or now - entry[3] >= self.ttl ]
+        if not stale_entries:
+            return
+
+        removed_frames = []
+        added_frames = []
+
+        for entry, windows in zip( stale_entries, self._thread_pool.map( self._get_windows, [ entry[0] for entry in stale_entries ] ) ):
+            old_frames = collections.Counter( tuple(window[3]) for window in entry[2] )
+            new_frames = collections.Counter( tuple(window[3]) for window in windows )
+            if new_frames != old_frames:
+                # Only frames actually changed (e.g., the window moved by MoveWindow) are updated in the edge index
+                removed_frames += (old_frames - new_frames).elements()
+                added_frames += (new_frames - old_frames).elements()
+            entry[2] = windows
+            entry[3] = now
+
+        if self._edge_index is not None and (removed_frames or added_frames):
+            self._edge_index.update(removed_frames, added_frames)
+
+        self.app_refresh_count += len(stale_entries)
+
+    def get_windows(self) -> list:
+
+        """
+        Get windows of all running applications. Minimized windows and windows without title are excluded.
+
+        Returns:
+            List of (application name, window UIElement, window title, window frame)
+        """
+
+        with self._lock:
+            self._refresh()
+            return [ window for entry in self._apps.values() for window in entry[2] ]
+
+    def get_window_frames(self) -> list:
+
+        """
+        Get frames of windows of all running applications.
+
+        Returns:
+            List of window frames in [x, y, width, height] format
+        """
+
+        return [ frame for app_name, wnd, title, frame in self.get_windows() ]
+
+    def get_edge_index(self) -> WindowEdgeIndex:
+
+        """
+        Get the spatial index of window edges.
+        The index is built at the first call, and updated in place for changed window frames,
+        so that repeated MoveWindow doesn't rebuild it for each move.
+        It is rebuilt only when applications started or quit.
+
+        Returns:
+            WindowEdgeIndex object
+        """
+
+        with self._lock:
+            self._refresh()
+            if self._edge_index is None:
+                self._edge_index = WindowEdgeIndex( [ window[3] for entry in self._apps.values() for window in entry[2] ] )
+            return self._edge_index
+
+
+def solve_layout(layout: str, screen_frame: tuple, num_windows: int, gap: int = 0, main_ratio: float = 0.5) -> list:
+
+    """
+    Compute window frames to tile windows in a screen.
+
+    Args:
+        layout: either of "grid", "columns", "rows", "main_stack"
+        screen_frame: Screen frame in (x, y, width, height) format
+        num_windows: Number of windows
+        gap: Gap between windows and around windows in pixels
+        main_ratio: Width ratio of the main window in "main_stack" layout
+
+    Returns:
+        List of window frames in [x, y, width, height] format
+    """
+
+    if num_windows <= 0:
+        return []
+
+    sx, sy, sw, sh = screen_frame
+
+    def split(begin, length, count):
+        # Divide a range into cells with gaps, and return [(begin, length), ...]
+        cell = (length - gap * (count + 1)) / count
+        return [ ( round(begin + gap + (cell + gap) * i), round(cell) ) for i in range(count) ]
+
+    if layout == "columns":
+        return [ [ x, y, w, h ] for x, w in split(sx, sw, num_windows) for y, h in split(sy, sh, 1) ]
+
+    elif layout == "rows":
+        return [ [ x, y, w, h ] for y, h in split(sy, sh, num_windows) for x, w in split(sx, sw, 1) ]
+
+    elif layout == "grid":
+        num_columns = math.ceil(math.sqrt(num_windows))
+        num_rows = math.ceil(num_windows / num_columns)
+        columns = split(sx, sw, num_columns)
+        rows = split(sy, sh, num_rows)
+        return [ [ columns[i % num_columns][0], rows[i // num_columns][0], columns[i % num_columns][1], rows[i // num_columns][1] ] for i in range(num_windows) ]
+
+    elif layout == "main_stack":
+        if num_windows == 1:
+            return solve_layout("columns", screen_frame, 1, gap)
+        main_width = round(sw * main_ratio)
+        frames = solve_layout("columns", (sx, sy, main_width + gap // 2, sh), 1, gap)
+        frames += solve_layout("rows", (sx + main_width - gap // 2, sy, sw - main_width + gap // 2, sh), num_windows - 1, gap)
+        return frames
+
+    else:
+        raise ValueError(f"Unknown layout: {layout}")
+
+
+_busy_apps = set()              # Applications whose window frames are being set, including ones given up by timeout
+_busy_apps_lock = threading.Lock()
+
+def set_window_frames(thread_pool: ThreadPoolExecutor, windows: list, timeout: float = None) -> int:
+
+    """
+    Set frames of multiple windows concurrently.
+
+    Windows are grouped by application, and each application is handled in a separate thread,
+    so that the total time is about the time of the slowest application.
+
+    Args:
+        thread_pool: Thread pool to access applications concurrently.
+            Use a pool dedicated to this function (Keymap.window_frame_thread_pool),
+            because threads of applications given up by timeout are kept busy until the applications respond.
+        windows: List of (application name, window UIElement, window frame)
+        timeout: Timeout in seconds for each application. None for no timeout.
+            Applications not responding in time are given up, so that they don't stall others.
+            Applications still not responding from previous calls are skipped,
+            so that at most one thread per application is kept busy.
+
+    Returns:
+        Number of applications not completed due to errors, timeout, or previous timeout.
+    """
+
+    windows_by_app = {}
+    for app_name, wnd, frame in windows:
+        windows_by_app.setdefault(app_name, []).append( (wnd, frame) )
+
+    start_times = {}
+
+    def set_frames(app_name, app_windows):
+        try:
+            start_times[app_name] = start_time = time.monotonic()
+            for wnd, frame in app_windows:
+                if timeout is not None and time.monotonic() - start_time > timeout:
+                    raise TimeoutError
+                wnd.set_attribute_value("AXPosition", "point", [ frame[0], frame[1] ])
+                wnd.set_attribute_value("AXSize", "size", [ frame[2], frame[3] ])
+        finally:
+            with _busy_apps_lock:
+                _busy_apps.discard(app_name)
+
+    num_failed = 0
+
+    futures = {}
+    for app_name, app_windows in windows_by_app.items():
+        with _busy_apps_lock:
+            if app_name in _busy_apps:
+                logger.warning(f"Setting window frames skipped, still not responding - {app_name}")
+                num_failed += 1
+                continue
+            _busy_apps.add(app_name)
+        futures[ thread_pool.submit(set_frames, app_name, app_windows) ] = app_name
+
+    pending = set(futures)
+    while pending:
+
+        done, pending = wait( pending, None if timeout is None else min(timeout, 0.05) )
+
+        for future in done:
+            try:
+                future.result()
+            except TimeoutError:
+                logger.warning(f"Setting window frames timed out - {futures[future]}")
+                num_failed += 1
+            except Exception:
+                logger.warning(f"Setting window frames failed - {futures[future]}\n{traceback.format_exc()}")
+                num_failed += 1
+
+        # Give up applications which started but didn't complete in time
+        now = time.monotonic()
+        for future in list(pending):
+            start_time = start_times.get(futures[future])
+            if start_time is not None and now - start_time > timeout:
+                logger.warning(f"Setting window frames timed out - {futures[future]}")
+                pending.discard(future)
+                num_failed += 1
+
+    return num_failed
+
+
+def get_window_roles(thread_pool: ThreadPoolExecutor, windows: list) -> list:
+
+    """
+    Get subroles of multiple windows concurrently (e.g., "AXStandardWindow", "AXDialog").
+
+    Args:
+        thread_pool: Thread pool to access applications concurrently
+        windows: List of (application name, window UIElement, window title, window frame), as returned by WindowIndex.get_windows()
+
+    Returns:
+        List of (application name, window UIElement, window role, window title, window frame)
+    """
+
+    windows_by_app = {}
+    for window in windows:
+        windows_by_app.setdefault(window[0], []).append(window)
+
+    def get_roles(app_windows):
+        result = []
+        for app_name, wnd, title, frame in app_windows:
+            try:
+                role = wnd.get_attribute_value("AXSubrole")
+            except Exception:
+                role = None
+            result.append( (app_name, wnd, role or "", title, frame) )
+        return result
+
+    return [ window for app_windows in thread_pool.map( get_roles, windows_by_app.values() ) for window in app_windows ]
+
+
+class WindowLayoutStore:
+
+    """
+    Window layouts saved in a file (`~/.keyhac/window_layouts.json`)
+
+    A window layout is a list of window frames keyed by application name, window role and window title.
+    """
+
+    def __init__(self, filename: str = None):
+
+        """
+        Initializes the store.
+
+        Args:
+            filename: Path of the file. None for the default location.
+        """
+
+        if filename is None:
+            filename = os.path.expanduser("~/.keyhac/window_layouts.json")
+        self.filename = filename
+
+    def _load_all(self):
+        if os.path.exists(self.filename):
+            with open(self.filename) as fd:
+                return json.load(fd)["window_layouts"]
+        return {}
+
+    def get_names(self) -> list:
+
+        """
+        Get names of saved window layouts.
+
+        Returns:
+            List of names
+        """
+
+        return list(self._load_all().keys())
+
+    def save(self, name: str, windows: list) -> None:
+
+        """
+        Save a window layout.
+
+        Args:
+            name: Name of the window layout
+            windows: List of (application name, window role, window title, window frame)
+        """
+
+        layouts = self._load_all()
+        layouts[name] = [ [ app_name, role, title, *[ round(v) for v in frame ] ] for app_name, role, title, frame in windows ]
+
+        os.makedirs( os.path.dirname(self.filename), exist_ok=True )
+        with open(self.filename, "w") as fd:
+            json.dump( { "window_layouts" : layouts }, fd, separators=(",", ":") )
+
+    def load(self, name: str) -> list:
+
+        """
+        Load a window layout.
+
+        Args:
+            name: Name of the window layout
+
+        Returns:
+            List of (application name, window role, window title, window frame), or None if not saved.
+        """
+
+        layout = self._load_all().get(name)
+        if layout is None:
+            return None
+        return [ ( item[0], item[1], item[2], item[3:7] ) for item in layout ]
+
+    @staticmethod
+    def match(saved_windows: list, windows: list) -> list:
+
+        """
+        Match windows with saved windows.
+
+        Windows are matched by application name, window role and window title first.
+        Remaining windows are matched by application name and window role, in the saved order.
+
+        Args:
+            saved_windows: List of (application name, window role, window title, window frame), as returned by load()
+            windows: List of (application name, window UIElement, window role, window title, window frame)
+
+        Returns:
+            List of (application name, window UIElement, saved window frame) for windows to move
+        """
+
+        # Table of (application name, role, title) and (application name, role) to saved window indices
+        by_title = {}
+        by_role = {}
+        for i, (app_name, role, title, frame) in enumerate(saved_windows):
+            by_title.setdefault( (app_name, role, title), collections.deque() ).append(i)
+            by_role.setdefault( (app_name, role), collections.deque() ).append(i)
+
+        used = [False] * len(saved_windows)
+        matched = []
+        unmatched = []
+
+        def take(indices):
+            while indices:
+                i = indices.popleft()
+                if not used[i]:
+                    used[i] = True
+                    return saved_windows[i][3]
+            return None
+
+        for window in windows:
+            app_name, wnd, role, title, frame = window
+            saved_frame = take( by_title.get( (app_name, role, title) ) )
+            if saved_frame is None:
+                unmatched.append(window)
+            else:
+                matched.append( (app_name, wnd, saved_frame, frame) )
+
+        for app_name, wnd, role, title, frame in unmatched:
+            saved_frame = take( by_role.get( (app_name, role) ) )
+            if saved_frame is not None:
+                matched.append( (app_name, wnd, saved_frame, frame) )
+
+        return [ (app_name, wnd, saved_frame) for app_name, wnd, saved_frame, frame in matched if list(saved_frame) != [ round(v) for v in frame ] ]